@@ -4,7 +4,8 @@ Run: python add_test_data.py
 """
 import os
 from dotenv import load_dotenv
-from tools import get_db_connection
+from tools import get_db_connection, rank_increment
+from ledger import post_journal, OPENING_BALANCES
 
 load_dotenv()
 
@@ -25,26 +26,31 @@ def add_test_data():
     for alias, name, account, bank, uid, freq in beneficiaries:
         try:
             cursor.execute("""
-                INSERT INTO beneficiaries (alias_name, account_name, account_number, bank_name, user_id, frequency_count)
-                VALUES (%s, %s, %s, %s, %s, %s)
+                INSERT INTO beneficiaries (alias_name, account_name, account_number, bank_name, user_id, frequency_count, last_used_at, rank_score)
+                VALUES (%s, %s, %s, %s, %s, %s, NOW(), %s)
                 ON DUPLICATE KEY UPDATE account_name=%s, bank_name=%s
-            """, (alias, name, account, bank, uid, freq, name, bank))
+            """, (alias, name, account, bank, uid, freq, rank_increment(freq), name, bank))
             print(f"✅ Added beneficiary: {alias} ({name})")
         except Exception as e:
             print(f"⚠️ {alias}: {e}")
     
-    # Check if user has an account, if not create one
-    cursor.execute("SELECT account_id FROM accounts WHERE user_id = %s", (user_id,))
-    if not cursor.fetchone():
+    # Check if user has an account, if not create one (balances go through the ledger)
+    cursor.execute("SELECT account_id, balance_kobo FROM accounts WHERE user_id = %s FOR UPDATE", (user_id,))
+    account = cursor.fetchone()
+    if not account:
         cursor.execute("""
             INSERT INTO accounts (user_id, account_number, balance_kobo, is_active)
-            VALUES (%s, %s, %s, TRUE)
-        """, (user_id, "1234567890", 500000 * 100))  # ₦500,000
-        print(f"✅ Created account with ₦500,000 balance")
-    else:
-        # Update balance to 500k
-        cursor.execute("UPDATE accounts SET balance_kobo = %s WHERE user_id = %s", (500000 * 100, user_id))
-        print(f"✅ Updated account balance to ₦500,000")
+            VALUES (%s, %s, 0, TRUE)
+        """, (user_id, "1234567890"))
+        account = (cursor.lastrowid, 0)
+        print("✅ Created account")
+    
+    # Top up / draw down to ₦500,000 with an opening-balance journal
+    account_id, balance = account
+    delta = 500000 * 100 - balance
+    if delta:
+        post_journal(cursor, "opening", [(OPENING_BALANCES, -delta), (account_id, delta)])
+    print("✅ Account balance set to ₦500,000")
     
     conn.commit()
     cursor.close()
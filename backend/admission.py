@@ -0,0 +1,222 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from typing import Dict, Tuple
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from metrics import ADMISSION_REJECTED, ADMISSION_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+# Route class per path. Unlisted paths (static files, health, metrics) are not limited.
+ROUTE_CLASSES = {
+    "/v1/chat/completions": "llm",
+    "/verify-face": "biometric",
+    "/upload-profile-image": "biometric",
+    "/balance": "db",
+    "/beneficiaries": "db",
+    "/transactions": "db",
+    "/check-profile-image": "db",
+    "/fund-wallet": "db",
+    "/analytics": "db",
+    "/statements": "db",
+}
+
+# class: (max concurrent, max queued, requests per minute per user, burst)
+DEFAULT_LIMITS = {
+    "llm": (32, 32, 30, 10),
+    "biometric": (4, 8, 10, 3),
+    "db": (64, 64, 240, 40),
+}
+
+
+class InMemoryBucketStore:
+    """Token buckets in process memory (per Cloud Run instance)"""
+    def __init__(self, max_keys: int = 50000):
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+        self.max_keys = max_keys
+
+    async def take(self, key: str, rate_per_second: float, burst: float) -> float:
+        """Consumes one token; returns 0 if allowed, else seconds until a token is available"""
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate_per_second)
+        if tokens >= 1:
+            self.buckets[key] = (tokens - 1, now)
+            if len(self.buckets) > self.max_keys:
+                self._prune(now, rate_per_second, burst)
+            return 0.0
+        self.buckets[key] = (tokens, now)
+        return (1 - tokens) / rate_per_second
+
+    def _prune(self, now: float, rate_per_second: float, burst: float):
+        # Buckets that have refilled completely carry no state worth keeping
+        full_after = burst / rate_per_second
+        for key in [k for k, (_, updated) in self.buckets.items() if now - updated > full_after]:
+            del self.buckets[key]
+
+
+class RedisBucketStore:
+    """
+    Shared token buckets across instances (ADMISSION_REDIS_URL, needs the `redis` package).
+    The refill-and-take runs atomically in Redis via a Lua script.
+    """
+    SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 't') or ARGV[2])
+    local updated = tonumber(redis.call('HGET', KEYS[1], 'u') or ARGV[3])
+    local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 't', tokens, 'u', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self.client = redis.from_url(url)
+        self.script = self.client.register_script(self.SCRIPT)
+
+    async def take(self, key: str, rate_per_second: float, burst: float) -> float:
+        wait = await self.script(keys=[f"ratelimit:{key}"], args=[rate_per_second, burst, time.time()])
+        return float(wait)
+
+
+class RouteClass:
+    def __init__(self, name: str, concurrency: int, queue: int, per_minute: float, burst: float):
+        self.name = name
+        self.slots = asyncio.Semaphore(concurrency)
+        self.queue_limit = queue
+        self.waiting = 0
+        self.rate_per_second = per_minute / 60.0
+        self.burst = burst
+
+    @classmethod
+    def from_env(cls, name: str, defaults: tuple):
+        prefix = f"ADMISSION_{name.upper()}"
+        concurrency, queue, per_minute, burst = defaults
+        return cls(
+            name,
+            concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)),
+            queue=int(os.getenv(f"{prefix}_QUEUE", queue)),
+            per_minute=float(os.getenv(f"{prefix}_RATE", per_minute)),
+            burst=float(os.getenv(f"{prefix}_BURST", burst)),
+        )
+
+
+def _client_ip(request: Request) -> str:
+    forwarded = request.headers.get("x-forwarded-for")
+    return forwarded.split(",")[0].strip() if forwarded else (request.client.host if request.client else "unknown")
+
+
+def resolve_user_key(request: Request) -> str:
+    """
+    Bucket key for the user the handler will act as (resolved before the body is parsed):
+    - a valid access token (Authorization: Bearer <JWT> or ?token=) -> that user
+    - the ElevenLabs secret on Authorization -> x-user-id, else user 1, as chat_completions does
+    - otherwise the user ID is only claimed (x-user-id / ?user_id=), so the client IP is the key -
+      changing the claimed ID doesn't buy a fresh bucket
+    """
+    from auth import verify_access_token
+    authorization = request.headers.get("authorization") or ""
+    credential = authorization.split(" ")[1] if " " in authorization else authorization
+    token = request.query_params.get("token") or credential
+    if token:
+        try:
+            return f"user:{int(verify_access_token(token)['user_id'])}"
+        except Exception:
+            pass
+
+    expected_key = os.getenv("ELEVENLABS_CUSTOM_LLM_SECRET")
+    if credential and (not expected_key or credential == expected_key):
+        user_id = request.headers.get("x-user-id") or ""
+        return f"user:{int(user_id) if user_id.isdigit() else 1}"
+    return f"ip:{_client_ip(request)}"
+
+
+def too_many_requests(route_class: str, reason: str, retry_after: float) -> JSONResponse:
+    ADMISSION_REJECTED.inc(route_class, reason)
+    seconds = max(1, math.ceil(retry_after))
+    return JSONResponse(
+        {"detail": "Too many requests, please retry shortly", "reason": reason},
+        status_code=429,
+        headers={"Retry-After": str(seconds)}
+    )
+
+
+class AdmissionController:
+    """
+    Two checks per request, both failing fast with 429 + Retry-After:
+    1. per-user token bucket for the route's class
+    2. a concurrency limit per class, with a short bounded wait queue
+    """
+    def __init__(self, store=None, queue_timeout: float = 1.0, enabled: bool = True):
+        self.enabled = enabled
+        self.store = store or InMemoryBucketStore()
+        self.queue_timeout = queue_timeout
+        self.classes = {name: RouteClass.from_env(name, limits) for name, limits in DEFAULT_LIMITS.items()}
+
+    @classmethod
+    def from_env(cls):
+        store = None
+        redis_url = os.getenv("ADMISSION_REDIS_URL")
+        if redis_url:
+            try:
+                store = RedisBucketStore(redis_url)
+            except ImportError:
+                logger.warning("ADMISSION_REDIS_URL set but redis is not installed; using in-memory rate limits")
+        return cls(
+            store=store,
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1.0")),
+            enabled=os.getenv("ADMISSION_CONTROL", "1").lower() not in ("0", "false", "no"),
+        )
+
+    async def _take(self, route_class: RouteClass, user_key: str) -> float:
+        try:
+            return await self.store.take(f"{route_class.name}:{user_key}", route_class.rate_per_second, route_class.burst)
+        except Exception as e:
+            # A shared-store outage must not take the API down
+            logger.warning(f"Rate limit store unavailable, allowing request: {e}")
+            return 0.0
+
+    async def admit_connection(self, user_id: str) -> float:
+        """LLM-class rate check for /ws/voice-stream - on connect and per input turn; 0 = admitted"""
+        if not self.enabled:
+            return 0.0
+        wait = await self._take(self.classes["llm"], f"user:{user_id}")
+        if wait > 0:
+            ADMISSION_REJECTED.inc("llm", "rate_limited")
+        return wait
+
+    async def handle(self, request: Request, call_next):
+        name = ROUTE_CLASSES.get(request.url.path)
+        if not self.enabled or name is None or request.method == "OPTIONS":
+            return await call_next(request)
+        route_class = self.classes[name]
+
+        wait = await self._take(route_class, resolve_user_key(request))
+        if wait > 0:
+            return too_many_requests(name, "rate_limited", wait)
+
+        if route_class.slots.locked():
+            if route_class.waiting >= route_class.queue_limit:
+                return too_many_requests(name, "overloaded", 1)
+            route_class.waiting += 1
+            try:
+                await asyncio.wait_for(route_class.slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                return too_many_requests(name, "queue_timeout", 1)
+            finally:
+                route_class.waiting -= 1
+        else:
+            await route_class.slots.acquire()
+
+        ADMISSION_IN_FLIGHT.inc(name)
+        try:
+            return await call_next(request)
+        finally:
+            ADMISSION_IN_FLIGHT.dec(name)
+            route_class.slots.release()
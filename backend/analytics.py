@@ -0,0 +1,260 @@
+"""
+Spending analytics from daily per-user rollups (migration 005_daily_rollups.sql).
+
+daily_rollups holds one row per (user, day, type, counterparty) with a count
+and a kobo total. Transfers add to it in the same DB transaction
+(record_transactions), so range questions read at most one row per
+day/type/counterparty instead of scanning transactions.
+
+rebuild() recomputes rollups in bulk from the transactions table - columnar
+grouping with NumPy when installed, a dict otherwise. It stops before today,
+whose buckets live transfers are still incrementing; pass --include-today only
+for the initial backfill (before transfers start writing rollups):
+    python analytics.py rebuild [--since 2026-01-01] [--user 1] [--include-today]
+"""
+import logging
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Sequence, Tuple
+from tools import get_db_connection, timed_query
+
+try:
+    import numpy as np
+except ImportError:  # optional - rebuild falls back to pure Python grouping
+    np = None
+
+logger = logging.getLogger(__name__)
+
+COUNTERPARTY_WIDTH = 100
+REBUILD_CHUNK_ROWS = 50000
+PERIODS = ("today", "this_week", "this_month", "last_month", "last_7_days", "last_30_days", "this_year")
+
+
+def counterparty_key(name: str) -> str:
+    """Grouping key matching the rollup PK collation: case-insensitive, trailing spaces ignored"""
+    return name.rstrip().casefold()
+
+
+def canonical_counterparties(names: Iterable[str]) -> List[str]:
+    """Maps names that the PK treats as equal to one spelling (the first seen, right-stripped)"""
+    spellings: Dict[str, str] = {}
+    canonical: Dict[str, str] = {}
+    result = []
+    for name in names:
+        if name not in canonical:
+            canonical[name] = spellings.setdefault(counterparty_key(name), name.rstrip())
+        result.append(canonical[name])
+    return result
+
+
+def record_transactions(cursor, rows: Iterable[Tuple[int, str, str, int]]):
+    """
+    Adds (user_id, type, counterparty, amount_kobo) to today's buckets. Call inside
+    the transaction that inserts the transactions rows; CURDATE() matches their NOW().
+    """
+    rows = list(rows)
+    names = canonical_counterparties((counterparty or "")[:COUNTERPARTY_WIDTH] for _, _, counterparty, _ in rows)
+    merged: Dict[Tuple[int, str, str], List[int]] = {}
+    for (user_id, kind, _, amount_kobo), counterparty in zip(rows, names):
+        bucket = merged.setdefault((user_id, kind, counterparty), [0, 0])
+        bucket[0] += 1
+        bucket[1] += amount_kobo
+    if not merged:
+        return
+    with timed_query("analytics_rollup_upsert"):
+        cursor.executemany(
+            """
+            INSERT INTO daily_rollups (user_id, day, type, counterparty, txn_count, amount_kobo)
+            VALUES (%s, CURDATE(), %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE txn_count = txn_count + VALUES(txn_count), amount_kobo = amount_kobo + VALUES(amount_kobo)
+            """,
+            [(user_id, kind, counterparty, count, amount) for (user_id, kind, counterparty), (count, amount) in merged.items()]
+        )
+
+
+def period_range(period: str, today: date = None) -> Tuple[date, date]:
+    """Inclusive (start, end) dates for a named period"""
+    today = today or date.today()
+    if period == "today":
+        return today, today
+    if period == "this_week":
+        return today - timedelta(days=today.weekday()), today
+    if period == "last_7_days":
+        return today - timedelta(days=6), today
+    if period == "last_30_days":
+        return today - timedelta(days=29), today
+    if period == "last_month":
+        end = today.replace(day=1) - timedelta(days=1)
+        return end.replace(day=1), end
+    if period == "this_year":
+        return today.replace(month=1, day=1), today
+    return today.replace(day=1), today  # this_month
+
+
+def resolve_range(period: str = None, start: date = None, end: date = None, max_days: int = 366) -> Tuple[date, date]:
+    """Explicit start/end win over a named period; defaults to this_month"""
+    if start or end:
+        end = end or date.today()
+        start = start or end.replace(day=1)
+    elif period and period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    else:
+        start, end = period_range(period or "this_month")
+    if start > end:
+        raise ValueError("start must be on or before end")
+    if (end - start).days >= max_days:
+        raise ValueError(f"Range is limited to {max_days} days")
+    return start, end
+
+
+def spending_summary(user_id: int, start: date, end: date, counterparty: str = None, top: int = 5) -> dict:
+    """Totals by type, top recipients and a per-day debit series for [start, end]"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        params = [user_id, start, end]
+        counterparty_filter = ""
+        if counterparty:
+            counterparty_filter = "AND counterparty LIKE %s"
+            params.append(f"%{counterparty}%")
+        with timed_query("analytics_summary"):
+            cursor.execute(
+                f"""
+                SELECT day, type, counterparty, txn_count, amount_kobo FROM daily_rollups
+                WHERE user_id = %s AND day BETWEEN %s AND %s {counterparty_filter}
+                """,
+                params
+            )
+            rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    totals = {"DEBIT": [0, 0], "CREDIT": [0, 0]}
+    recipients: Dict[str, List[int]] = {}
+    daily: Dict[date, int] = {}
+    for day, kind, name, count, amount in rows:
+        totals.setdefault(kind, [0, 0])
+        totals[kind][0] += count
+        totals[kind][1] += amount
+        if kind == "DEBIT":
+            recipient = recipients.setdefault(name, [0, 0])
+            recipient[0] += count
+            recipient[1] += amount
+            daily[day] = daily.get(day, 0) + amount
+
+    top_recipients = sorted(recipients.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "sent": {"count": totals["DEBIT"][0], "amount_kobo": int(totals["DEBIT"][1]), "amount_ngn": f"{totals['DEBIT'][1] / 100:,.2f}"},
+        "received": {"count": totals["CREDIT"][0], "amount_kobo": int(totals["CREDIT"][1]), "amount_ngn": f"{totals['CREDIT'][1] / 100:,.2f}"},
+        "top_recipients": [{"name": name, "count": count, "amount_ngn": f"{amount / 100:,.2f}"} for name, (count, amount) in top_recipients],
+        "daily_sent_kobo": {day.isoformat(): int(amount) for day, amount in sorted(daily.items())},
+    }
+
+
+def aggregate(user_ids: Sequence[int], days: Sequence[date], kinds: Sequence[str], counterparties: Sequence[str],
+              amounts: Sequence[int]) -> List[Tuple[int, date, str, str, int, int]]:
+    """
+    Groups transaction columns into rollup rows (user_id, day, type, counterparty, count, amount_kobo).
+    Counterparties are grouped by counterparty_key so each group is one PK value.
+    """
+    if not len(amounts):
+        return []
+    counterparties = canonical_counterparties(counterparties)
+    if np is None:
+        groups: Dict[tuple, List[int]] = {}
+        for key, amount in zip(zip(user_ids, days, kinds, counterparties), amounts):
+            group = groups.setdefault(key, [0, 0])
+            group[0] += 1
+            group[1] += amount
+        return [key + (count, amount) for key, (count, amount) in groups.items()]
+
+    # Factorize each string/date column to integer codes, then group on the code tuple
+    codes, uniques = [], []
+    for column in (user_ids, days, kinds, counterparties):
+        values, inverse = np.unique(np.asarray(column, dtype=object), return_inverse=True)
+        codes.append(inverse.astype(np.int64))
+        uniques.append(values)
+    keys = np.stack(codes, axis=1)
+    group_keys, group_index = np.unique(keys, axis=0, return_inverse=True)
+    group_index = group_index.reshape(-1)
+    counts = np.bincount(group_index)
+    sums = np.bincount(group_index, weights=np.asarray(amounts, dtype=np.float64))
+    return [
+        (int(uniques[0][k[0]]), uniques[1][k[1]], uniques[2][k[2]], uniques[3][k[3]], int(count), int(round(total)))
+        for k, count, total in zip(group_keys, counts, sums)
+    ]
+
+
+def rebuild(since: date = None, user_id: int = None, include_today: bool = False) -> int:
+    """Recomputes rollups for days >= since (all history if None); returns rollup rows written"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    filters, params = ["status = 'SUCCESS'"], []
+    if not include_today:
+        filters.append("created_at < CURDATE()")
+    if since:
+        filters.append("created_at >= %s")
+        params.append(datetime.combine(since, datetime.min.time()))
+    if user_id is not None:
+        filters.append("user_id = %s")
+        params.append(user_id)
+    where = " AND ".join(filters)
+    try:
+        with timed_query("analytics_rebuild_scan"):
+            cursor.execute(
+                f"""
+                SELECT user_id, DATE(created_at), type, LEFT(COALESCE(counterparty_name, ''), {COUNTERPARTY_WIDTH}), amount_kobo
+                FROM transactions WHERE {where}
+                """,
+                params
+            )
+            columns = ([], [], [], [], [])
+            while True:
+                chunk = cursor.fetchmany(REBUILD_CHUNK_ROWS)
+                if not chunk:
+                    break
+                for column, values in zip(columns, zip(*chunk)):
+                    column.extend(values)
+        rollups = aggregate(*columns)
+
+        delete_filters, delete_params = ([] if include_today else ["day < CURDATE()"]), []
+        if since:
+            delete_filters.append("day >= %s")
+            delete_params.append(since)
+        if user_id is not None:
+            delete_filters.append("user_id = %s")
+            delete_params.append(user_id)
+        with timed_query("analytics_rebuild_write"):
+            cursor.execute(f"DELETE FROM daily_rollups {'WHERE ' + ' AND '.join(delete_filters) if delete_filters else ''}", delete_params)
+            for offset in range(0, len(rollups), 1000):
+                cursor.executemany(
+                    """
+                    INSERT INTO daily_rollups (user_id, day, type, counterparty, txn_count, amount_kobo)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE txn_count = txn_count + VALUES(txn_count), amount_kobo = amount_kobo + VALUES(amount_kobo)
+                    """,
+                    rollups[offset:offset + 1000]
+                )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    logger.info("Rollups rebuilt", extra={"rows": len(rollups), "since": since.isoformat() if since else None, "numpy": np is not None})
+    return len(rollups)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--since", type=date.fromisoformat)
+    parser.add_argument("--user", type=int)
+    parser.add_argument("--include-today", action="store_true")
+    args = parser.parse_args()
+    count = rebuild(args.since, args.user, args.include_today)
+    print(f"Wrote {count} rollup rows (numpy: {'yes' if np is not None else 'no'})")
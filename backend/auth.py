@@ -6,6 +6,7 @@ from google.oauth2 import id_token
 from google.auth.transport import requests
 import bcrypt
 from tools import get_db_connection
+import name_enquiry
 
 # JWT Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
@@ -99,6 +100,8 @@ def get_or_create_user(google_user_info: dict) -> dict:
     conn.commit()
     cursor.close()
     conn.close()
+    # A lookup of this number may have been cached as "no such account"
+    name_enquiry.service.invalidate(account_number)
     
     return {
         "user_id": user_id,
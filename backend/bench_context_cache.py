@@ -0,0 +1,121 @@
+"""
+Context Cache Benchmark - runs VoiceAgent turns against a local mock Gemini client
+Compares input tokens and latency per call with the context cache ON vs OFF
+
+The mock charges latency per *uncached* prompt token, roughly like the real API.
+No network / Vertex AI credentials needed.
+
+Run: python bench_context_cache.py
+"""
+import os
+import time
+import asyncio
+import statistics
+from google.genai import types
+from llm_backend import LLMBackend, text_response
+from voice_agent import VoiceAgent
+
+TURNS = 20
+BASE_LATENCY = 0.050        # seconds per call
+PER_TOKEN_LATENCY = 0.00002  # seconds per uncached prompt token
+PER_CACHED_TOKEN_LATENCY = 0.000002
+
+def estimate_tokens(text: str) -> int:
+    """~4 chars per token, good enough for relative comparison"""
+    return max(1, len(text) // 4)
+
+def prefix_tokens(system_instruction, tools) -> int:
+    text = system_instruction or ""
+    for tool in tools or []:
+        text += tool.model_dump_json(exclude_none=True)
+    return estimate_tokens(text)
+
+
+class MockGeminiBackend(LLMBackend):
+    """Mock Gemini with context caching semantics and token-based latency"""
+    def __init__(self):
+        self.caches = {}
+
+    async def create_cache(self, model, config):
+        name = f"cachedContents/mock-{len(self.caches) + 1}"
+        self.caches[name] = prefix_tokens(config.system_instruction, config.tools)
+        return types.CachedContent(name=name, model=model)
+
+    async def update_cache(self, name, config):
+        if name not in self.caches:
+            raise Exception(f"404 NOT_FOUND: cached content {name}")
+        return types.CachedContent(name=name)
+
+    async def delete_cache(self, name):
+        self.caches.pop(name, None)
+
+    async def generate_content(self, model, contents, config=None):
+        if config.cached_content:
+            if config.cached_content not in self.caches:
+                raise Exception(f"404 NOT_FOUND: cached content {config.cached_content}")
+            cached = self.caches[config.cached_content]
+            uncached_prefix = 0
+        else:
+            cached = 0
+            uncached_prefix = prefix_tokens(config.system_instruction, config.tools)
+
+        history = sum(estimate_tokens(p.text or "") for c in contents for p in c.parts)
+        uncached = uncached_prefix + history
+
+        await asyncio.sleep(BASE_LATENCY + uncached * PER_TOKEN_LATENCY + cached * PER_CACHED_TOKEN_LATENCY)
+
+        response = text_response("Sure, how much would you like to send?")
+        response.usage_metadata = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=uncached + cached,
+            cached_content_token_count=cached
+        )
+        return response
+
+
+async def run(cache_enabled: bool):
+    os.environ["GEMINI_CONTEXT_CACHE"] = "1" if cache_enabled else "0"
+    agent = VoiceAgent(project_id="mock", location="mock", backend=MockGeminiBackend())
+
+    latencies = []
+    for i in range(TURNS):
+        start = time.perf_counter()
+        await agent.process_input(f"What can you do for me? (turn {i})", user_id=1, session_id="bench")
+        latencies.append(time.perf_counter() - start)
+
+    stats = agent.usage_stats
+    uncached = stats["prompt_tokens"] - stats["cached_tokens"]
+    return {
+        "calls": stats["calls"],
+        "uncached_per_call": uncached / max(1, stats["calls"]),
+        "cached_per_call": stats["cached_tokens"] / max(1, stats["calls"]),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "cache": agent.context_cache.stats,
+    }
+
+
+async def main():
+    print("\n" + "=" * 70)
+    print("🧪 Context Cache Benchmark (mock Gemini client)")
+    print("=" * 70)
+
+    off = await run(cache_enabled=False)
+    on = await run(cache_enabled=True)
+
+    for label, result in (("Cache OFF", off), ("Cache ON", on)):
+        print(f"\n{label}:")
+        print(f"   Calls:                 {result['calls']}")
+        print(f"   Uncached input tokens: {result['uncached_per_call']:.0f} / call")
+        print(f"   Cached input tokens:   {result['cached_per_call']:.0f} / call")
+        print(f"   Latency p50 / mean:    {result['p50_ms']:.1f} ms / {result['mean_ms']:.1f} ms")
+        print(f"   Cache stats:           {result['cache']}")
+
+    saved = off["uncached_per_call"] - on["uncached_per_call"]
+    print("\n" + "-" * 70)
+    print(f"✅ Uncached input tokens saved: {saved:.0f} / call "
+          f"({saved / max(1, off['uncached_per_call']) * 100:.0f}%)")
+    print(f"✅ Mean latency saved: {off['mean_ms'] - on['mean_ms']:.1f} ms / turn")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
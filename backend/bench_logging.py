@@ -0,0 +1,105 @@
+"""
+Logging Benchmark - per-request cost of the old print-to-stderr debugging
+versus the queue-based structured logger from logging_config.
+
+Old: dump every header and the first 2000 bytes of the body, then flush, on the request path.
+New: two INFO records via QueueHandler (formatting/writing happens on the listener thread),
+     plus a sampled DEBUG payload record.
+
+The sink simulates stdout being a pipe to a log collector: each flush costs
+--sink-latency-ms (Cloud Run's log agent back-pressures under load).
+
+Run: python bench_logging.py [--requests 5000] [--sink-latency-ms 0.2]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+HEADERS = {
+    "host": "api.example.com",
+    "content-type": "application/json",
+    "authorization": "Bearer " + "x" * 300,
+    "user-agent": "ElevenLabs/1.0",
+    "x-session-id": "sess-1234567890",
+    "x-user-id": "42",
+}
+BODY = json.dumps({
+    "model": "gemini",
+    "stream": True,
+    "messages": [{"role": "user", "content": "Send five thousand naira to John " * 40}],
+})
+
+
+class SlowSink:
+    """File wrapper that adds a fixed cost per flush"""
+    def __init__(self, f, latency_ms: float):
+        self.f = f
+        self.latency = latency_ms / 1000
+
+    def write(self, data):
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def old_style(requests: int, out) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        print("=== Incoming Request ===", file=out)
+        for key, value in HEADERS.items():
+            print(f"{key}: {value}", file=out)
+        print(f"Body: {BODY[:2000]}", file=out)
+        print("Processing: Send five thousand naira to John", file=out)
+        print("Response ready", file=out)
+        out.flush()
+    return time.perf_counter() - start
+
+
+def new_style(requests: int, out) -> float:
+    os.environ.setdefault("LOG_FORMAT", "json")
+    import logging_config
+    sys.stdout = out
+    logging_config.setup_logging()
+    logger = logging.getLogger("bench")
+
+    start = time.perf_counter()
+    for i in range(requests):
+        logging_config.request_id_var.set(f"req-{i}")
+        logger.info("Incoming request", extra={"path": "/v1/chat/completions"})
+        if logging_config.should_log_payload(logger):
+            logger.debug("Request payload", extra={"headers": logging_config.redact_headers(HEADERS), "body": BODY[:2000]})
+        logger.info("Response ready")
+    elapsed = time.perf_counter() - start
+
+    logging_config.shutdown_logging()
+    sys.stdout = sys.__stdout__
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--sink-latency-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "old.log"), "w") as f:
+            old = old_style(args.requests, SlowSink(f, args.sink_latency_ms))
+        with open(os.path.join(tmp, "new.log"), "w") as f:
+            new = new_style(args.requests, SlowSink(f, args.sink_latency_ms))
+
+    print(f"Requests:           {args.requests} (sink latency {args.sink_latency_ms}ms/flush)")
+    print(f"print + flush:      {old / args.requests * 1e6:8.1f} µs/request on the request path")
+    print(f"queue logger:       {new / args.requests * 1e6:8.1f} µs/request on the request path")
+    print(f"Speedup:            {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
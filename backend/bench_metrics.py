@@ -0,0 +1,51 @@
+"""
+Metrics Overhead Benchmark - cost of instrumentation on the hot path
+
+Measures Counter.inc, Histogram.observe, Histogram.time() and a full scrape
+(render) with realistic series counts.
+
+Run: python bench_metrics.py [--iterations 200000]
+"""
+import time
+import argparse
+from metrics import Counter, Histogram, Registry
+
+
+def per_call_ns(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "bench", ("method", "route", "status")))
+    latency = registry.register(Histogram("latency_seconds", "bench", ("method", "route")))
+
+    def timed_block():
+        with latency.time("GET", "/balance"):
+            pass
+
+    baseline = per_call_ns(lambda: None, args.iterations)
+    print(f"empty call:          {baseline:8.0f} ns")
+    print(f"Counter.inc:         {per_call_ns(lambda: requests.inc('GET', '/balance', 200), args.iterations) - baseline:8.0f} ns")
+    print(f"Histogram.observe:   {per_call_ns(lambda: latency.observe(0.042, 'GET', '/balance'), args.iterations) - baseline:8.0f} ns")
+    print(f"Histogram.time():    {per_call_ns(timed_block, args.iterations) - baseline:8.0f} ns")
+
+    # ~20 routes x 5 statuses, as a busy instance would have
+    for r in range(20):
+        for status in (200, 201, 400, 404, 500):
+            requests.inc("GET", f"/route{r}", status)
+            latency.observe(0.01 * r, "GET", f"/route{r}")
+    start = time.perf_counter()
+    body = registry.render()
+    print(f"scrape (render):     {(time.perf_counter() - start) * 1000:8.2f} ms for {body.count(chr(10))} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Payload Benchmark - /transactions and /beneficiaries response size and latency
+
+Builds synthetic rows shaped like the dashboard queries and compares the default
+list-of-dicts JSON against the columnar format, each raw / gzip / brotli.
+Reports bytes on the wire, server-side encode+compress time, and the estimated
+transfer time on a slow mobile link.
+
+Run: python bench_payload.py [--rows 20,100,500] [--rounds 200] [--kbps 400]
+"""
+import time
+import random
+import argparse
+import datetime
+from sse_encoder import dumps
+from compression import compress, brotli
+from columnar import TRANSACTION_COLUMNS, BENEFICIARY_COLUMNS
+
+NAMES = ["John Okafor", "Amaka Eze", "Tunde Bakare", "Ngozi Adeyemi", "Chinedu Obi", "Fatima Bello"]
+BANKS = ["GTBank", "Access Bank", "First Bank", "Zenith Bank", "UBA", "Kuda"]
+
+
+def transaction_rows(count):
+    now = datetime.datetime(2026, 10, 1, 12, 0)
+    return [(
+        f"TXN{random.randint(10**11, 10**12 - 1)}",
+        random.choice(["debit", "credit"]),
+        random.randint(100, 50_000_000),
+        random.choice(NAMES),
+        random.choice(BANKS),
+        "success",
+        now - datetime.timedelta(minutes=37 * i),
+    ) for i in range(count)]
+
+
+def beneficiary_rows(count):
+    return [(
+        name.split()[0].lower() + str(i), name, f"{random.randint(10**9, 10**10 - 1)}",
+        random.choice(BANKS), random.randint(0, 40)
+    ) for i, name in enumerate(random.choice(NAMES) for _ in range(count))]
+
+
+# Mirrors of the two endpoint shapes in main.py
+
+def transactions_default(rows):
+    return dumps([{
+        "transaction_id": r[0], "type": r[1], "amount_kobo": r[2], "amount_ngn": f"{r[2] / 100:,.2f}",
+        "recipient": r[3], "bank": r[4], "status": r[5], "date": r[6].strftime("%Y-%m-%d %H:%M"),
+    } for r in rows])
+
+
+def transactions_columnar(rows):
+    return dumps({"columns": list(TRANSACTION_COLUMNS),
+                  "rows": [list(r[:6]) + [int(r[6].timestamp())] for r in rows]})
+
+
+def beneficiaries_default(rows):
+    return dumps([dict(zip(BENEFICIARY_COLUMNS, r)) for r in rows])
+
+
+def beneficiaries_columnar(rows):
+    return dumps({"columns": list(BENEFICIARY_COLUMNS), "rows": [list(r) for r in rows]})
+
+
+def measure(encode, rows, encoding, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        body = encode(rows)
+        if encoding:
+            body = compress(body, encoding)
+    return len(body), (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="20,100,500")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--kbps", type=float, default=400, help="link speed for the transfer estimate")
+    args = parser.parse_args()
+
+    random.seed(7)
+    encodings = [None, "gzip"] + (["br"] if brotli is not None else [])
+    endpoints = [
+        ("/transactions", transaction_rows, transactions_default, transactions_columnar),
+        ("/beneficiaries", beneficiary_rows, beneficiaries_default, beneficiaries_columnar),
+    ]
+    print(f"Transfer estimate at {args.kbps:.0f} kbit/s (brotli: {'yes' if brotli else 'no'})\n")
+    print(f"{'endpoint':<15} {'rows':>5} {'shape':<9} {'encoding':<9} {'bytes':>9} {'server ms':>10} {'wire ms':>9}")
+
+    for path, make_rows, default, columnar in endpoints:
+        for count in (int(n) for n in args.rows.split(",")):
+            rows = make_rows(count)
+            baseline = None
+            for shape, encode in (("default", default), ("columnar", columnar)):
+                for encoding in encodings:
+                    size, seconds = measure(encode, rows, encoding, args.rounds)
+                    baseline = baseline or size
+                    wire_ms = size * 8 / (args.kbps * 1000) * 1000
+                    print(f"{path:<15} {count:>5} {shape:<9} {encoding or 'identity':<9} {size:>9,} "
+                          f"{seconds * 1000:>10.3f} {wire_ms:>9.1f}   {size / baseline:>5.0%}")
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Request Parsing Benchmark - /v1/chat/completions body parsing
+
+Compares the previous path (decode -> json.loads -> full pydantic ChatCompletionRequest)
+with request_parser.fast_parse_chat_request on ElevenLabs-shaped payloads of growing
+conversation length (each message carries extra fields, as ElevenLabs sends them).
+
+Run: python bench_request_parser.py [--iterations 2000]
+"""
+import json
+import time
+import argparse
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel
+import request_parser
+from request_parser import fast_parse_chat_request
+
+
+# Mirrors the models in main.py (importing main would start the agent)
+class Message(BaseModel):
+    role: str
+    content: Optional[str] = None
+
+    class Config:
+        extra = 'allow'
+
+
+class ChatCompletionRequest(BaseModel):
+    model: Optional[str] = None
+    messages: List[Message]
+    stream: Optional[bool] = False
+    tools: Optional[List[Dict[str, Any]]] = None
+    tool_choice: Optional[Union[str, Dict[str, Any]]] = None
+
+    class Config:
+        extra = 'allow'
+
+
+def build_payload(turns: int) -> bytes:
+    messages = [{"role": "system", "content": "You are TunjiaX, a voice banking assistant. " * 20}]
+    for i in range(turns):
+        messages.append({
+            "role": "user",
+            "content": f"Send {1000 + i} naira to John Okafor at GTBank, account 0123456789",
+            "time_in_call_secs": i * 7,
+            "message_id": f"msg_{i:06d}",
+        })
+        messages.append({
+            "role": "assistant",
+            "content": "I found John Okafor at GTBank. How much would you like to send? ₦",
+            "tool_calls": [],
+            "time_in_call_secs": i * 7 + 3,
+        })
+    return json.dumps({
+        "model": "gemini-2.0-flash",
+        "stream": True,
+        "messages": messages,
+        "temperature": 0.7,
+        "elevenlabs_extra_body": {"conversation_id": "conv_123"},
+    }).encode("utf-8")
+
+
+def old_parse(raw: bytes):
+    body = json.loads(raw.decode("utf-8"))
+    request = ChatCompletionRequest(**body)
+    return request.model, request.stream, request.messages[-1].content, len(request.messages)
+
+
+def new_parse(raw: bytes):
+    fields = fast_parse_chat_request(raw)
+    return fields.model, fields.stream, fields.last_content, fields.message_count
+
+
+def timed(func, raw: bytes, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(raw)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"JSON backend: {'orjson' if request_parser.orjson else 'stdlib json'}\n")
+    print(f"{'turns':>6} {'body KiB':>9} {'old µs':>10} {'fast µs':>10} {'speedup':>8}")
+    for turns in (5, 25, 100, 400):
+        raw = build_payload(turns)
+        assert old_parse(raw) == new_parse(raw)
+        iterations = max(50, args.iterations // max(1, turns // 25))
+        old = timed(old_parse, raw, iterations)
+        new = timed(new_parse, raw, iterations)
+        print(f"{turns:>6} {len(raw) / 1024:>9.1f} {old:>10.1f} {new:>10.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
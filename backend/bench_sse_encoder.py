@@ -0,0 +1,92 @@
+"""
+SSE Encoder Benchmark - chat.completion.chunk encoding throughput
+
+Compares the previous per-word `json.dumps` of the full chunk dict against
+ChatCompletionStreamEncoder (precomputed prefix/suffix, delta-only escaping),
+one delta per write and batched. Reports chunks/sec and bytes allocated (tracemalloc).
+
+Run: python bench_sse_encoder.py [--words 2000] [--rounds 50] [--batch 8]
+"""
+import json
+import time
+import argparse
+import tracemalloc
+import sse_encoder
+from sse_encoder import ChatCompletionStreamEncoder
+
+MODEL = "gemini-2.0-flash"
+TEXT = "Alright, I'll send ₦5,000 to John Okafor at GTBank. Please confirm with your face to \"complete\" the transfer."
+
+
+def old_stream(words):
+    request_id = f"chatcmpl-{int(time.time())}"
+    created = int(time.time())
+    out = [f"data: {json.dumps({'id': request_id, 'object': 'chat.completion.chunk', 'created': created, 'model': MODEL, 'choices': [{'index': 0, 'delta': {'role': 'assistant'}, 'finish_reason': None}]})}\n\n".encode()]
+    for word in words:
+        out.append(f"data: {json.dumps({'id': request_id, 'object': 'chat.completion.chunk', 'created': created, 'model': MODEL, 'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}]})}\n\n".encode())
+    out.append(f"data: {json.dumps({'id': request_id, 'object': 'chat.completion.chunk', 'created': created, 'model': MODEL, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n".encode())
+    out.append(b"data: [DONE]\n\n")
+    return out
+
+
+def new_stream(words, batch=1):
+    created = int(time.time())
+    encoder = ChatCompletionStreamEncoder(f"chatcmpl-{created}", created, MODEL)
+    out = [encoder.role()]
+    if batch == 1:
+        for word in words:
+            out.append(encoder.content(word + " "))
+    else:
+        for i in range(0, len(words), batch):
+            out.append(encoder.contents(word + " " for word in words[i:i + batch]))
+    out.append(encoder.finish("stop"))
+    out.append(sse_encoder.DONE)
+    return out
+
+
+def decode(chunks):
+    events = b"".join(chunks).decode().split("\n\n")
+    return [json.loads(e[6:]) for e in events if e and e != "data: [DONE]"]
+
+
+def measure(name, func, words, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(words)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(words)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    chunks = (len(words) + 2) * rounds
+    print(f"{name:<28} {chunks / elapsed:>12,.0f} chunks/s   {peak / 1024:>8.1f} KiB peak alloc")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=8)
+    args = parser.parse_args()
+
+    words = (TEXT.split(" ") * (args.words // len(TEXT.split(" ")) + 1))[:args.words]
+
+    # Same events on the wire (modulo JSON whitespace)
+    old_events = decode(old_stream(words))
+    for events in (decode(new_stream(words)), decode(new_stream(words, args.batch))):
+        for a, b in zip(old_events, events):
+            a["id"] = b["id"]; a["created"] = b["created"]
+        assert old_events == events
+
+    print(f"JSON backend: {'orjson' if sse_encoder.orjson else 'stdlib json'}; {args.words} words x {args.rounds} rounds\n")
+    old = measure("json.dumps per chunk", old_stream, words, args.rounds)
+    new = measure("encoder, 1 delta/write", new_stream, words, args.rounds)
+    batched = measure(f"encoder, {args.batch} deltas/write", lambda w: new_stream(w, args.batch), words, args.rounds)
+    print(f"\nSpeedup: {old / new:.1f}x (per delta), {old / batched:.1f}x (batched, {args.batch}x fewer writes)")
+
+
+if __name__ == "__main__":
+    main()
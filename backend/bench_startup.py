@@ -0,0 +1,52 @@
+"""
+Startup Benchmark - what importing the app costs on a cold start
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and lists the
+slowest top-level imports (cumulative), plus total wall time. Heavy work
+(Gemini client, DB pool, DeepFace) now happens in the lifespan handler, with
+per-stage timings reported by GET /api/ready.
+
+Run: python bench_startup.py [--module main] [--top 15]
+"""
+import sys
+import time
+import argparse
+import subprocess
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        sys.exit(result.returncode)
+
+    # Lines look like "import time:  self_us | cumulative_us | <2 spaces per nesting level>name"
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, package = line[len("import time:"):].split("|")
+        name = package.strip()
+        # Top-level imports (nesting level 1) are the ones main.py pulls in directly or via stdlib
+        if len(package) - len(package.lstrip(" ")) == 3:
+            rows.append((int(cumulative_us), name))
+
+    rows.sort(reverse=True)
+    print(f"import {args.module}: {wall:.2f}s wall (fresh interpreter)\n")
+    print(f"{'cumulative ms':>14}  module")
+    for cumulative_us, name in rows[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
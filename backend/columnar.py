@@ -0,0 +1,29 @@
+"""
+Compact columnar JSON for list endpoints: field names once, then row arrays.
+
+    {"columns": ["transaction_id", "type", ...], "rows": [["TXN1", "debit", ...], ...]}
+
+Selected with `?format=columnar` or `Accept: application/vnd.tunjiax.columnar+json`.
+Columnar rows carry raw values (kobo integers, epoch seconds) instead of the
+preformatted display strings of the default format.
+"""
+from typing import Iterable, Optional, Sequence
+from fastapi import Request
+from fastapi.responses import Response
+from sse_encoder import dumps
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.tunjiax.columnar+json"
+
+TRANSACTION_COLUMNS = ("transaction_id", "type", "amount_kobo", "recipient", "bank", "status", "created_at")
+BENEFICIARY_COLUMNS = ("alias_name", "account_name", "account_number", "bank_name", "frequency_count")
+
+
+def wants_columnar(request: Request, format: Optional[str] = None) -> bool:
+    if format is not None:
+        return format.lower() == "columnar"
+    return COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def columnar_response(columns: Sequence[str], rows: Iterable[Sequence]) -> Response:
+    body = dumps({"columns": list(columns), "rows": [list(row) for row in rows]})
+    return Response(body, media_type=COLUMNAR_MEDIA_TYPE, headers={"vary": "Accept"})
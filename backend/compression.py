@@ -0,0 +1,112 @@
+"""
+Negotiated br/gzip compression for API responses.
+
+Only complete (non-streamed) bodies above a size threshold are compressed.
+SSE streams, responses that already carry a Content-Encoding (precompressed
+static files) and non-text media types pass through untouched.
+"""
+import gzip
+import logging
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # optional - gzip only without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/vnd.tunjiax", "application/javascript",
+    "application/xml", "image/svg+xml", "text/",
+)
+# Dynamic responses are compressed per request, so favour speed over ratio
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """br if the client accepts it (and brotli is installed), else gzip, else None"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return not content_type.startswith("text/event-stream") and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """ASGI middleware (raw, so streamed responses are never buffered)"""
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for name, value in scope.get("headers", ()):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", ())}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or not _compressible(content_type):
+                    passthrough = True
+                    return await send(message)
+                start_message = message  # held until we see whether the body is complete
+                return
+
+            if message["type"] == "http.response.body" and start_message is not None:
+                body = message.get("body", b"")
+                held, start_message = start_message, None
+                headers = [(k, v) for k, v in held.get("headers", ()) if k.lower() != b"vary"]
+                vary = [v for k, v in held.get("headers", ()) if k.lower() == b"vary"]
+                headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+
+                if message.get("more_body", False) or len(body) < self.minimum_size:
+                    # Streamed or small - send as is
+                    passthrough = True
+                    await send({**held, "headers": headers})
+                    return await send(message)
+
+                compressed = compress(body, encoding)
+                headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                headers.append((b"content-length", str(len(compressed)).encode()))
+                passthrough = True
+                await send({**held, "headers": headers})
+                return await send({"type": "http.response.body", "body": compressed})
+
+            return await send(message)
+
+        await self.app(scope, receive, send_wrapper)
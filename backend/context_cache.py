@@ -0,0 +1,172 @@
+import os
+import time
+import logging
+import asyncio
+from typing import Optional
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+
+class ContextCacheManager:
+    """
+    Keeps the static prompt prefix (system instruction + tool declarations)
+    in Gemini's provider-side context cache so it is not re-sent on every call.
+
+    Lifecycle:
+    - create the cache lazily on first use
+    - extend its TTL when it is about to expire
+    - fall back to the inline config whenever the cache is missing or
+      creation fails (e.g. model doesn't support caching, prefix too small)
+    """
+    def __init__(
+        self,
+        backend,
+        model_name: str,
+        system_instruction: str,
+        tools: list,
+        ttl_seconds: int = 3600,
+        refresh_margin_seconds: int = 300,
+        retry_after_seconds: int = 600,
+        enabled: bool = True
+    ):
+        self.backend = backend
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.tools = tools
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.enabled = enabled
+
+        # Full config used when the cache is unavailable
+        self.inline_config = types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            tools=tools
+        )
+
+        self.cache_name: Optional[str] = None
+        self.expires_at = 0.0
+        self.disabled_until = 0.0
+        self._lock = asyncio.Lock()
+
+        self.stats = {
+            "creates": 0,
+            "refreshes": 0,
+            "cached_calls": 0,
+            "inline_calls": 0,
+            "fallbacks": 0,
+            "failures": 0,
+        }
+
+    @classmethod
+    def from_env(cls, backend, model_name: str, system_instruction: str, tools: list):
+        """Builds a manager configured from GEMINI_CONTEXT_CACHE* env vars"""
+        return cls(
+            backend,
+            model_name,
+            system_instruction,
+            tools,
+            ttl_seconds=int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600")),
+            refresh_margin_seconds=int(os.getenv("GEMINI_CONTEXT_CACHE_REFRESH_MARGIN", "300")),
+            enabled=os.getenv("GEMINI_CONTEXT_CACHE", "1").lower() not in ("0", "false", "no")
+        )
+
+    async def get_config(self) -> types.GenerateContentConfig:
+        """
+        Returns the config to use for the next generate_content call:
+        one referencing the cached prefix if available, otherwise the inline config.
+        """
+        cache_name = await self._ensure_cache()
+        if cache_name:
+            self.stats["cached_calls"] += 1
+            return types.GenerateContentConfig(cached_content=cache_name)
+
+        self.stats["inline_calls"] += 1
+        return self.inline_config
+
+    async def _ensure_cache(self) -> Optional[str]:
+        """Creates or refreshes the cache if needed. Returns the cache name or None."""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        if self.cache_name and now < self.expires_at - self.refresh_margin_seconds:
+            return self.cache_name
+        if not self.cache_name and now < self.disabled_until:
+            return None
+
+        async with self._lock:
+            # Another coroutine may have done the work while we waited
+            now = time.time()
+            if self.cache_name and now < self.expires_at - self.refresh_margin_seconds:
+                return self.cache_name
+
+            try:
+                if self.cache_name and now < self.expires_at:
+                    await self._refresh(now)
+                else:
+                    await self._create(now)
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.warning(f"Context cache unavailable, using inline prompt: {e}")
+                self.cache_name = None
+                self.expires_at = 0.0
+                self.disabled_until = now + self.retry_after_seconds
+
+            return self.cache_name
+
+    async def _create(self, now: float):
+        cached = await self.backend.create_cache(
+            model=self.model_name,
+            config=types.CreateCachedContentConfig(
+                display_name="tunjiax-voice-agent-prefix",
+                system_instruction=self.system_instruction,
+                tools=self.tools,
+                ttl=f"{self.ttl_seconds}s"
+            )
+        )
+        self.cache_name = cached.name
+        self.expires_at = now + self.ttl_seconds
+        self.stats["creates"] += 1
+        logger.info(f"Created context cache {cached.name} (ttl={self.ttl_seconds}s)")
+
+    async def _refresh(self, now: float):
+        await self.backend.update_cache(
+            name=self.cache_name,
+            config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s")
+        )
+        self.expires_at = now + self.ttl_seconds
+        self.stats["refreshes"] += 1
+        logger.info(f"Refreshed context cache {self.cache_name}")
+
+    def is_cache_error(self, error: Exception) -> bool:
+        """True if a generate_content failure looks like a missing/expired cache"""
+        if not self.cache_name:
+            return False
+        code = getattr(error, "code", None)
+        status = str(getattr(error, "status", "") or "").upper()
+        message = str(error).lower()
+        not_found = code == 404 or status == "NOT_FOUND" or "not_found" in message
+        # Permission/quota errors (403, 429) are not about the cache - recreating it won't help
+        return not_found and ("cachedcontent" in message or "cached content" in message
+                              or self.cache_name.lower() in message)
+
+    def invalidate(self):
+        """Drops the current cache reference so the next call re-creates it"""
+        if self.cache_name:
+            logger.info(f"Invalidating context cache {self.cache_name}")
+        self.stats["fallbacks"] += 1
+        self.cache_name = None
+        self.expires_at = 0.0
+
+    async def close(self):
+        """Deletes the provider-side cache (best effort)"""
+        if not self.cache_name:
+            return
+        try:
+            await self.backend.delete_cache(name=self.cache_name)
+        except Exception as e:
+            logger.warning(f"Failed to delete context cache: {e}")
+        self.cache_name = None
+        self.expires_at = 0.0
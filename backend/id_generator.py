@@ -0,0 +1,223 @@
+"""
+Time-ordered 64-bit IDs (Snowflake layout) for transactions.
+
+    | 41 bits: ms since 2024-01-01 | 10 bits: worker | 12 bits: sequence |
+
+IDs from one worker are strictly increasing and IDs across workers are unique,
+so inserts append to the right edge of the primary-key B-tree. Worker IDs come
+from ID_WORKER_ID or a slot leased from id_worker_leases (migration 011), never
+a hash, so two live processes cannot share one. Each ID has
+three equivalent forms:
+    int    - BIGINT UNSIGNED column (txn_key)
+    bytes  - BINARY(8), big-endian
+    string - "TXN" + 13 Crockford base32 chars; sorts lexically in ID order
+"""
+import os
+import time
+import uuid
+import socket
+import threading
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+TIMESTAMP_SHIFT = WORKER_BITS + SEQUENCE_BITS
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford base32
+_DECODE = {c: i for i, c in enumerate(ALPHABET)}
+STRING_WIDTH = 13  # ceil(64 / 5)
+LEASE_SECONDS = int(os.getenv("ID_WORKER_LEASE_SECONDS", "60"))
+
+
+def configured_worker_id() -> Optional[int]:
+    """ID_WORKER_ID if set (give each instance/job its own value)"""
+    configured = os.getenv("ID_WORKER_ID")
+    if configured is None:
+        return None
+    worker = int(configured)
+    if not 0 <= worker <= MAX_WORKER:
+        raise ValueError(f"ID_WORKER_ID must be between 0 and {MAX_WORKER}")
+    return worker
+
+
+class WorkerLease:
+    """
+    A worker slot leased from id_worker_leases, taken on first use and renewed by
+    a daemon thread. The lease is trusted only until LEASE_SECONDS after the last
+    successful claim/renewal started (local monotonic clock, so never later than
+    the DB-side expiry); past that, current() raises instead of issuing IDs from a
+    slot another process may have taken.
+    """
+    def __init__(self, seconds: int = LEASE_SECONDS):
+        self.seconds = seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.worker_id: Optional[int] = None
+        self.valid_until = 0.0
+        self._renewer: Optional[threading.Thread] = None
+
+    def current(self) -> int:
+        if time.monotonic() >= self.valid_until:
+            if self.worker_id is None or not self._renew():
+                self._acquire()
+        return self.worker_id
+
+    def _acquire(self):
+        started = time.monotonic()
+        worker_id = self._claim()
+        if worker_id is None:
+            raise RuntimeError("No free ID worker slot - set ID_WORKER_ID or check id_worker_leases")
+        self.worker_id, self.valid_until = worker_id, started + self.seconds
+        logger.info("Leased ID worker slot", extra={"worker_id": worker_id, "owner": self.owner})
+        if self._renewer is None:
+            self._renewer = threading.Thread(target=self._renew_loop, name="id-worker-lease", daemon=True)
+            self._renewer.start()
+
+    def _renew(self) -> bool:
+        """Extends the lease; False if it was lost to another process"""
+        started = time.monotonic()
+        if not self._extend():
+            logger.error("ID worker lease lost", extra={"worker_id": self.worker_id, "owner": self.owner})
+            self.valid_until = 0.0
+            return False
+        self.valid_until = started + self.seconds
+        return True
+
+    def _renew_loop(self):
+        while True:
+            time.sleep(self.seconds / 3)
+            try:
+                self._renew()
+            except Exception:
+                logger.exception("ID worker lease renewal failed")
+
+    def _claim(self) -> Optional[int]:
+        """Takes the longest-expired slot; None if all 1024 are live"""
+        from tools import get_db_connection  # tools imports this module
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                UPDATE id_worker_leases SET owner = %s, expires_at = NOW(3) + INTERVAL %s SECOND
+                WHERE expires_at < NOW(3) ORDER BY expires_at LIMIT 1
+                """,
+                (self.owner, self.seconds)
+            )
+            conn.commit()
+            cursor.execute("SELECT worker_id FROM id_worker_leases WHERE owner = %s ORDER BY expires_at DESC LIMIT 1",
+                (self.owner,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _extend(self) -> bool:
+        from tools import get_db_connection
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                UPDATE id_worker_leases SET expires_at = NOW(3) + INTERVAL %s SECOND
+                WHERE worker_id = %s AND owner = %s AND expires_at >= NOW(3)
+                """,
+                (self.seconds, self.worker_id, self.owner)
+            )
+            conn.commit()
+            return cursor.rowcount == 1
+        finally:
+            cursor.close()
+            conn.close()
+
+
+class IdGenerator:
+    def __init__(self, worker_id: int = None, lease: WorkerLease = None):
+        if worker_id is None:
+            worker_id = configured_worker_id()
+        if worker_id is not None and not 0 <= worker_id <= MAX_WORKER:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER}")
+        self._worker_id = worker_id
+        self._lease = (lease or WorkerLease()) if worker_id is None else None
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    @property
+    def worker_id(self) -> int:
+        """Fixed ID, or the leased slot (taken on first use)"""
+        return self._worker_id if self._lease is None else self._lease.current()
+
+    def next_id(self) -> int:
+        with self._lock:
+            worker_id = self.worker_id
+            now = self._now_ms()
+            if now < self._last_ms:
+                # Clock stepped backwards (NTP) - keep issuing from the last timestamp
+                # rather than risk duplicates; the sequence absorbs the gap.
+                now = self._last_ms
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # 4096 IDs this millisecond - wait for the next one
+                    while now <= self._last_ms:
+                        now = self._now_ms()
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return ((now - EPOCH_MS) << TIMESTAMP_SHIFT) | (worker_id << SEQUENCE_BITS) | self._sequence
+
+    def next_string(self, prefix: str = "TXN") -> str:
+        return to_string(self.next_id(), prefix)
+
+    @staticmethod
+    def _now_ms() -> int:
+        return time.time_ns() // 1_000_000
+
+
+def to_string(value: int, prefix: str = "TXN") -> str:
+    chars = []
+    for _ in range(STRING_WIDTH):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return prefix + "".join(reversed(chars))
+
+
+def from_string(text: str, prefix: str = "TXN") -> int:
+    body = text[len(prefix):] if text.startswith(prefix) else text
+    if len(body) != STRING_WIDTH:
+        raise ValueError(f"Not a generated ID: {text}")
+    value = 0
+    for char in body.upper():
+        value = (value << 5) | _DECODE[char]
+    return value
+
+
+def to_bytes(value: int) -> bytes:
+    return value.to_bytes(8, "big")
+
+
+def from_bytes(data: bytes) -> int:
+    return int.from_bytes(data, "big")
+
+
+def created_at(value: int) -> datetime:
+    """When the ID was issued (UTC)"""
+    return datetime.fromtimestamp(((value >> TIMESTAMP_SHIFT) + EPOCH_MS) / 1000, tz=timezone.utc)
+
+
+def max_id_at(when: datetime) -> int:
+    """Largest ID any worker could have issued at `when` - turns time ranges into key ranges"""
+    ms = int(when.timestamp() * 1000) - EPOCH_MS
+    return (max(ms, 0) << TIMESTAMP_SHIFT) | ((1 << TIMESTAMP_SHIFT) - 1)
+
+
+# One generator per process
+ids = IdGenerator()
@@ -0,0 +1,252 @@
+"""
+Append-only double-entry journal (migration 003_ledger.sql).
+
+Every movement of money is one journal with two or more entries whose amounts
+sum to zero. A positive amount increases that account's balance. User wallets
+are `accounts.account_id`; the other side of money entering or leaving the
+bank lives on negative-ID system accounts.
+
+`accounts.balance_kobo` is a cached projection, updated in the same DB
+transaction as the entries. Balances at a point in time come from the latest
+`balance_snapshots` row at or before it (index seek) plus the entries after it
+(bounded by LEDGER_SNAPSHOT_EVERY). Journal IDs are time-ordered
+(id_generator), so time ranges are primary-key ranges.
+
+`reconcile()` checks, incrementally from a watermark, that new journals balance
+and that every touched account's projection matches snapshot + journal,
+then writes fresh snapshots for busy accounts.
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from id_generator import ids, max_id_at
+from metrics import LEDGER_DISCREPANCIES
+from tools import get_db_connection, timed_query
+
+logger = logging.getLogger(__name__)
+
+# System accounts (never in `accounts`)
+EXTERNAL_SETTLEMENT = -1  # money sent to / received from other banks
+WALLET_FUNDING = -2       # simulated card/bank top-ups
+OPENING_BALANCES = -3     # balances that existed before the ledger
+
+SNAPSHOT_EVERY = int(os.getenv("LEDGER_SNAPSHOT_EVERY", "100"))
+# Journals newer than this are left for the next run, so a slow commit with an
+# older ID can never land behind the watermark
+RECONCILE_LAG_SECONDS = float(os.getenv("LEDGER_RECONCILE_LAG", "60"))
+RECONCILE_BATCH = int(os.getenv("LEDGER_RECONCILE_BATCH", "5000"))
+
+
+class UnbalancedJournal(ValueError):
+    pass
+
+
+def _check_legs(legs: Sequence[Tuple[int, int]]):
+    if len(legs) < 2 or sum(amount for _, amount in legs) != 0:
+        raise UnbalancedJournal(f"Journal legs must balance: {legs}")
+    if len({account_id for account_id, _ in legs}) != len(legs):
+        raise UnbalancedJournal(f"One leg per account: {legs}")
+
+
+def post_journal(cursor, kind: str, legs: Sequence[Tuple[int, int]], reference: str = None,
+                 journal_id: int = None) -> int:
+    """
+    Appends one journal and updates the balance projection of user accounts.
+    Runs inside the caller's transaction; the caller locks the accounts it
+    checked (SELECT ... FOR UPDATE) and commits.
+
+    legs: (account_id, amount_kobo) pairs summing to zero, one per account.
+    """
+    journal_id = journal_id or ids.next_id()
+    post_journals(cursor, [(journal_id, kind, reference, legs)])
+    return journal_id
+
+
+def post_journals(cursor, journals: Sequence[Tuple[int, str, Optional[str], Sequence[Tuple[int, int]]]]):
+    """
+    Bulk form of post_journal: (journal_id, kind, reference, legs) tuples written with
+    one executemany per table, and one projection update per distinct account.
+    """
+    for _, _, _, legs in journals:
+        _check_legs(legs)
+
+    deltas: Dict[int, int] = {}
+    for _, _, _, legs in journals:
+        for account_id, amount in legs:
+            if account_id > 0:
+                deltas[account_id] = deltas.get(account_id, 0) + amount
+
+    with timed_query("ledger_insert_journal"):
+        cursor.executemany(
+            "INSERT INTO journal_transactions (journal_id, kind, reference, created_at) VALUES (%s, %s, %s, NOW(3))",
+            [(journal_id, kind, reference) for journal_id, kind, reference, _ in journals]
+        )
+        cursor.executemany(
+            "INSERT INTO journal_entries (journal_id, account_id, amount_kobo) VALUES (%s, %s, %s)",
+            [(journal_id, account_id, amount) for journal_id, _, _, legs in journals for account_id, amount in legs]
+        )
+    if deltas:
+        with timed_query("ledger_update_projection"):
+            cursor.executemany(
+                "UPDATE accounts SET balance_kobo = balance_kobo + %s WHERE account_id = %s",
+                [(amount, account_id) for account_id, amount in sorted(deltas.items())]
+            )
+
+
+def balance_at(cursor, account_id: int, when: datetime) -> int:
+    """Balance after every journal issued at or before `when`"""
+    upper = max_id_at(when)
+    with timed_query("ledger_snapshot_seek"):
+        cursor.execute(
+            """
+            SELECT journal_id, balance_kobo FROM balance_snapshots
+            WHERE account_id = %s AND journal_id <= %s
+            ORDER BY journal_id DESC LIMIT 1
+            """,
+            (account_id, upper)
+        )
+        snapshot = cursor.fetchone()
+    since, balance = snapshot if snapshot else (0, 0)
+    with timed_query("ledger_entries_since_snapshot"):
+        cursor.execute(
+            """
+            SELECT COALESCE(SUM(amount_kobo), 0) FROM journal_entries
+            WHERE account_id = %s AND journal_id > %s AND journal_id <= %s
+            """,
+            (account_id, since, upper)
+        )
+        return int(balance + cursor.fetchone()[0])
+
+
+def _reconcile_account(cursor, account_id: int, upper: int) -> Optional[dict]:
+    """Projection check for one account; writes a snapshot when enough entries accumulated"""
+    cursor.execute(
+        """
+        SELECT journal_id, balance_kobo FROM balance_snapshots
+        WHERE account_id = %s ORDER BY journal_id DESC LIMIT 1
+        """,
+        (account_id,)
+    )
+    since, snapshot_balance = cursor.fetchone() or (0, 0)
+    cursor.execute(
+        """
+        SELECT COALESCE(SUM(amount_kobo), 0),
+               COALESCE(SUM(CASE WHEN journal_id <= %s THEN amount_kobo END), 0),
+               SUM(journal_id <= %s), MAX(CASE WHEN journal_id <= %s THEN journal_id END)
+        FROM journal_entries WHERE account_id = %s AND journal_id > %s
+        """,
+        (upper, upper, upper, account_id, since)
+    )
+    total, through_upper, count, last_journal = cursor.fetchone()
+    cursor.execute("SELECT balance_kobo FROM accounts WHERE account_id = %s", (account_id,))
+    row = cursor.fetchone()
+    projected = row[0] if row else None
+    expected = int(snapshot_balance + total)
+
+    if projected != expected:
+        return {"account_id": account_id, "projection": projected, "journal": expected}
+    if count and count >= SNAPSHOT_EVERY:
+        cursor.execute(
+            """
+            INSERT IGNORE INTO balance_snapshots (account_id, journal_id, balance_kobo, created_at)
+            VALUES (%s, %s, %s, NOW())
+            """,
+            (account_id, last_journal, int(snapshot_balance + through_upper))
+        )
+    return None
+
+
+def reconcile(now: datetime = None) -> dict:
+    """
+    Verifies journals after the watermark up to (now - LEDGER_RECONCILE_LAG).
+    Reads run in one consistent InnoDB snapshot so concurrent postings cannot
+    produce false mismatches. Only one instance runs it at a time (GET_LOCK).
+    """
+    upper = max_id_at((now or datetime.now()) - timedelta(seconds=RECONCILE_LAG_SECONDS))
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK('ledger_reconcile', 0)")
+        if not cursor.fetchone()[0]:
+            return {"skipped": "running elsewhere"}
+        try:
+            cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+            cursor.execute("SELECT journal_id FROM ledger_checkpoints WHERE name = 'reconcile'")
+            watermark = cursor.fetchone()[0]
+
+            # Cap the work per run; the watermark moves to the last journal checked
+            cursor.execute(
+                """
+                SELECT journal_id FROM journal_transactions
+                WHERE journal_id > %s AND journal_id <= %s
+                ORDER BY journal_id LIMIT 1 OFFSET %s
+                """,
+                (watermark, upper, RECONCILE_BATCH)
+            )
+            capped = cursor.fetchone()
+            if capped:
+                upper = capped[0] - 1
+
+            with timed_query("ledger_reconcile_journals"):
+                cursor.execute(
+                    """
+                    SELECT journal_id, SUM(amount_kobo), COUNT(*) FROM journal_entries
+                    WHERE journal_id > %s AND journal_id <= %s
+                    GROUP BY journal_id HAVING SUM(amount_kobo) <> 0 OR COUNT(*) < 2
+                    """,
+                    (watermark, upper)
+                )
+                unbalanced = [{"journal_id": j, "sum": int(total), "entries": n} for j, total, n in cursor.fetchall()]
+                cursor.execute(
+                    """
+                    SELECT DISTINCT account_id FROM journal_entries
+                    WHERE journal_id > %s AND journal_id <= %s AND account_id > 0
+                    """,
+                    (watermark, upper)
+                )
+                touched = [row[0] for row in cursor.fetchall()]
+
+            mismatched: List[Dict] = []
+            with timed_query("ledger_reconcile_accounts"):
+                for account_id in touched:
+                    mismatch = _reconcile_account(cursor, account_id, upper)
+                    if mismatch:
+                        mismatched.append(mismatch)
+
+            cursor.execute(
+                "UPDATE ledger_checkpoints SET journal_id = %s, updated_at = NOW() WHERE name = 'reconcile' AND journal_id < %s",
+                (upper, upper)
+            )
+            conn.commit()
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('ledger_reconcile')")
+            cursor.fetchall()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    for item in unbalanced:
+        LEDGER_DISCREPANCIES.inc("unbalanced_journal")
+        logger.error("Unbalanced journal", extra=item)
+    for item in mismatched:
+        LEDGER_DISCREPANCIES.inc("projection_mismatch")
+        logger.error("Balance projection differs from journal", extra=item)
+    report = {"watermark": upper, "accounts_checked": len(touched), "unbalanced": unbalanced, "mismatched": mismatched}
+    logger.info("Ledger reconciled", extra={k: v for k, v in report.items() if k not in ("unbalanced", "mismatched")})
+    return report
+
+
+async def reconciliation_loop(interval_seconds: float = None):
+    """Runs reconcile() periodically for the lifetime of the process"""
+    interval = interval_seconds or float(os.getenv("LEDGER_RECONCILE_INTERVAL", "300"))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(reconcile)
+        except Exception:
+            logger.exception("Ledger reconciliation failed")
@@ -0,0 +1,273 @@
+import os
+import json
+import logging
+import time
+import random
+import asyncio
+import hashlib
+from typing import Callable, List, Optional, Union
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackend:
+    """
+    Minimal interface VoiceAgent needs from an LLM provider.
+    Implementations: GenAIBackend (Vertex AI), RecordingBackend, ReplayBackend, ScriptedBackend.
+    """
+    async def generate_content(self, model: str, contents: list, config=None) -> types.GenerateContentResponse:
+        raise NotImplementedError
+
+    async def create_cache(self, model: str, config: types.CreateCachedContentConfig) -> types.CachedContent:
+        raise NotImplementedError("Context caching not supported by this backend")
+
+    async def update_cache(self, name: str, config: types.UpdateCachedContentConfig):
+        raise NotImplementedError("Context caching not supported by this backend")
+
+    async def delete_cache(self, name: str):
+        raise NotImplementedError("Context caching not supported by this backend")
+
+
+class GenAIBackend(LLMBackend):
+    """Google Gen AI SDK on Vertex AI (production)"""
+    def __init__(self, project_id: str, location: str):
+        from google import genai
+        from google.oauth2 import service_account
+
+        # Load service account credentials explicitly
+        credentials_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+        if credentials_path and os.path.exists(credentials_path):
+            credentials = service_account.Credentials.from_service_account_file(
+                credentials_path,
+                scopes=["https://www.googleapis.com/auth/cloud-platform"]
+            )
+        else:
+            credentials = None
+
+        # Initialize Google Gen AI Client with Vertex AI backend
+        client_kwargs = {
+            'vertexai': True,
+            'project': project_id,
+            'location': location
+        }
+        if credentials:
+            client_kwargs['credentials'] = credentials
+
+        self.client = genai.Client(**client_kwargs)
+
+    async def generate_content(self, model, contents, config=None):
+        return await self.client.aio.models.generate_content(model=model, contents=contents, config=config)
+
+    async def create_cache(self, model, config):
+        return await self.client.aio.caches.create(model=model, config=config)
+
+    async def update_cache(self, name, config):
+        return await self.client.aio.caches.update(name=name, config=config)
+
+    async def delete_cache(self, name):
+        return await self.client.aio.caches.delete(name=name)
+
+
+def request_key(model: str, contents: list) -> str:
+    """
+    Stable key for a request. Only the model and conversation are hashed -
+    the config is left out so cached and inline prompts replay the same response.
+    """
+    serialized = [
+        c.model_dump(mode="json", exclude_none=True) if hasattr(c, "model_dump") else c
+        for c in contents
+    ]
+    raw = json.dumps({"model": model, "contents": serialized}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RecordingBackend(LLMBackend):
+    """
+    Proxies another backend and appends every request/response pair to a JSONL file.
+    Use against live Vertex AI to capture fixtures for ReplayBackend.
+    """
+    def __init__(self, inner: LLMBackend, path: str):
+        self.inner = inner
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    async def generate_content(self, model, contents, config=None):
+        start = time.perf_counter()
+        response = await self.inner.generate_content(model, contents, config)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        record = {
+            "key": request_key(model, contents),
+            "model": model,
+            "latency_ms": round(latency_ms, 1),
+            "request": [c.model_dump(mode="json", exclude_none=True) for c in contents],
+            "response": response.model_dump(mode="json", exclude_none=True),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        return response
+
+    async def create_cache(self, model, config):
+        return await self.inner.create_cache(model, config)
+
+    async def update_cache(self, name, config):
+        return await self.inner.update_cache(name, config)
+
+    async def delete_cache(self, name):
+        return await self.inner.delete_cache(name)
+
+
+class ReplayBackend(LLMBackend):
+    """
+    Serves responses captured by RecordingBackend.
+
+    Lookup is by request key; unmatched requests fall back to the recordings
+    in file order (so slightly different prompts still get a plausible answer).
+
+    latency_ms: fixed synthetic latency, or None to replay the recorded latency
+    jitter_ms: uniform +/- jitter added on top
+    """
+    def __init__(self, path: str, latency_ms: Optional[float] = None, jitter_ms: float = 0.0, strict: bool = False):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.strict = strict
+        self.by_key = {}
+        self.ordered = []
+        self._cursor = 0
+        self.hits = 0
+        self.misses = 0
+
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = types.GenerateContentResponse.model_validate(record["response"])
+                entry = (response, record.get("latency_ms", 0.0))
+                self.by_key.setdefault(record["key"], []).append(entry)
+                self.ordered.append(entry)
+
+        if not self.ordered:
+            raise ValueError(f"No recordings found in {path}")
+
+    async def generate_content(self, model, contents, config=None):
+        candidates = self.by_key.get(request_key(model, contents))
+        if candidates:
+            self.hits += 1
+            response, recorded_ms = candidates[0]
+        elif self.strict:
+            raise KeyError("No recorded response for this request")
+        else:
+            self.misses += 1
+            response, recorded_ms = self.ordered[self._cursor % len(self.ordered)]
+            self._cursor += 1
+
+        delay_ms = recorded_ms if self.latency_ms is None else self.latency_ms
+        if self.jitter_ms:
+            delay_ms += random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+        return response.model_copy(deep=True)
+
+
+def text_response(text: str) -> types.GenerateContentResponse:
+    """Builds a model response containing plain text"""
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))]
+    )
+
+
+def function_call_response(name: str, args: dict = None) -> types.GenerateContentResponse:
+    """Builds a model response containing a single function call"""
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(
+            role="model",
+            parts=[types.Part(function_call=types.FunctionCall(name=name, args=args or {}))]
+        ))]
+    )
+
+
+ScriptStep = Union[str, dict, types.GenerateContentResponse, Callable[[list], types.GenerateContentResponse]]
+
+
+class ScriptedBackend(LLMBackend):
+    """
+    Deterministic fake for tests and load runs.
+
+    Each step is one of:
+    - "text"                                      -> text response
+    - {"function_call": "name", "args": {...}}    -> function call response
+    - a GenerateContentResponse                   -> returned as-is
+    - callable(contents) -> GenerateContentResponse
+
+    Steps are consumed in order; with loop=True the script repeats forever.
+    """
+    def __init__(self, steps: List[ScriptStep], latency_ms: float = 0.0, loop: bool = True):
+        if not steps:
+            raise ValueError("ScriptedBackend needs at least one step")
+        self.steps = steps
+        self.latency_ms = latency_ms
+        self.loop = loop
+        self._index = 0
+        self.calls = 0
+        self.total_latency = 0.0
+
+    def _next_step(self) -> ScriptStep:
+        if self._index >= len(self.steps):
+            if not self.loop:
+                raise IndexError("ScriptedBackend script exhausted")
+            self._index = 0
+        step = self.steps[self._index]
+        self._index += 1
+        return step
+
+    async def generate_content(self, model, contents, config=None):
+        start = time.perf_counter()
+        step = self._next_step()
+
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        if callable(step):
+            response = step(contents)
+        elif isinstance(step, str):
+            response = text_response(step)
+        elif isinstance(step, dict):
+            response = function_call_response(step["function_call"], step.get("args"))
+        else:
+            response = step.model_copy(deep=True)
+
+        self.calls += 1
+        self.total_latency += time.perf_counter() - start
+        return response
+
+
+def create_backend_from_env(project_id: str, location: str) -> LLMBackend:
+    """
+    LLM_BACKEND selects the backend:
+    - vertex (default): live Vertex AI
+    - record: live Vertex AI, captured to LLM_RECORD_PATH
+    - replay: serve LLM_RECORD_PATH with LLM_REPLAY_LATENCY_MS (default: recorded latency)
+    """
+    mode = os.getenv("LLM_BACKEND", "vertex").lower()
+    record_path = os.getenv("LLM_RECORD_PATH", "recordings/gemini.jsonl")
+
+    if mode == "replay":
+        latency = os.getenv("LLM_REPLAY_LATENCY_MS")
+        logger.info(f"Using replay backend: {record_path}")
+        return ReplayBackend(
+            record_path,
+            latency_ms=float(latency) if latency else None,
+            jitter_ms=float(os.getenv("LLM_REPLAY_JITTER_MS", "0"))
+        )
+
+    backend = GenAIBackend(project_id, location)
+    if mode == "record":
+        logger.info(f"Recording Gemini traffic to {record_path}")
+        return RecordingBackend(backend, record_path)
+    return backend
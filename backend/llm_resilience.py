@@ -0,0 +1,249 @@
+import os
+import time
+import logging
+import random
+import asyncio
+from collections import deque
+from llm_backend import LLMBackend
+
+logger = logging.getLogger(__name__)
+
+# HTTP-ish status codes worth retrying (rate limits, overload, upstream timeouts)
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMUnavailableError(Exception):
+    """Gemini could not be reached within the retry budget"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Circuit breaker is open - failing fast without calling Gemini"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection problems and 408/429/5xx responses are retryable"""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_CODES
+    message = str(error).lower()
+    return any(marker in message for marker in ("unavailable", "resource_exhausted", "deadline", "timed out"))
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies, used to pick the hedge delay"""
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * p))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    closed    -> calls flow; `failure_threshold` consecutive failures opens the circuit
+    open      -> calls fail fast until `reset_timeout` has passed
+    half_open -> one probe call; success closes, failure re-opens
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self.probe_in_flight = False
+        # half_open: let exactly one probe through
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Returns True if this failure opened the circuit"""
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            was_open = self.state == "open"
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            return not was_open
+        return False
+
+
+class ResilientBackend(LLMBackend):
+    """
+    Wraps an LLMBackend with:
+    - a per-call deadline
+    - jittered exponential backoff retries on retryable errors
+    - optional hedging: a second identical request after the observed p95 latency
+    - a circuit breaker that fails fast once Gemini looks down
+    Outcome counters live in `self.metrics`.
+    """
+    def __init__(
+        self,
+        inner: LLMBackend,
+        call_timeout: float = 20.0,
+        max_attempts: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 2.0,
+        hedge_enabled: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_min_samples: int = 20,
+        breaker: CircuitBreaker = None
+    ):
+        self.inner = inner
+        self.call_timeout = call_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.metrics = {
+            "calls": 0,
+            "success": 0,
+            "failure": 0,
+            "non_retryable": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "short_circuited": 0,
+            "circuit_opened": 0,
+        }
+
+    @classmethod
+    def from_env(cls, inner: LLMBackend):
+        """Configured from LLM_* env vars (timeouts in seconds)"""
+        return cls(
+            inner,
+            call_timeout=float(os.getenv("LLM_CALL_TIMEOUT", "20")),
+            max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+            hedge_enabled=os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes"),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+            )
+        )
+
+    def hedge_delay(self):
+        """p95 of recent latencies, or None until we have enough samples"""
+        if not self.hedge_enabled or len(self.latency.samples) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def generate_content(self, model, contents, config=None):
+        self.metrics["calls"] += 1
+
+        if not self.breaker.allow():
+            self.metrics["short_circuited"] += 1
+            raise CircuitOpenError("Gemini circuit is open")
+
+        try:
+            return await self._attempts(model, contents, config)
+        except asyncio.CancelledError:
+            # Barge-in or a losing hedge: not a health signal, but a half-open probe must be released
+            self.breaker.probe_in_flight = False
+            raise
+
+    async def _attempts(self, model, contents, config):
+        """Deadline + retry loop for one admitted call"""
+        last_error = None
+        for attempt in range(1, self.max_attempts + 1):
+            start = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    self._call(model, contents, config),
+                    timeout=self.call_timeout
+                )
+            except Exception as e:
+                last_error = e
+                if isinstance(e, asyncio.TimeoutError):
+                    self.metrics["timeouts"] += 1
+
+                if not is_retryable(e):
+                    # Bad request etc. - our problem, not Gemini's health
+                    self.metrics["non_retryable"] += 1
+                    self.breaker.probe_in_flight = False
+                    raise
+
+                if attempt < self.max_attempts:
+                    self.metrics["retries"] += 1
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+                    logger.warning(f"Attempt {attempt} failed ({type(e).__name__}: {e}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                break
+            else:
+                self.latency.record(time.monotonic() - start)
+                self.breaker.record_success()
+                self.metrics["success"] += 1
+                return response
+
+        self.metrics["failure"] += 1
+        if self.breaker.record_failure():
+            self.metrics["circuit_opened"] += 1
+            logger.warning(f"Circuit opened after {self.breaker.failures} consecutive failures")
+        raise LLMUnavailableError(f"Gemini unavailable after {self.max_attempts} attempts: {last_error}") from last_error
+
+    async def _call(self, model, contents, config):
+        """One attempt, hedged with a duplicate request if the primary is slow"""
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self.inner.generate_content(model, contents, config)
+
+        primary = asyncio.ensure_future(self.inner.generate_content(model, contents, config))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self.metrics["hedges"] += 1
+        hedge = asyncio.ensure_future(self.inner.generate_content(model, contents, config))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.metrics["hedge_wins"] += 1
+                        return task.result()
+            # Both failed - surface the primary's error
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+
+    async def create_cache(self, model, config):
+        return await self.inner.create_cache(model, config)
+
+    async def update_cache(self, name, config):
+        return await self.inner.update_cache(name, config)
+
+    async def delete_cache(self, name):
+        return await self.inner.delete_cache(name)
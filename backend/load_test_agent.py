@@ -0,0 +1,130 @@
+"""
+VoiceAgent Load Harness - no Vertex AI, no database
+Drives concurrent "Send 5k to Bisola" conversations through VoiceAgent.process_input
+using a scripted (or replayed) Gemini backend, and reports our own overhead per turn.
+
+Run:
+    python load_test_agent.py                          # scripted fake, 0ms model latency
+    python load_test_agent.py --latency-ms 300         # scripted fake with synthetic latency
+    python load_test_agent.py --latency-ms 300 --db-latency-ms 40   # shows prefetch savings
+    python load_test_agent.py --replay recordings/gemini.jsonl --latency-ms 200
+
+Record fixtures from live traffic with LLM_BACKEND=record (see llm_backend.py).
+"""
+import time
+import asyncio
+import argparse
+import statistics
+import tools
+from llm_backend import ScriptedBackend, ReplayBackend, text_response, function_call_response
+from voice_agent import VoiceAgent
+
+CONVERSATION = [
+    "Send 5k to Bisola",
+    "Yes, go ahead",
+    "Thanks, that's all",
+]
+
+
+def scripted_responder(contents):
+    """Plays Gemini for the transfer flow based on the latest message"""
+    last_text = "".join(p.text or "" for p in contents[-1].parts).lower()
+
+    if last_text.startswith("[tool result for lookup_beneficiary]"):
+        return text_response("I found Bisola Adebayo (TunjiaX: 0123456789). Confirm you want to send ₦5,000?")
+    if "send" in last_text:
+        return function_call_response("lookup_beneficiary", {"name": "Bisola"})
+    if "yes" in last_text:
+        return function_call_response("trigger_biometric_auth")
+    return text_response("You're welcome! Anything else?")
+
+
+DB_LATENCY = 0.0  # seconds, set from --db-latency-ms
+
+
+def fake_lookup_beneficiary(name: str, user_id: int = 1):
+    """In-memory stand-in so the harness measures agent overhead, not MySQL"""
+    time.sleep(DB_LATENCY)
+    return {
+        "alias": name,
+        "name": "Bisola Adebayo",
+        "account": "0123456789",
+        "bank": "TunjiaX",
+        "frequency": 3
+    }
+
+
+def fake_get_balance(user_id: int = 1):
+    time.sleep(DB_LATENCY)
+    return {"balance_kobo": 5000000, "balance_ngn": "₦50,000.00"}
+
+
+async def run_session(agent: VoiceAgent, session_index: int, latencies: list):
+    session_id = f"load_{session_index}"
+    for text in CONVERSATION:
+        start = time.perf_counter()
+        await agent.process_input(text, user_id=1, session_id=session_id)
+        latencies.append(time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="VoiceAgent load harness")
+    parser.add_argument("--sessions", type=int, default=200, help="total conversations")
+    parser.add_argument("--concurrency", type=int, default=50, help="conversations in flight")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="synthetic model latency per call")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated DB query latency")
+    parser.add_argument("--replay", help="replay a recorded JSONL file instead of the scripted fake")
+    args = parser.parse_args()
+
+    global DB_LATENCY
+    DB_LATENCY = args.db_latency_ms / 1000
+    tools.lookup_beneficiary = fake_lookup_beneficiary
+    tools.get_balance = fake_get_balance
+
+    if args.replay:
+        backend = ReplayBackend(args.replay, latency_ms=args.latency_ms)
+    else:
+        backend = ScriptedBackend([scripted_responder], latency_ms=args.latency_ms)
+
+    agent = VoiceAgent(project_id="load-test", location="local", backend=backend)
+    agent.context_cache.enabled = False
+
+    print("\n" + "=" * 70)
+    print(f"🧪 VoiceAgent load: {args.sessions} sessions, concurrency={args.concurrency}, "
+          f"model latency={args.latency_ms}ms ({'replay' if args.replay else 'scripted'})")
+    print("=" * 70)
+
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(i):
+        async with semaphore:
+            await run_session(agent, i, latencies)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bounded(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+
+    turns = len(latencies)
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(turns * 0.95) - 1] * 1000
+    mean = statistics.mean(latencies) * 1000
+
+    model_calls = backend.calls if isinstance(backend, ScriptedBackend) else backend.hits + backend.misses
+    model_ms_per_turn = args.latency_ms * model_calls / turns
+
+    print(f"\n   Turns:              {turns} in {elapsed:.2f}s ({turns / elapsed:.0f} turns/s)")
+    print(f"   Model calls:        {model_calls} ({model_calls / turns:.2f} per turn)")
+    print(f"   Turn latency:       p50={p50:.2f}ms  p95={p95:.2f}ms  mean={mean:.2f}ms")
+    print(f"   Model time / turn:  {model_ms_per_turn:.2f}ms (synthetic)")
+    print(f"   ✅ Our overhead / turn: {mean - model_ms_per_turn:.2f}ms")
+
+    prefetch = agent.prefetcher.summary()
+    print(f"\n   Prefetch hit rate:  {prefetch['hit_rate']:.0%} "
+          f"({prefetch['lookup_hits']} hits / {prefetch['lookup_misses']} misses, {prefetch['wasted']} wasted)")
+    print(f"   Prefetch saved:     {prefetch['saved_seconds'] * 1000 / turns:.2f}ms / turn")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,175 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+import contextvars
+from datetime import datetime, timezone
+
+# Correlation IDs for the request currently being handled (set by middleware in main.py)
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+session_id_var: contextvars.ContextVar = contextvars.ContextVar("session_id", default=None)
+user_id_var: contextvars.ContextVar = contextvars.ContextVar("user_id", default=None)
+
+# Keys whose values never reach the log output
+SENSITIVE_KEYS = ("authorization", "cookie", "token", "secret", "password", "api-key", "api_key", "x-api-key")
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id", "session_id", "user_id"
+}
+
+_listener = None
+
+
+def is_sensitive(key: str) -> bool:
+    key = key.lower()
+    return any(marker in key for marker in SENSITIVE_KEYS)
+
+
+def redact(value, key: str = ""):
+    """Recursively masks sensitive values (keeps a short prefix to aid debugging)"""
+    if key and is_sensitive(key):
+        text = str(value)
+        return f"{text[:6]}…[redacted]" if len(text) > 12 else "[redacted]"
+    if isinstance(value, dict):
+        return {k: redact(v, str(k)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+def redact_headers(headers) -> dict:
+    """Header mapping -> plain dict with auth/cookie values masked"""
+    return {k: redact(v, k) for k, v in dict(headers).items()}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, in the shape Cloud Logging understands"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "severity": record.levelname,
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("request_id", "session_id", "user_id"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and key not in entry:
+                entry[key] = redact(value, key)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable output for local development"""
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s [%(name)s] %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = {k: redact(v, k) for k, v in record.__dict__.items() if k not in _RESERVED}
+        if extras:
+            line += " " + " ".join(f"{k}={v}" for k, v in extras.items())
+        return line
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them on the caller's thread.
+    (The stock QueueHandler copies the record and formats the whole line before enqueueing.)
+    This is the only root handler, so the record is safe to modify in place.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class ContextFilter(logging.Filter):
+    """Stamps correlation IDs onto the record in the caller's context (before queueing)"""
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.session_id = session_id_var.get()
+        record.user_id = user_id_var.get()
+        return True
+
+
+def payload_sample_rate() -> float:
+    return float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+
+
+def should_log_payload(logger: logging.Logger) -> bool:
+    """
+    The one sampling point for payload logs: True for LOG_PAYLOAD_SAMPLE_RATE of
+    calls when DEBUG is on. Callers check it before building large payload strings.
+    """
+    return logger.isEnabledFor(logging.DEBUG) and random.random() < payload_sample_rate()
+
+
+def parse_levels(spec: str) -> dict:
+    """"voice_agent=DEBUG,tools=WARNING" -> {"voice_agent": "DEBUG", "tools": "WARNING"}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """
+    Routes all logging through a QueueHandler so request handlers never block on I/O;
+    a background QueueListener thread formats and writes to stdout.
+
+    LOG_LEVEL                default level (INFO)
+    LOG_LEVELS               per-module overrides, e.g. "voice_agent=DEBUG,tools=WARNING"
+    LOG_FORMAT               json (default) or text
+    LOG_PAYLOAD_SAMPLE_RATE  fraction of verbose payload logs kept (0.01)
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    # Process/multiprocessing lookups on every record are wasted work in a single-process server
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+    formatter = JsonFormatter() if os.getenv("LOG_FORMAT", "json").lower() == "json" else TextFormatter()
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flushes queued records (called at exit)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,41 +1,205 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
 import os
 import json
+import uuid
 import asyncio
-import time
+import logging
+from contextlib import asynccontextmanager
+from datetime import date, datetime
 from typing import List, Optional, Dict, Any, Union
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Header
-from fastapi.responses import StreamingResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, Field
+from fastapi import FastAPI, WebSocket, HTTPException, Header, Request
+from fastapi.responses import StreamingResponse, Response, JSONResponse
+from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from voice_agent import VoiceAgent
 from dotenv import load_dotenv
-from auth import verify_google_token, get_or_create_user, create_access_token
+from auth import verify_google_token, get_or_create_user, create_access_token, verify_access_token
+from request_parser import fast_parse_chat_request, ChatRequestFields
+from ws_stream import handle_voice_stream
+from admission import AdmissionController
+from metrics import (
+    REGISTRY, CONTENT_TYPE, Gauge, counter_lines, HTTP_REQUESTS, HTTP_LATENCY,
+    FACE_QUEUE_DEPTH, FACE_INFERENCE_LATENCY, FACE_VERIFICATIONS
+)
+from tracing import span, start_trace, EXPORTER as TRACE_EXPORTER
+from static_files import StaticSite
+from compression import CompressionMiddleware
+from columnar import wants_columnar, columnar_response, TRANSACTION_COLUMNS, BENEFICIARY_COLUMNS
+from startup import Warmup, warm_face_model, session_reaper
+from ledger import reconciliation_loop
+from scheduler import scheduler as transfer_scheduler
+import notifications
+import tools
+from sse_encoder import ChatCompletionStreamEncoder, DONE as SSE_DONE
+from logging_config import setup_logging, redact_headers, should_log_payload, request_id_var, session_id_var, user_id_var
 
 load_dotenv()
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Content deltas flushed per SSE write (1 = word-by-word, as ElevenLabs expects by default)
+SSE_WORDS_PER_WRITE = max(1, int(os.getenv("SSE_WORDS_PER_WRITE", "1")))
+
+def create_agent() -> VoiceAgent:
+    # Gemini client + credentials; runs in a worker thread during startup
+    return VoiceAgent(
+        project_id=os.getenv("GCP_PROJECT", "tunjiax-wallet"),
+        location=os.getenv("GCP_LOCATION", "us-central1")
+    )
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup, timed per stage (see /api/ready):
+    - before serving: Gemini client (VoiceAgent) and DB pool, in parallel
+    - in the background: face model, Gemini context cache
+    - session reaper, ledger reconciliation, the transfer scheduler and the notification outbox
+      dispatcher for the lifetime of the process
+    """
+    global agent
+    warmup = app.state.warmup = Warmup(import_seconds=IMPORT_SECONDS)
+    logger.info("Startup begin", extra={"import_seconds": round(IMPORT_SECONDS, 3)})
+
+    # A DB outage keeps the instance unready (connections are retried per request); no agent is fatal
+    agent, _ = await asyncio.gather(
+        warmup.stage("genai_client", lambda: asyncio.to_thread(create_agent)),
+        warmup.stage("db_pool", lambda: asyncio.to_thread(tools.pool.warm, int(os.getenv("DB_POOL_WARM", "2")))),
+        return_exceptions=True
+    )
+    if isinstance(agent, BaseException):
+        raise agent
+
+    background = [("context_cache", lambda: agent.context_cache.get_config(), False)]
+    if os.getenv("FACE_WARMUP", "1").lower() not in ("0", "false", "no"):
+        background.append(("face_model", lambda: asyncio.to_thread(warm_face_model), False))
+    warmup.start_background(background)
+    reaper = asyncio.create_task(session_reaper(agent.session_manager))
+    reconciler = asyncio.create_task(reconciliation_loop()) if os.getenv("LEDGER_RECONCILE_INTERVAL", "300") != "0" else None
+    if os.getenv("SCHEDULER_ENABLED", "1").lower() not in ("0", "false", "no"):
+        transfer_scheduler.start()
+    if os.getenv("NOTIFICATIONS_ENABLED", "1").lower() not in ("0", "false", "no"):
+        notifications.dispatcher.start()
+
+    yield
+
+    reaper.cancel()
+    if reconciler:
+        reconciler.cancel()
+    await transfer_scheduler.stop()
+    await notifications.dispatcher.stop()
+    await warmup.stop()
+    await agent.context_cache.close()
+    await asyncio.to_thread(tools.pool.close)
+
+app = FastAPI(lifespan=lifespan)
+
+# br/gzip for complete responses above the threshold; SSE and precompressed static files pass through
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")))
+
+# Per-route-class concurrency limits + per-user token buckets (fast 429 + Retry-After)
+admission = AdmissionController.from_env()
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    return await admission.handle(request, call_next)
+
+@app.middleware("http")
+async def correlation_ids(request: Request, call_next):
+    """Tags every log line for this request with request/session IDs"""
+    request_id = request.headers.get("x-request-id")
+    if not request_id:
+        # Cloud Run: "TRACE_ID/SPAN_ID;o=1"
+        trace = request.headers.get("x-cloud-trace-context", "")
+        request_id = trace.split("/")[0] if trace else uuid.uuid4().hex[:16]
+    request_id_var.set(request_id)
+    session_id_var.set(request.headers.get("x-session-id"))
+    user_id_var.set(request.headers.get("x-user-id"))
+    
+    response = await call_next(request)
+    response.headers["x-request-id"] = request_id
+    return response
 
-# Allow CORS for local frontend testing
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """
+    Per-route request count and latency (route template, not raw path, to bound cardinality),
+    and the root trace span - continuing the caller's trace from traceparent / x-cloud-trace-context.
+    """
+    start = time.perf_counter()
+    status = 500
+    with start_trace(f"{request.method} {request.url.path}", request.headers) as root:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            if root.traceparent():
+                response.headers["traceparent"] = root.traceparent()
+            return response
+        finally:
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            HTTP_LATENCY.observe(time.perf_counter() - start, request.method, route)
+            HTTP_REQUESTS.inc(request.method, route, status)
+            if root.trace_id:
+                root.name = f"{request.method} {route}"
+                root.set("status", status)
+
+# Allow CORS for local frontend testing. Registered last so it wraps every
+# middleware above - admission 429s need Access-Control-Allow-Origin too,
+# and the frontend reads their Retry-After
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
-# Serve frontend static files (if they exist)
-if os.path.exists("static"):
-    # Mount static assets (JS, CSS, images) at /assets
-    if os.path.exists("static/assets"):
-        app.mount("/assets", StaticFiles(directory="static/assets"), name="assets")
-
-# Initialize Agent (Gemini 3 Flash)
-agent = VoiceAgent(
-    project_id=os.getenv("GCP_PROJECT", "tunjiax-wallet"),
-    location=os.getenv("GCP_LOCATION", "us-central1")
-)
+# Built frontend, indexed once (index.html held in memory, precompressed variants, ETags)
+static_site = StaticSite("static")
+
+@app.get("/assets/{asset_path:path}")
+async def serve_asset(asset_path: str, request: Request):
+    """Hashed Vite assets - immutable, long-lived cache"""
+    return static_site.file_response(request, f"assets/{asset_path}")
+
+# Gemini agent - created by the lifespan handler before the first request is served
+agent: VoiceAgent = None
+
+# Scrape-time views of the agent's existing stats dicts
+REGISTRY.register(Gauge("sessions_active", "Conversation sessions held in memory",
+                        function=lambda: agent.session_manager.get_active_session_count()))
+REGISTRY.add_collector(lambda: counter_lines(
+    "gemini_resilience_events_total", "Retry/hedge/circuit-breaker outcomes", "event", agent.backend.metrics))
+REGISTRY.add_collector(lambda: counter_lines(
+    "agent_turn_events_total", "Turn coordinator outcomes", "event", agent.turns.stats))
+REGISTRY.add_collector(lambda: counter_lines(
+    "prefetch_events_total", "Speculative lookup outcomes", "event",
+    {k: v for k, v in agent.prefetcher.stats.items() if k != "saved_seconds"}))
+REGISTRY.add_collector(lambda: counter_lines(
+    "context_cache_events_total", "Gemini context cache usage", "event", agent.context_cache.stats))
+
+# DeepFace is CPU-bound and blocking: run it off the event loop, FACE_VERIFY_CONCURRENCY at a time
+face_slots = asyncio.Semaphore(int(os.getenv("FACE_VERIFY_CONCURRENCY", "1")))
+
+async def run_face_inference(func, **kwargs):
+    """Runs a DeepFace call in a worker thread; waiting callers show up as face_verify_queue_depth"""
+    FACE_QUEUE_DEPTH.inc()
+    waiting = True
+    try:
+        with span("face.queue_wait"):
+            await face_slots.acquire()
+        try:
+            FACE_QUEUE_DEPTH.dec()
+            waiting = False
+            with span("face.inference"), FACE_INFERENCE_LATENCY.time():
+                return await asyncio.to_thread(func, **kwargs)
+        finally:
+            face_slots.release()
+    finally:
+        if waiting:
+            FACE_QUEUE_DEPTH.dec()
 
 # --- Pydantic Models ---
 
@@ -69,6 +233,24 @@ class GoogleAuthRequest(BaseModel):
 async def health_check():
     return {"message": "VoiceVault Backend is Running"}
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness: 200 once startup stages are warm, 503 with per-stage timings until then"""
+    report = app.state.warmup.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/debug/traces")
+async def debug_traces(limit: int = 10):
+    """Slowest recent traces from the in-memory ring buffer (DEBUG_ENDPOINTS=1 only)"""
+    if os.getenv("DEBUG_ENDPOINTS", "0").lower() not in ("1", "true", "yes"):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"traces": TRACE_EXPORTER.slowest(limit)}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.post("/auth/google")
 async def google_auth(request: GoogleAuthRequest):
     """
@@ -76,17 +258,16 @@ async def google_auth(request: GoogleAuthRequest):
     Creates new user if first time sign-in.
     Returns JWT token and user info.
     """
-    import sys
-    print(f"\n[AUTH] Google authentication request received", file=sys.stderr)
+    logger.info("Google authentication request received")
     
     try:
         # Verify Google token
         google_user_info = verify_google_token(request.google_token)
-        print(f"[AUTH] Google token verified for: {google_user_info['email']}", file=sys.stderr)
+        logger.info("Google token verified", extra={"email": google_user_info['email']})
         
         # Get or create user
         user_info = get_or_create_user(google_user_info)
-        print(f"[AUTH] User {'created' if user_info['is_new_user'] else 'found'}: user_id={user_info['user_id']}", file=sys.stderr)
+        logger.info(f"User {'created' if user_info['is_new_user'] else 'found'}", extra={"auth_user_id": user_info['user_id']})
         
         # Generate JWT token
         access_token = create_access_token(user_info["user_id"], user_info["email"])
@@ -103,25 +284,28 @@ async def google_auth(request: GoogleAuthRequest):
             }
         }
     except Exception as e:
-        print(f"[AUTH] ❌ Authentication failed: {str(e)}", file=sys.stderr)
+        logger.warning(f"Authentication failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Dashboard API Endpoints
 @app.get("/balance")
-async def get_balance(user_id: int = 1):
-    """Get user account balance"""
+async def get_balance(user_id: int = 1, at: Optional[datetime] = None):
+    """Get user account balance (?at=2026-01-31T23:59:59 for the balance at that time, from the ledger)"""
     try:
         from tools import get_db_connection
         conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
-            SELECT balance_kobo FROM accounts 
+            SELECT balance_kobo, account_id FROM accounts 
             WHERE user_id = %s AND is_active = TRUE
             LIMIT 1
         """, (user_id,))
         
         result = cursor.fetchone()
+        if result and at is not None:
+            from ledger import balance_at
+            result = (balance_at(cursor, result[1], at), result[1])
         cursor.close()
         conn.close()
         
@@ -140,44 +324,25 @@ async def get_balance(user_id: int = 1):
 
 @app.post("/fund-wallet")
 async def fund_wallet(user_id: int, amount_kobo: int):
-    """Simulate funding wallet (adds money to account)"""
+    """Simulate funding wallet (journaled top-up, shows up in /transactions)"""
     try:
-        from tools import get_db_connection
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Update account balance
-        cursor.execute("""
-            UPDATE accounts 
-            SET balance_kobo = balance_kobo + %s 
-            WHERE user_id = %s AND is_active = TRUE
-        """, (amount_kobo, user_id))
-        
-        # Get new balance
-        cursor.execute("""
-            SELECT balance_kobo FROM accounts 
-            WHERE user_id = %s AND is_active = TRUE
-            LIMIT 1
-        """, (user_id,))
-        
-        result = cursor.fetchone()
-        new_balance = result[0] if result else amount_kobo
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        result = tools.fund_wallet(user_id, amount_kobo)
+        new_balance = result["new_balance_kobo"]
         
         return {
             "success": True,
+            "transaction_id": result["transaction_id"],
             "new_balance_kobo": new_balance,
             "new_balance_ngn": f"{new_balance / 100:,.2f}"
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/beneficiaries")
-async def get_beneficiaries(user_id: int = 1):
-    """Get user's saved beneficiaries"""
+async def get_beneficiaries(request: Request, user_id: int = 1, format: Optional[str] = None):
+    """Get user's saved beneficiaries, most used recently first (?format=columnar for the compact shape)"""
     try:
         from tools import get_db_connection
         conn = get_db_connection()
@@ -187,11 +352,17 @@ async def get_beneficiaries(user_id: int = 1):
             SELECT alias_name, account_name, account_number, bank_name, frequency_count
             FROM beneficiaries 
             WHERE user_id = %s
-            ORDER BY frequency_count DESC, alias_name ASC
+            ORDER BY rank_score DESC, alias_name ASC
         """, (user_id,))
+        rows = cursor.fetchall()
+        
+        if wants_columnar(request, format):
+            cursor.close()
+            conn.close()
+            return columnar_response(BENEFICIARY_COLUMNS, rows)
         
         beneficiaries = []
-        for row in cursor.fetchall():
+        for row in rows:
             beneficiaries.append({
                 "alias_name": row[0],
                 "account_name": row[1],
@@ -208,8 +379,11 @@ async def get_beneficiaries(user_id: int = 1):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/transactions")
-async def get_transactions(user_id: int = 1, limit: int = 20):
-    """Get user's transaction history"""
+async def get_transactions(request: Request, user_id: int = 1, limit: int = 20, format: Optional[str] = None):
+    """
+    Get user's transaction history. ?format=columnar returns TRANSACTION_COLUMNS
+    with raw kobo amounts and epoch-second timestamps instead of display strings.
+    """
     try:
         from tools import get_db_connection
         conn = get_db_connection()
@@ -223,9 +397,17 @@ async def get_transactions(user_id: int = 1, limit: int = 20):
             ORDER BY created_at DESC
             LIMIT %s
         """, (user_id, limit))
+        rows = cursor.fetchall()
+        
+        if wants_columnar(request, format):
+            cursor.close()
+            conn.close()
+            return columnar_response(TRANSACTION_COLUMNS, (
+                row[:6] + (int(row[6].timestamp()) if row[6] else None,) for row in rows
+            ))
         
         transactions = []
-        for row in cursor.fetchall():
+        for row in rows:
             transactions.append({
                 "transaction_id": row[0],
                 "type": row[1],
@@ -244,6 +426,108 @@ async def get_transactions(user_id: int = 1, limit: int = 20):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/analytics")
+async def get_analytics(user_id: int = 1, period: Optional[str] = None, start: Optional[date] = None,
+                        end: Optional[date] = None, counterparty: Optional[str] = None):
+    """
+    Spending summary from daily rollups: ?period=last_month, or ?start=2026-01-01&end=2026-03-31.
+    Cost is one row per day/type/counterparty in range, regardless of transaction volume.
+    """
+    from analytics import resolve_range, spending_summary
+    try:
+        start, end = resolve_range(period, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return spending_summary(user_id, start, end, counterparty=counterparty)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/statements")
+async def get_statement(user_id: int = 1, month: Optional[str] = None, format: str = "csv"):
+    """
+    Monthly statement (?month=2026-09&format=csv|pdf, default last month), streamed from the ledger.
+    Closed months are served from statement_cache after the first request.
+    """
+    import statements
+    if format not in statements.RENDERERS:
+        raise HTTPException(status_code=400, detail="format must be csv or pdf")
+    try:
+        start, end = statements.month_range(month)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must be YYYY-MM")
+    if start > datetime.now():
+        raise HTTPException(status_code=400, detail="month is in the future")
+    
+    closed = statements.is_closed(end)
+    headers = {
+        "Content-Disposition": f'attachment; filename="statement-{start:%Y-%m}.{format}"',
+        "Cache-Control": "private, max-age=86400" if closed else "no-store",
+    }
+    try:
+        if closed:
+            content = await asyncio.to_thread(statements.cached, user_id, start.strftime("%Y-%m"), format)
+            if content is not None:
+                statements.STATEMENTS.inc(format, "cache")
+                return Response(content, media_type=statements.MEDIA_TYPES[format], headers=headers)
+        
+        statement = statements.Statement(user_id, start, end)
+        if not await asyncio.to_thread(statement.open):
+            raise HTTPException(status_code=404, detail="No active account found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    # Sync generator - Starlette pulls each chunk in a worker thread
+    return StreamingResponse(statements.generate(statement, format, cache=closed),
+                             media_type=statements.MEDIA_TYPES[format], headers=headers)
+
+NOTIFICATION_HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATION_HEARTBEAT_SECONDS", "15"))
+
+@app.get("/notifications/stream")
+async def notification_stream(request: Request, token: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events: `credit`/`debit` events carrying the new balance for the token's user
+    as soon as the transfer commits (?token= because EventSource cannot send headers).
+    Reconnects resume after Last-Event-ID; a comment line every
+    NOTIFICATION_HEARTBEAT_SECONDS keeps proxies from closing an idle stream.
+    """
+    try:
+        user_id = int(verify_access_token(token)["user_id"])
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    try:
+        after = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        after = 0
+
+    queue = notifications.hub.subscribe(user_id)
+    if queue is None:
+        raise HTTPException(status_code=429, detail="Too many notification streams for this user")
+
+    async def event_stream():
+        # IDs already sent on this stream - a late commit can carry an older ID, so compare by membership
+        sent = notifications.RecentIds()
+        try:
+            yield "retry: 3000\n\n"
+            if after:
+                for event in await asyncio.to_thread(notifications.replay, user_id, after):
+                    sent.add(event["id"])
+                    yield notifications.format_sse(event)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=NOTIFICATION_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if sent.add(event["id"]):
+                    yield notifications.format_sse(event)
+        finally:
+            notifications.hub.unsubscribe(user_id, queue)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/check-profile-image")
 async def check_profile_image(user_id: int = 1):
     """Check if user has a profile image"""
@@ -298,7 +582,7 @@ async def upload_profile_image(request: dict):
         
         return {"success": True, "message": "Profile image uploaded successfully"}
     except Exception as e:
-        print(f"Error uploading profile image: {str(e)}")
+        logger.exception(f"Error uploading profile image: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Biometric Face Verification + Transfer Execution (Atomic Operation)
@@ -311,6 +595,9 @@ class FaceVerificationRequest(BaseModel):
     beneficiary_name: Optional[str] = None
     account_number: Optional[str] = None
     bank_name: Optional[str] = None
+    # Batch: one verification authorizes every item ({amount, beneficiary_name, bank_name, account_number})
+    transfers: Optional[List[Dict[str, Any]]] = None
+    batch_mode: Optional[str] = None  # all_or_nothing (default) / per_item
 
 @app.post("/verify-face")
 async def verify_face(request: FaceVerificationRequest):
@@ -319,49 +606,53 @@ async def verify_face(request: FaceVerificationRequest):
     If verified AND transfer details are provided, executes the transfer atomically.
     Updates Gemini session with result so conversation can continue.
     """
-    import sys
     import base64
     import tempfile
     import os
-    from pathlib import Path
-    from tools import get_db_connection, execute_transfer
+    from tools import get_db_connection, execute_transfer, execute_batch_transfer
     from google.genai import types
     
-    print(f"\n[FACE] --- DEEPFACE VERIFICATION START ---", file=sys.stderr)
+    logger.info("DeepFace verification start")
     
     try:
         # For demo: use user_id=1 if not provided
         user_id = request.user_id if request.user_id else 1
-        print(f"[FACE] Verifying face for user_id: {user_id}", file=sys.stderr)
+        logger.info(f"Verifying face for user_id: {user_id}")
         
         # Check if this is a transfer verification
-        is_transfer = all([request.amount, request.beneficiary_name, request.account_number, request.bank_name])
+        is_batch = bool(request.transfers)
+        is_transfer = not is_batch and all([request.amount, request.beneficiary_name, request.account_number, request.bank_name])
         if is_transfer:
-            print(f"[FACE] Transfer pending: ₦{request.amount} to {request.beneficiary_name}", file=sys.stderr)
+            logger.info(f"Transfer pending: ₦{request.amount} to {request.beneficiary_name}")
+        elif is_batch:
+            logger.info(f"Batch transfer pending: {len(request.transfers)} items")
         
         # Get user's stored profile image from database (BLOB)
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT profile_image FROM users WHERE user_id = %s",
-            (user_id,)
-        )
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with span("face.load_profile_image"):
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT profile_image FROM users WHERE user_id = %s",
+                (user_id,)
+            )
+            result = cursor.fetchone()
+            cursor.close()
+            conn.close()
         
         if not result or not result[0]:
-            print(f"[FACE] ❌ No profile image found for user", file=sys.stderr)
+            logger.warning("No profile image found for user")
+            FACE_VERIFICATIONS.inc("no_profile_image")
             return {"verified": False, "reason": "No profile image on file"}
         
         stored_image_blob = result[0]  # This is raw bytes from BLOB
-        print(f"[FACE] Retrieved stored profile image ({len(stored_image_blob)} bytes)", file=sys.stderr)
+        logger.debug(f"Retrieved stored profile image ({len(stored_image_blob)} bytes)")
         
         # Decode live image from base64
-        live_image_data = request.image.split(",")[1] if "," in request.image else request.image
-        live_image_bytes = base64.b64decode(live_image_data)
+        with span("face.decode_image"):
+            live_image_data = request.image.split(",")[1] if "," in request.image else request.image
+            live_image_bytes = base64.b64decode(live_image_data)
         
-        print(f"[FACE] Decoded live image ({len(live_image_bytes)} bytes)", file=sys.stderr)
+        logger.debug(f"Decoded live image ({len(live_image_bytes)} bytes)")
         
         # Create temporary files for DeepFace
         with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as live_temp:
@@ -373,13 +664,14 @@ async def verify_face(request: FaceVerificationRequest):
             stored_path = stored_temp.name
         
         try:
-            print(f"[FACE] Running DeepFace verification...", file=sys.stderr)
+            logger.debug("Running DeepFace verification")
             
             # Import DeepFace
             from deepface import DeepFace
             
             # Verify faces using DeepFace
-            result = DeepFace.verify(
+            result = await run_face_inference(
+                DeepFace.verify,
                 img1_path=stored_path,
                 img2_path=live_path,
                 model_name="ArcFace",  # State-of-the-art accuracy
@@ -388,43 +680,71 @@ async def verify_face(request: FaceVerificationRequest):
             )
             
             verified = result["verified"]
+            FACE_VERIFICATIONS.inc("verified" if verified else "rejected")
             distance = result["distance"]
             threshold = result["threshold"]
             
             # Calculate confidence (inverse of distance normalized)
             confidence = max(0.0, min(1.0, 1.0 - (distance / threshold)))
             
-            print(f"[FACE] ✅ DeepFace result: verified={verified}, distance={distance:.4f}, threshold={threshold:.4f}", file=sys.stderr)
+            logger.info("DeepFace result", extra={"verified": verified, "distance": round(distance, 4), "threshold": round(threshold, 4)})
             
             # If verified and this is a transfer, execute it atomically
             transfer_result = None
-            if verified and is_transfer:
-                print(f"[FACE] ✅ Identity confirmed. Executing transfer...", file=sys.stderr)
-                transfer_result = execute_transfer(
-                    amount=request.amount,
-                    beneficiary_name=request.beneficiary_name,
-                    bank_name=request.bank_name,
-                    account_number=request.account_number,
-                    user_id=user_id
-                )
-                print(f"[FACE] Transfer result: {transfer_result.get('status')}", file=sys.stderr)
+            if verified and is_batch:
+                logger.info("Identity confirmed, executing batch transfer")
+                with span("face.execute_batch_transfer", items=len(request.transfers)):
+                    transfer_result = await asyncio.to_thread(
+                        execute_batch_transfer,
+                        request.transfers, user_id=user_id, mode=request.batch_mode or "all_or_nothing"
+                    )
+                logger.info(f"Batch transfer result: {transfer_result.get('status')}")
+                
+                if transfer_result.get('status') in ('success', 'partial') and request.session_id:
+                    try:
+                        async with agent.session_manager.lock(request.session_id):
+                            chat_history = agent.session_manager.get_or_create_session(request.session_id)
+                            outcome = "; ".join(f"{r['beneficiary_name']}: {r['status']}" for r in transfer_result["results"])
+                            chat_history.append(types.Content(
+                                role="user",
+                                parts=[types.Part(text=f"[SYSTEM: Batch transfer {transfer_result['status']}. {transfer_result['message']} ({outcome}). New balance: {transfer_result.get('new_balance_ngn', 'N/A')}.]")]
+                            ))
+                            agent.session_manager.update_session(request.session_id, chat_history)
+                    except Exception as e:
+                        logger.warning(f"Failed to update session: {e}")
+            
+            elif verified and is_transfer:
+                logger.info("Identity confirmed, executing transfer")
+                with span("face.execute_transfer"):
+                    transfer_result = await asyncio.to_thread(
+                        execute_transfer,
+                        amount=request.amount,
+                        beneficiary_name=request.beneficiary_name,
+                        bank_name=request.bank_name,
+                        account_number=request.account_number,
+                        user_id=user_id
+                    )
+                logger.info(f"Transfer result: {transfer_result.get('status')}")
                 
                 # Update Gemini session with transfer result so conversation can continue
                 if transfer_result.get('status') == 'success' and request.session_id:
                     try:
                         session_id = request.session_id
-                        chat_history = voice_agent.session_manager.get_or_create_session(session_id)
                         
-                        # Add transfer success to chat history
-                        success_message = f"[SYSTEM: Transfer completed successfully. ₦{request.amount:,} sent to {request.beneficiary_name} at {request.bank_name}. New balance: {transfer_result.get('new_balance_ngn', 'N/A')}. You may now offer to save {request.beneficiary_name} as a beneficiary.]"
-                        chat_history.append(types.Content(
-                            role="user",
-                            parts=[types.Part(text=success_message)]
-                        ))
-                        voice_agent.session_manager.update_session(session_id, chat_history)
-                        print(f"[FACE] Updated Gemini session with transfer success", file=sys.stderr)
+                        # Wait for any in-flight chat turn so history writes don't interleave
+                        async with agent.session_manager.lock(session_id):
+                            chat_history = agent.session_manager.get_or_create_session(session_id)
+                            
+                            # Add transfer success to chat history
+                            success_message = f"[SYSTEM: Transfer completed successfully. ₦{request.amount:,} sent to {request.beneficiary_name} at {request.bank_name}. New balance: {transfer_result.get('new_balance_ngn', 'N/A')}. You may now offer to save {request.beneficiary_name} as a beneficiary.]"
+                            chat_history.append(types.Content(
+                                role="user",
+                                parts=[types.Part(text=success_message)]
+                            ))
+                            agent.session_manager.update_session(session_id, chat_history)
+                        logger.info("Updated Gemini session with transfer success")
                     except Exception as e:
-                        print(f"[FACE] Failed to update session: {e}", file=sys.stderr)
+                        logger.warning(f"Failed to update session: {e}")
             
             response = {
                 "verified": verified,
@@ -449,52 +769,40 @@ async def verify_face(request: FaceVerificationRequest):
                 pass
             
     except Exception as e:
-        print(f"[FACE] ❌ Verification error: {str(e)}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        FACE_VERIFICATIONS.inc("error")
+        logger.exception(f"Verification error: {e}")
         return {"verified": False, "reason": f"Error: {str(e)}"}
 
-# Debug endpoint to see what ElevenLabs sends (remove after debugging)
-from fastapi import Request
-
 @app.post("/v1/chat/completions")
 async def chat_completions(request: Request):
     """
     ElevenLabs-compatible chat completions endpoint.
     Accepts any headers - we parse them manually inside.
     """
-    import sys
-    
-    print(f"\n{'='*60}", file=sys.stderr)
-    print(f"[ELEVENLABS] INCOMING REQUEST", file=sys.stderr)
-    print(f"{'='*60}", file=sys.stderr)
-    
-    # Log headers
-    print(f"[HEADERS]", file=sys.stderr)
-    for key, value in request.headers.items():
-        if 'auth' in key.lower():
-            print(f"  {key}: {value[:20]}..." if len(str(value)) > 20 else f"  {key}: {value}", file=sys.stderr)
-        else:
-            print(f"  {key}: {value}", file=sys.stderr)
-    
-    # Log raw request body for debugging
     raw_body = await request.body()
-    raw_body_str = raw_body.decode('utf-8')
-    print(f"\n[BODY] ({len(raw_body_str)} bytes):", file=sys.stderr)
-    print(raw_body_str[:2000] if len(raw_body_str) > 2000 else raw_body_str, file=sys.stderr)
-    print(f"{'='*60}\n", file=sys.stderr)
-    sys.stderr.flush()
     
-    # Parse the body manually from the raw string
-    try:
-        body = json.loads(raw_body_str) if raw_body_str else {}
-        chat_request = ChatCompletionRequest(**body)
-    except Exception as parse_error:
-        print(f"[MAIN] ❌ Parse error: {parse_error}", file=sys.stderr)
-        print(f"[MAIN] Body was: {raw_body_str[:500]}", file=sys.stderr)
-        raise HTTPException(status_code=422, detail=f"Failed to parse request: {parse_error}")
+    # Full headers/body only for a sampled fraction of requests (LOG_PAYLOAD_SAMPLE_RATE, DEBUG level)
+    if should_log_payload(logger):
+        logger.debug(
+            "Incoming ElevenLabs request",
+            extra={"headers": redact_headers(request.headers), "body": raw_body[:2000].decode("utf-8", "replace"), "body_bytes": len(raw_body)}
+        )
     
-    print(f"[MAIN] Received /v1/chat/completions request", file=sys.stderr)
+    # Fast path reads only model/stream/last message; anything unusual gets full pydantic validation
+    chat_request = fast_parse_chat_request(raw_body)
+    if chat_request is None:
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            parsed = ChatCompletionRequest(**body)
+            chat_request = ChatRequestFields(
+                model=parsed.model,
+                stream=bool(parsed.stream),
+                last_content=parsed.messages[-1].content,
+                message_count=len(parsed.messages)
+            )
+        except Exception as parse_error:
+            logger.warning(f"Parse error: {parse_error}", extra={"body": raw_body[:500].decode("utf-8", "replace")})
+            raise HTTPException(status_code=422, detail=f"Failed to parse request: {parse_error}")
     
     # Get headers manually from request
     authorization = request.headers.get("authorization")
@@ -503,26 +811,21 @@ async def chat_completions(request: Request):
     
     # 1. Validate API Key (only if Authorization header is provided)
     expected_key = os.getenv("ELEVENLABS_CUSTOM_LLM_SECRET")
-    print(f"[MAIN] Validating API Key...", file=sys.stderr)
     
     # If Authorization header is provided, validate it
     if authorization:
         try:
             provided_key = authorization.split(" ")[1] if " " in authorization else authorization
-            # Debug: show first/last 4 chars for comparison
-            print(f"[MAIN] Expected key: {expected_key[:4] if expected_key else 'NONE'}...{expected_key[-4:] if expected_key else ''} (len={len(expected_key) if expected_key else 0})", file=sys.stderr)
-            print(f"[MAIN] Provided key: {provided_key[:4] if provided_key else 'NONE'}...{provided_key[-4:] if provided_key else ''} (len={len(provided_key) if provided_key else 0})", file=sys.stderr)
             if expected_key and provided_key != expected_key:
-                print(f"[MAIN] ❌ Unauthorized: Key mismatched", file=sys.stderr)
+                logger.warning("Unauthorized: key mismatch", extra={"provided_key_len": len(provided_key or "")})
                 raise HTTPException(status_code=401, detail="Unauthorized")
-            print(f"[MAIN] ✅ Key matched!", file=sys.stderr)
         except HTTPException:
             raise
         except Exception as e:
-            print(f"[MAIN] ❌ Unauthorized: Invalid auth header - {e}", file=sys.stderr)
+            logger.warning(f"Unauthorized: invalid auth header - {e}")
             raise HTTPException(status_code=401, detail="Unauthorized")
     else:
-        print(f"[MAIN] No auth header - allowing for local/chat testing", file=sys.stderr)
+        logger.debug("No auth header - allowing for local/chat testing")
 
     # 2. Get user_id - with fallback for ElevenLabs voice
     user_id = None
@@ -533,57 +836,52 @@ async def chat_completions(request: Request):
     if not user_id:
         if authorization:
             user_id = 1  # Default for ElevenLabs voice calls
-            print(f"[MAIN] ⚠️ Using default user_id=1 for ElevenLabs voice", file=sys.stderr)
+            logger.debug("Using default user_id=1 for ElevenLabs voice")
         else:
-            print(f"[MAIN] ❌ Missing or invalid x-user-id: {x_user_id}", file=sys.stderr)
+            logger.warning(f"Missing or invalid x-user-id: {x_user_id}")
             raise HTTPException(status_code=400, detail="x-user-id header required")
     
     session_id = x_session_id  # Can be None, voice_agent will use user_id as session_id
-    print(f"[MAIN] ✅ Authorized. User ID: {user_id}, Session ID: {session_id or 'default'}, Processing message: {chat_request.messages[-1].content}", file=sys.stderr)
+    user_id_var.set(user_id)
+    logger.info("Chat completion request", extra={"stream": chat_request.stream, "messages": chat_request.message_count})
 
     # 3. Extract User Message
-    user_message = chat_request.messages[-1].content
+    user_message = chat_request.last_content
 
     # 4. Get Response from Gemini (VoiceAgent) with user_id and session_id
-    print(f"[MAIN] Calling VoiceAgent.process_input()...", file=sys.stderr)
     response_text, tool_command = await agent.process_input(user_message, user_id=user_id, session_id=session_id)
-    print(f"[MAIN] VoiceAgent returned: Text='{response_text[:30]}...', Tool='{tool_command}'", file=sys.stderr)
+    logger.debug(f"VoiceAgent returned: Text='{response_text[:30]}...', Tool='{tool_command}'")
 
     # 4. Handle Streaming Response (ElevenLabs expects chunks)
     if chat_request.stream:
-        print(f"[MAIN] Streaming response back to Client...", file=sys.stderr)
         async def event_generator():
-            request_id = f"chatcmpl-{int(time.time())}"
             created = int(time.time())
+            encoder = ChatCompletionStreamEncoder(f"chatcmpl-{created}", created, chat_request.model or "gemini-2.0-flash")
             
             # Chunk 1: Role
-            yield f"data: {json.dumps({'id': request_id, 'object': 'chat.completion.chunk', 'created': created, 'model': chat_request.model or 'gemini-2.0-flash', 'choices': [{'index': 0, 'delta': {'role': 'assistant'}, 'finish_reason': None}]})}\n\n"
+            yield encoder.role()
             
-            # Chunk 2: Content
+            # Chunk 2: Content (SSE_WORDS_PER_WRITE words per network write)
             words = response_text.split(" ")
-            for word in words:
-                yield f"data: {json.dumps({'id': request_id, 'object': 'chat.completion.chunk', 'created': created, 'model': chat_request.model or 'gemini-2.0-flash', 'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}]})}\n\n"
-                await asyncio.sleep(0.01) # Micro-delay for stream stability
+            with span("sse.stream_content", words=len(words)):
+                for i in range(0, len(words), SSE_WORDS_PER_WRITE):
+                    yield encoder.contents(word + " " for word in words[i:i + SSE_WORDS_PER_WRITE])
+                    await asyncio.sleep(0.01) # Micro-delay for stream stability
 
             # Chunk 3: Tools (if any)
             if tool_command == "TRIGGER_BIOMETRIC":
-                print(f"[MAIN] Sending TRIGGER_BIOMETRIC tool call in stream", file=sys.stderr)
-                tool_call_id = f"call_{int(time.time())}"
-                tool_payload = {
-                    'id': tool_call_id,
+                yield encoder.tool_calls([{
+                    'id': f"call_{int(time.time())}",
                     'type': 'function',
                     'function': {
                         'name': 'triggerBiometric',
                         'arguments': '{}' 
                     }
-                }
-                yield f"data: {json.dumps({'id': request_id, 'object': 'chat.completion.chunk', 'created': created, 'model': chat_request.model or 'gemini-2.0-flash', 'choices': [{'index': 0, 'delta': {'tool_calls': [tool_payload]}, 'finish_reason': None}]})}\n\n"
+                }])
 
             # Chunk 4: Stop
-            finish_reason = "tool_calls" if tool_command else "stop"
-            yield f"data: {json.dumps({'id': request_id, 'object': 'chat.completion.chunk', 'created': created, 'model': chat_request.model or 'gemini-2.0-flash', 'choices': [{'index': 0, 'delta': {}, 'finish_reason': finish_reason}]})}\n\n"
-            yield "data: [DONE]\n\n"
-            print(f"[MAIN] Stream finished.", file=sys.stderr)
+            yield encoder.finish("tool_calls" if tool_command else "stop")
+            yield SSE_DONE
 
         return StreamingResponse(event_generator(), media_type="text/event-stream")
 
@@ -619,39 +917,22 @@ async def chat_completions(request: Request):
 
 @app.post("/verify-face")
 async def verify_face_endpoint(request: ImageVerificationRequest):
-    print("Received face verification request")
+    logger.info("Received face verification request")
     verified = await agent.verify_identity_with_vision(request.image)
     return {"verified": verified}
 
 @app.websocket("/ws/voice-stream")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    print("Client connected to voice stream")
-    try:
-        while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
-            user_input = message.get("text")
-            if user_input:
-                print(f"Received user input: {user_input}")
-                response_text, tool_command = await agent.process_input(user_input)
-                response_payload = {
-                    "audio_text": response_text,
-                    "tool_command": tool_command
-                }
-                await websocket.send_text(json.dumps(response_payload))
-    except (WebSocketDisconnect, Exception) as e:
-        print(f"WebSocket Error: {e}")
+    """Authenticated full-duplex voice channel - protocol in ws_stream.VoiceStreamConnection"""
+    await handle_voice_stream(websocket, agent, admission)
 
 # SPA Fallback: Serve React app for all unmatched routes
 # This MUST be at the end after all API routes
 @app.get("/{full_path:path}")
-async def serve_spa(full_path: str):
-    """Serve the React SPA for all non-API routes"""
-    # Check if static/index.html exists (frontend build)
-    index_path = "static/index.html"
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
-    # Fallback if no frontend build
-    return {"error": "Frontend not built. Visit /api/health for backend status."}
+async def serve_spa(full_path: str, request: Request):
+    """Serve the React SPA for all non-API routes (API paths 404 instead of returning index.html)"""
+    return static_site.spa_response(request, full_path)
+
+static_site.set_api_routes(route.path for route in app.routes if route.path not in ("/{full_path:path}", "/assets/{asset_path:path}"))
 
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
@@ -0,0 +1,245 @@
+import time
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Latency buckets in seconds: sub-ms DB hits up to slow Gemini/DeepFace calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """
+    Base for Counter/Gauge/Histogram. Label values are passed positionally,
+    in the order given by `labels`, so the hot path is a tuple lookup.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def render(self):
+        lines = self.header()
+        for key, value in list(self.values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {_number(value)}")
+        return lines
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), function: Callable[[], float] = None):
+        super().__init__(name, help_text, labels)
+        self.values: Dict[Tuple, float] = {}
+        self.function = function
+
+    def set(self, value: float, *label_values):
+        self.values[label_values] = value
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def dec(self, *label_values, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+
+    def render(self):
+        lines = self.header()
+        if self.function is not None:
+            try:
+                lines.append(f"{self.name} {_number(self.function())}")
+            except Exception:
+                pass
+            return lines
+        for key, value in list(self.values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {_number(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    """
+    Stores per-bucket (non-cumulative) counts; cumulative `le` buckets are
+    only computed at scrape time, so observe() is a bisect and three adds.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                # [bucket counts..., +Inf count, sum]
+                series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *label_values) -> "_Timer":
+        """`with histogram.time("label"):` observes the block's wall time"""
+        return _Timer(self, label_values)
+
+    def render(self):
+        lines = self.header()
+        for key, series in list(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _label_text(self.labels, key, 'le="%s"' % _number(bound))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = _label_text(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    """Plain class rather than @contextmanager - no generator per use"""
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram: Histogram, label_values: Tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Callback producing extra exposition lines at scrape time (e.g. stats dicts)"""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            try:
+                lines.extend(collector())
+            except Exception:
+                pass
+        return "\n".join(lines) + "\n"
+
+
+def counter_lines(name: str, help_text: str, label: str, values: Dict[str, float]) -> List[str]:
+    """Exposes a plain stats dict (e.g. ResilientBackend.metrics) as one labelled counter"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for key, value in values.items():
+        lines.append(f'{name}{{{label}="{_escape(key)}"}} {_number(value)}')
+    return lines
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# HTTP
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time to response headers by route template", ("method", "route")))
+
+# Gemini
+GEMINI_LATENCY = REGISTRY.register(Histogram(
+    "gemini_request_duration_seconds", "generate_content latency including retries", ("outcome",)))
+GEMINI_TOKENS = REGISTRY.register(Counter(
+    "gemini_tokens_total", "Gemini token usage (cached is a subset of prompt)", ("kind",)))
+
+# Database
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "SQL statement latency by query name", ("query",)))
+DB_CONNECT_LATENCY = REGISTRY.register(Histogram(
+    "db_connect_duration_seconds", "Time to obtain a database connection"))
+DB_CONNECTIONS_IN_USE = REGISTRY.register(Gauge(
+    "db_connections_in_use", "Database connections currently checked out"))
+
+# Face verification
+FACE_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "face_verify_queue_depth", "Face verifications waiting for an inference slot"))
+FACE_INFERENCE_LATENCY = REGISTRY.register(Histogram(
+    "face_inference_duration_seconds", "DeepFace.verify wall time"))
+FACE_VERIFICATIONS = REGISTRY.register(Counter(
+    "face_verifications_total", "Face verification outcomes", ("result",)))
+
+# Transfers
+TRANSFERS = REGISTRY.register(Counter(
+    "transfers_total", "Transfer attempts by outcome", ("status",)))
+
+# Admission control
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "admission_rejected_total", "Requests rejected with 429 by route class and reason", ("route_class", "reason")))
+ADMISSION_IN_FLIGHT = REGISTRY.register(Gauge(
+    "admission_in_flight", "Admitted requests currently running by route class", ("route_class",)))
+
+# Name enquiry
+NAME_ENQUIRIES = REGISTRY.register(Counter(
+    "name_enquiries_total", "Account-name lookups by outcome (cache_hit/negative_hit/resolved/not_found/...)", ("outcome",)))
+
+# Risk checks
+RISK_DECISIONS = REGISTRY.register(Counter(
+    "risk_decisions_total", "Pre-debit risk checks by outcome (allowed or the rule that blocked)", ("outcome",)))
+
+# Ledger
+LEDGER_DISCREPANCIES = REGISTRY.register(Counter(
+    "ledger_discrepancies_total", "Reconciliation findings (should stay at zero)", ("kind",)))
+
+# Statements
+STATEMENTS = REGISTRY.register(Counter(
+    "statements_total", "Statements served by format and source (cache/generated)", ("format", "source")))
+
+# Notifications
+NOTIFICATIONS = REGISTRY.register(Counter(
+    "notifications_total", "Outbox events by outcome (delivered to a stream / dropped from a full stream queue)", ("outcome",)))
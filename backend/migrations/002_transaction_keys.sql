@@ -0,0 +1,17 @@
+-- Migration: Time-ordered transaction keys (see backend/id_generator.py)
+-- Run this SQL in your MySQL database
+
+USE banking;
+
+-- New transaction IDs are "TXN" + 13 base32 chars encoding a 64-bit Snowflake ID;
+-- txn_key stores the same value as a fixed-width integer.
+ALTER TABLE transactions
+ADD COLUMN txn_key BIGINT UNSIGNED NULL AFTER transaction_id;
+
+-- Unique, monotonically increasing -> inserts append to the right edge of the index.
+-- Rows created before this migration keep txn_key NULL.
+ALTER TABLE transactions
+ADD UNIQUE INDEX idx_transactions_txn_key (txn_key);
+
+-- Verify the change
+DESCRIBE transactions;
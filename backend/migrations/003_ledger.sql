@@ -0,0 +1,58 @@
+-- Migration: Double-entry ledger (see backend/ledger.py)
+-- Run this SQL in your MySQL database, after 002_transaction_keys.sql
+
+USE banking;
+
+-- One row per movement of money. journal_id is a time-ordered id_generator ID,
+-- so time ranges are primary-key ranges.
+CREATE TABLE IF NOT EXISTS journal_transactions (
+    journal_id BIGINT UNSIGNED NOT NULL PRIMARY KEY,
+    kind VARCHAR(16) NOT NULL,          -- transfer / funding / opening
+    reference VARCHAR(64) NULL,         -- transactions.transaction_id
+    created_at DATETIME(3) NOT NULL
+) ENGINE=InnoDB;
+
+-- Append-only legs; amounts of one journal sum to zero. account_id < 0 are system
+-- accounts (-1 external settlement, -2 wallet funding, -3 opening balances).
+CREATE TABLE IF NOT EXISTS journal_entries (
+    journal_id BIGINT UNSIGNED NOT NULL,
+    account_id INT NOT NULL,
+    amount_kobo BIGINT NOT NULL,        -- positive increases the account's balance
+    PRIMARY KEY (journal_id, account_id),
+    -- Covering index for per-account range sums (balance_at, reconciliation)
+    INDEX idx_entries_account (account_id, journal_id, amount_kobo)
+) ENGINE=InnoDB;
+
+-- Verified balances; balance_at() seeks the latest one and sums only newer entries
+CREATE TABLE IF NOT EXISTS balance_snapshots (
+    account_id INT NOT NULL,
+    journal_id BIGINT UNSIGNED NOT NULL, -- balance includes this journal and everything before it
+    balance_kobo BIGINT NOT NULL,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (account_id, journal_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS ledger_checkpoints (
+    name VARCHAR(32) NOT NULL PRIMARY KEY,
+    journal_id BIGINT UNSIGNED NOT NULL,
+    updated_at DATETIME NOT NULL
+) ENGINE=InnoDB;
+
+-- Opening balances: one journal per existing account, using journal_id = account_id
+-- (far below any generated ID), plus a snapshot of the same balance.
+INSERT IGNORE INTO journal_transactions (journal_id, kind, reference, created_at)
+SELECT account_id, 'opening', CONCAT('OPEN_', account_id), NOW(3) FROM accounts;
+
+INSERT IGNORE INTO journal_entries (journal_id, account_id, amount_kobo)
+SELECT account_id, account_id, balance_kobo FROM accounts;
+
+INSERT IGNORE INTO journal_entries (journal_id, account_id, amount_kobo)
+SELECT account_id, -3, -balance_kobo FROM accounts;
+
+INSERT IGNORE INTO balance_snapshots (account_id, journal_id, balance_kobo, created_at)
+SELECT account_id, account_id, balance_kobo, NOW() FROM accounts;
+
+INSERT IGNORE INTO ledger_checkpoints (name, journal_id, updated_at) VALUES ('reconcile', 0, NOW());
+
+-- Verify: every journal balances (expect no rows)
+SELECT journal_id, SUM(amount_kobo) FROM journal_entries GROUP BY journal_id HAVING SUM(amount_kobo) <> 0;
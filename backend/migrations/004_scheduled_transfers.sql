@@ -0,0 +1,43 @@
+-- Migration: Scheduled and recurring transfers (see backend/scheduler.py)
+-- Run this SQL in your MySQL database
+
+USE banking;
+
+CREATE TABLE IF NOT EXISTS scheduled_transfers (
+    schedule_id BIGINT UNSIGNED NOT NULL PRIMARY KEY,  -- id_generator ID
+    user_id INT NOT NULL,
+    amount_kobo BIGINT NOT NULL,
+    beneficiary_name VARCHAR(255) NOT NULL,
+    bank_name VARCHAR(100) NOT NULL,
+    account_number VARCHAR(20) NOT NULL,
+    frequency ENUM('once', 'daily', 'weekly', 'monthly') NOT NULL,
+    start_at DATETIME NOT NULL,          -- occurrence n is computed from this (UTC)
+    run_count INT NOT NULL DEFAULT 0,    -- occurrences fired or skipped
+    max_runs INT NULL,                   -- NULL = until cancelled
+    next_run_at DATETIME NOT NULL,
+    status ENUM('active', 'completed', 'cancelled') NOT NULL DEFAULT 'active',
+    claimed_by VARCHAR(64) NULL,         -- lease held by the instance firing it
+    claimed_until DATETIME NULL,
+    last_run_at DATETIME NULL,
+    failure_count INT NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL,
+    INDEX idx_schedules_due (status, next_run_at),
+    INDEX idx_schedules_user (user_id, status),
+    INDEX idx_schedules_claim (claimed_by)
+) ENGINE=InnoDB;
+
+-- One row per fired occurrence; the primary key makes each occurrence at-most-once.
+-- status stays 'running' if an instance died mid-transfer - check these by hand.
+CREATE TABLE IF NOT EXISTS scheduled_transfer_runs (
+    schedule_id BIGINT UNSIGNED NOT NULL,
+    occurrence INT NOT NULL,
+    due_at DATETIME NOT NULL,
+    status VARCHAR(16) NOT NULL,         -- running / success / failed
+    transaction_id VARCHAR(64) NULL,
+    message VARCHAR(255) NULL,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (schedule_id, occurrence)
+) ENGINE=InnoDB;
+
+-- Verify the change
+DESCRIBE scheduled_transfers;
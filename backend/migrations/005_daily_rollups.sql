@@ -0,0 +1,20 @@
+-- Migration: Daily spending rollups (see backend/analytics.py)
+-- Run this SQL in your MySQL database, then backfill with:
+--     python analytics.py rebuild --include-today
+
+USE banking;
+
+-- One row per (user, day, type, counterparty); transfers increment today's row
+-- in the same DB transaction as the transactions insert
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    type VARCHAR(10) NOT NULL,           -- DEBIT / CREDIT, as in transactions.type
+    counterparty VARCHAR(100) NOT NULL,  -- '' when the transaction has none
+    txn_count INT NOT NULL,
+    amount_kobo BIGINT NOT NULL,
+    PRIMARY KEY (user_id, day, type, counterparty)
+) ENGINE=InnoDB;
+
+-- Verify the change
+DESCRIBE daily_rollups;
@@ -0,0 +1,18 @@
+-- Migration: Statement cache (see backend/statements.py)
+-- Run this SQL in your MySQL database, after 003_ledger.sql
+
+USE banking;
+
+-- Rendered statements for closed months; the ledger is append-only, so a
+-- closed month never changes and entries are never invalidated
+CREATE TABLE IF NOT EXISTS statement_cache (
+    user_id INT NOT NULL,
+    period CHAR(7) NOT NULL,             -- YYYY-MM
+    format VARCHAR(8) NOT NULL,          -- csv / pdf
+    content MEDIUMBLOB NOT NULL,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (user_id, period, format)
+) ENGINE=InnoDB;
+
+-- Verify the change
+DESCRIBE statement_cache;
@@ -0,0 +1,19 @@
+-- Migration: Per-user risk limit overrides (see backend/risk.py)
+-- Run this SQL in your MySQL database
+
+USE banking;
+
+-- Optional per-user overrides of the RISK_* defaults; NULL keeps the default.
+-- Read once per user per RISK_PROFILE_TTL, never per transfer.
+CREATE TABLE IF NOT EXISTS risk_limits (
+    user_id INT NOT NULL PRIMARY KEY,
+    per_transfer_kobo BIGINT NULL,
+    per_minute_count INT NULL,
+    per_day_count INT NULL,
+    per_day_kobo BIGINT NULL,
+    new_payee_kobo BIGINT NULL,
+    updated_at DATETIME NOT NULL
+) ENGINE=InnoDB;
+
+-- Verify the change
+DESCRIBE risk_limits;
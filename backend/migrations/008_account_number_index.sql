@@ -0,0 +1,13 @@
+-- Migration: Index for name enquiry by account number (see backend/name_enquiry.py)
+-- Run this SQL in your MySQL database
+
+USE banking;
+
+-- Name enquiry and the receiver lookup in execute_transfer both filter on
+-- account_number + is_active; the index covers both columns and user_id
+-- so the accounts row is found without a table scan.
+ALTER TABLE accounts
+ADD INDEX idx_accounts_number_active (account_number, is_active, user_id);
+
+-- Verify the change
+EXPLAIN SELECT user_id FROM accounts WHERE account_number = '0123456789' AND is_active = TRUE;
@@ -0,0 +1,23 @@
+-- Migration: Recency-weighted beneficiary ranking (see bump_beneficiaries in backend/tools.py)
+-- Run this SQL in your MySQL database
+
+USE banking;
+
+-- rank_score = ln(sum over uses of exp(decay * seconds since 2024-01-01)),
+-- decay = ln(2) / BENEFICIARY_RANK_HALF_LIFE_DAYS. Each transfer adds to its own
+-- row only; ORDER BY rank_score gives the recency-weighted order.
+ALTER TABLE beneficiaries
+ADD COLUMN last_used_at DATETIME NULL,
+ADD COLUMN rank_score DOUBLE NOT NULL DEFAULT 0;
+
+-- Transfers resolve the beneficiary by account number, then update by primary key
+ALTER TABLE beneficiaries
+ADD INDEX idx_beneficiaries_user_account (user_id, account_number),
+ADD INDEX idx_beneficiaries_user_rank (user_id, rank_score);
+
+-- Backfill: treat existing frequency_count as that many uses now (default 30-day half-life)
+UPDATE beneficiaries
+SET rank_score = LN(GREATEST(frequency_count, 1)) + LN(2) / (30 * 86400) * (UNIX_TIMESTAMP() - 1704067200);
+
+-- Verify the change
+SELECT alias_name, frequency_count, rank_score FROM beneficiaries ORDER BY user_id, rank_score DESC LIMIT 20;
@@ -0,0 +1,20 @@
+-- Migration: Notification outbox (see backend/notifications.py)
+-- Run this SQL in your MySQL database
+
+USE banking;
+
+-- Written in the same transaction as the debit/credit it describes, so an
+-- event exists exactly when the money moved. event_id is a time-ordered
+-- Snowflake ID; rows older than OUTBOX_RETENTION_HOURS are deleted by the
+-- dispatcher.
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    event_id BIGINT UNSIGNED NOT NULL PRIMARY KEY,
+    user_id INT NOT NULL,
+    kind VARCHAR(32) NOT NULL,           -- credit / debit
+    payload JSON NOT NULL,
+    created_at DATETIME(3) NOT NULL,
+    INDEX idx_outbox_user_event (user_id, event_id)
+) ENGINE=InnoDB;
+
+-- Verify the change
+DESCRIBE notification_outbox;
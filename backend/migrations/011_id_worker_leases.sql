@@ -0,0 +1,23 @@
+-- Migration: ID worker slot leases (see backend/id_generator.py)
+-- Run this SQL in your MySQL database
+
+USE banking;
+
+-- One row per 10-bit Snowflake worker ID. A process without ID_WORKER_ID
+-- claims the longest-expired row and renews it every third of
+-- ID_WORKER_LEASE_SECONDS; it stops issuing IDs if a renewal is missed, so
+-- a slot is never live in two processes.
+CREATE TABLE IF NOT EXISTS id_worker_leases (
+    worker_id SMALLINT UNSIGNED NOT NULL PRIMARY KEY,
+    owner VARCHAR(128) NULL,             -- hostname:pid:nonce
+    expires_at DATETIME(3) NOT NULL,
+    INDEX idx_worker_leases_expiry (expires_at)
+) ENGINE=InnoDB;
+
+SET SESSION cte_max_recursion_depth = 1024;
+INSERT IGNORE INTO id_worker_leases (worker_id, owner, expires_at)
+WITH RECURSIVE slots (n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM slots WHERE n < 1023)
+SELECT n, NULL, '1970-01-01 00:00:00' FROM slots;
+
+-- Verify the change
+SELECT COUNT(*) AS slots FROM id_worker_leases;
@@ -0,0 +1,162 @@
+"""
+Name enquiry: account number + bank -> account holder name, so the agent can
+confirm "Send ₦5,000 to Bisola Adebayo?" before the transfer.
+
+Providers resolve per bank: TunjiaX accounts with one indexed query
+(migration 008_account_number_index.sql), other banks through
+ExternalBankStub until a real NIP name-enquiry client is plugged in
+(NAME_ENQUIRY_EXTERNAL=none turns external lookups off).
+
+Answers are kept in a bounded LRU - names for NAME_ENQUIRY_TTL, "no such
+account" for the shorter NAME_ENQUIRY_NEGATIVE_TTL - so repeats, and numbers
+the prefetcher already resolved while Gemini was thinking, cost no query.
+"""
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from metrics import NAME_ENQUIRIES
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_NUMBER = re.compile(r"^\d{10}$")
+
+
+def bank_code(bank_name: str) -> str:
+    """Provider key for a spoken/typed bank name"""
+    name = (bank_name or "").strip().lower()
+    if not name or "tunjiax" in name:
+        return "tunjiax"
+    return re.sub(r"[^a-z0-9]", "", name.replace("bank", "")) or "unknown"
+
+
+class TunjiaXProvider:
+    """Our own accounts: one indexed lookup on accounts.account_number"""
+    def resolve(self, account_number: str) -> Optional[str]:
+        from tools import get_db_connection, timed_query
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            with timed_query("name_enquiry"):
+                cursor.execute(
+                    """
+                    SELECT u.full_name FROM accounts a
+                    JOIN users u ON u.user_id = a.user_id
+                    WHERE a.account_number = %s AND a.is_active = TRUE
+                    LIMIT 1
+                    """,
+                    (account_number,)
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
+            conn.close()
+
+
+class ExternalBankStub:
+    """
+    Stand-in for an interbank (NIP) name enquiry: a deterministic name per
+    account number, plus a small simulated delay, so the flow can be
+    exercised locally. Numbers starting with 0000 do not exist.
+    """
+    FIRST = ("Adaeze", "Babatunde", "Chinedu", "Damilola", "Emeka", "Funmilayo", "Ibrahim", "Kemi", "Ngozi", "Yusuf")
+    LAST = ("Adeyemi", "Okafor", "Bello", "Eze", "Ogunleye", "Nwosu", "Abubakar", "Balogun", "Okonkwo", "Lawal")
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+
+    def resolve(self, account_number: str) -> Optional[str]:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if account_number.startswith("0000"):
+            return None
+        digest = hashlib.sha1(account_number.encode()).digest()
+        return f"{self.FIRST[digest[0] % len(self.FIRST)]} {self.LAST[digest[1] % len(self.LAST)]}"
+
+
+class NameEnquiryService:
+    def __init__(self, providers: Dict[str, object], external=None, max_entries: int = 10000,
+                 ttl: float = 3600, negative_ttl: float = 60):
+        self.providers = providers
+        self.external = external
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[Optional[str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        external = None
+        if os.getenv("NAME_ENQUIRY_EXTERNAL", "stub").lower() == "stub":
+            external = ExternalBankStub(float(os.getenv("NAME_ENQUIRY_STUB_LATENCY", "0")))
+        return cls(
+            providers={"tunjiax": TunjiaXProvider()},
+            external=external,
+            max_entries=int(os.getenv("NAME_ENQUIRY_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("NAME_ENQUIRY_TTL", "3600")),
+            negative_ttl=float(os.getenv("NAME_ENQUIRY_NEGATIVE_TTL", "60")),
+        )
+
+    def _cached(self, key: Tuple[str, str], now: float):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: Tuple[str, str], name: Optional[str], now: float):
+        with self._lock:
+            self.entries[key] = (name, now + (self.ttl if name else self.negative_ttl))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def resolve(self, account_number: str, bank_name: str = "TunjiaX") -> dict:
+        """
+        Returns {"status": found / not_found / invalid / unsupported, "account_name", "account_number", "bank"}.
+        Provider errors propagate and are not cached.
+        """
+        account_number = re.sub(r"\D", "", str(account_number or ""))
+        result = {"status": "invalid", "account_name": None, "account_number": account_number, "bank": bank_name}
+        if not ACCOUNT_NUMBER.match(account_number):
+            NAME_ENQUIRIES.inc("invalid")
+            return result
+
+        code = bank_code(bank_name)
+        provider = self.providers.get(code, self.external)
+        if provider is None:
+            NAME_ENQUIRIES.inc("unsupported")
+            result["status"] = "unsupported"
+            return result
+
+        key, now = (code, account_number), time.monotonic()
+        entry = self._cached(key, now)
+        if entry is not None:
+            name = entry[0]
+            NAME_ENQUIRIES.inc("cache_hit" if name else "negative_hit")
+        else:
+            name = provider.resolve(account_number)
+            self._store(key, name, now)
+            NAME_ENQUIRIES.inc("resolved" if name else "not_found")
+        result["status"] = "found" if name else "not_found"
+        result["account_name"] = name
+        return result
+
+    def invalidate(self, account_number: str, bank_name: str = "TunjiaX"):
+        """Drops a cached answer (account opened, closed or renamed)"""
+        with self._lock:
+            self.entries.pop((bank_code(bank_name), account_number), None)
+
+
+# One cache per process
+service = NameEnquiryService.from_env()
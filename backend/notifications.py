@@ -0,0 +1,240 @@
+"""
+Real-time balance notifications via a transactional outbox
+(migration 010_notification_outbox.sql).
+
+    transfer / funding  --same DB transaction-->  notification_outbox
+    OutboxDispatcher (every instance)  --batches-->  NotificationHub
+    GET /notifications/stream (SSE)  <--per-user queue--  NotificationHub
+
+An event exists exactly when its money movement committed. Every instance
+reads all new outbox rows (while it has streams) and hands each to the
+streams of its user connected there, so a credit written on one instance
+reaches the receiver's stream on another. Events are keyed by
+time-ordered IDs; each poll re-reads the last OUTBOX_OVERLAP_SECONDS so a
+slow commit with an older ID is not skipped, and a short seen-set drops the
+repeats. Clients resume after a reconnect with Last-Event-ID (replay()).
+"""
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from id_generator import ids, max_id_at
+from metrics import NOTIFICATIONS
+from tools import get_db_connection, timed_query
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+OVERLAP_SECONDS = float(os.getenv("OUTBOX_OVERLAP_SECONDS", "5"))
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+RETENTION_HOURS = float(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+CLEANUP_INTERVAL = 600
+REPLAY_LIMIT = 100
+
+
+def enqueue(cursor, events: Sequence[Tuple[int, str, dict]]):
+    """
+    Writes (user_id, kind, payload) events inside the caller's transaction;
+    call dispatcher.notify() after the commit.
+    """
+    if not events:
+        return
+    with timed_query("outbox_insert"):
+        cursor.executemany(
+            "INSERT INTO notification_outbox (event_id, user_id, kind, payload, created_at) VALUES (%s, %s, %s, %s, NOW(3))",
+            [(ids.next_id(), user_id, kind, json.dumps(payload, separators=(",", ":"))) for user_id, kind, payload in events]
+        )
+
+
+def replay(user_id: int, after_event_id: int) -> List[dict]:
+    """Events for one user after Last-Event-ID, oldest first (bounded by retention and REPLAY_LIMIT)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        with timed_query("outbox_replay"):
+            cursor.execute(
+                """
+                SELECT event_id, user_id, kind, payload FROM notification_outbox
+                WHERE user_id = %s AND event_id > %s
+                ORDER BY event_id LIMIT %s
+                """,
+                (user_id, after_event_id, REPLAY_LIMIT)
+            )
+            return [_event(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _event(row) -> dict:
+    event_id, user_id, kind, payload = row
+    return {"id": int(event_id), "user_id": user_id, "kind": kind, "data": json.loads(payload)}
+
+
+class RecentIds:
+    """Bounded set of event IDs already sent on one stream"""
+    def __init__(self, max_ids: int = 1000):
+        self.max_ids = max_ids
+        self.ids: Dict[int, None] = {}
+
+    def add(self, event_id: int) -> bool:
+        """True if the ID is new"""
+        if event_id in self.ids:
+            return False
+        self.ids[event_id] = None
+        if len(self.ids) > self.max_ids:
+            del self.ids[next(iter(self.ids))]
+        return True
+
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['kind']}\ndata: {json.dumps(event['data'], separators=(',', ':'))}\n\n"
+
+
+class NotificationHub:
+    """Per-user bounded queues for the streams connected to this instance"""
+    def __init__(self, max_streams_per_user: int = 5, queue_size: int = 100):
+        self.max_streams_per_user = max_streams_per_user
+        self.queue_size = queue_size
+        self.streams: Dict[int, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, user_id: int) -> Optional[asyncio.Queue]:
+        streams = self.streams.setdefault(user_id, set())
+        if len(streams) >= self.max_streams_per_user:
+            return None
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        streams.add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        streams = self.streams.get(user_id)
+        if streams is not None:
+            streams.discard(queue)
+            if not streams:
+                del self.streams[user_id]
+
+    def publish(self, event: dict) -> int:
+        """Queues the event on every stream of its user; a stalled stream loses its oldest event"""
+        delivered = 0
+        for queue in self.streams.get(event["user_id"], ()):
+            if queue.full():
+                queue.get_nowait()
+                NOTIFICATIONS.inc("dropped")
+            queue.put_nowait(event)
+            delivered += 1
+        return delivered
+
+    def connections(self) -> int:
+        return sum(len(streams) for streams in self.streams.values())
+
+
+class OutboxDispatcher:
+    """asyncio worker moving committed outbox rows to this instance's streams"""
+    def __init__(self, hub: NotificationHub):
+        self.hub = hub
+        self.watermark = 0  # highest event_id read
+        self.seen: Dict[int, None] = {}  # event IDs inside the overlap window, oldest first
+        self.wakeup: Optional[asyncio.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.watermark = max_id_at(datetime.now())
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    def notify(self):
+        """Events were committed in this process - poll now instead of at the next interval (thread-safe)"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def _fetch(self, after: int) -> List[dict]:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            with timed_query("outbox_poll"):
+                cursor.execute(
+                    """
+                    SELECT event_id, user_id, kind, payload FROM notification_outbox
+                    WHERE event_id > %s ORDER BY event_id LIMIT %s
+                    """,
+                    (after, BATCH_SIZE)
+                )
+                return [_event(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _cleanup(self) -> int:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            with timed_query("outbox_cleanup"):
+                cursor.execute(
+                    "DELETE FROM notification_outbox WHERE event_id < %s LIMIT 5000",
+                    (max_id_at(datetime.now() - timedelta(hours=RETENTION_HOURS)),)
+                )
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+            conn.close()
+
+    async def poll(self) -> int:
+        """One pass over new outbox rows; returns the number of events delivered to streams"""
+        floor = min(self.watermark, max_id_at(datetime.now() - timedelta(seconds=OVERLAP_SECONDS)))
+        for event_id in [e for e in self.seen if e <= floor]:
+            del self.seen[event_id]
+        if not self.hub.streams:
+            # Nobody connected here - nothing to read; reconnecting clients replay from Last-Event-ID
+            self.watermark = max(self.watermark, floor)
+            return 0
+
+        delivered, after = 0, floor
+        while True:
+            events = await asyncio.to_thread(self._fetch, after)
+            for event in events:
+                if event["id"] in self.seen:
+                    continue
+                self.seen[event["id"]] = None
+                if self.hub.publish(event):
+                    delivered += 1
+                    NOTIFICATIONS.inc("delivered")
+            if events:
+                after = events[-1]["id"]
+                self.watermark = max(self.watermark, after)
+            if len(events) < BATCH_SIZE:
+                return delivered
+
+    async def _run(self):
+        next_cleanup = 0.0
+        while True:
+            try:
+                await self.poll()
+                if self.loop.time() >= next_cleanup:
+                    next_cleanup = self.loop.time() + CLEANUP_INTERVAL
+                    await asyncio.to_thread(self._cleanup)
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+                await asyncio.sleep(5)
+
+
+hub = NotificationHub(
+    max_streams_per_user=int(os.getenv("NOTIFICATION_STREAMS_PER_USER", "5")),
+)
+dispatcher = OutboxDispatcher(hub)
@@ -0,0 +1,188 @@
+import re
+import time
+import logging
+import asyncio
+from typing import Dict, List, Optional
+import tools
+import name_enquiry
+
+logger = logging.getLogger(__name__)
+
+# "send 5k to Bisola", "pay mama 20k", "transfer to my Tunde", "send to Bisola 5k"
+# A trigger word right after another ("want to send ...") is not a name - the match moves on to it
+NAME_PATTERN = re.compile(
+    r"\b(?:to|for|pay|send|give|transfer)\s+(?:(?:to|my)\s+)*"
+    r"(?!(?:to|for|pay|send|give|transfer|my)\b)([A-Za-z][A-Za-z'\-]{1,30})",
+    re.IGNORECASE
+)
+TRANSFER_PATTERN = re.compile(r"\b(send|transfer|pay|give)\b", re.IGNORECASE)
+BALANCE_PATTERN = re.compile(r"\bbalance\b|\bhow much (do|have) i\b", re.IGNORECASE)
+# "account is 0123456789" - spoken numbers may arrive with spaces/dashes between digits
+ACCOUNT_NUMBER_PATTERN = re.compile(r"(?<!\d)(\d(?:[\s-]?\d){9})(?!\d)")
+
+# Words that follow "to"/"send" but are never a beneficiary alias
+STOPWORDS = {
+    "to", "for", "pay", "send", "give", "transfer",
+    "me", "my", "him", "her", "them", "us", "you", "it", "this", "that", "the", "a", "an",
+    "some", "money", "cash", "naira", "account", "bank", "tunjiax", "someone", "somebody",
+    "be", "do", "check", "see", "know", "make", "go", "again", "now", "today", "k",
+}
+
+
+def extract_candidate_names(text: str, max_names: int = 2) -> List[str]:
+    """
+    Cheap local guess at the beneficiary alias Gemini will look up.
+    Returns lowercase candidates in order of appearance.
+    """
+    names = []
+    for match in NAME_PATTERN.finditer(text or ""):
+        name = match.group(1).strip("'-").lower()
+        if name in STOPWORDS or name in names:
+            continue
+        names.append(name)
+        if len(names) >= max_names:
+            break
+    return names
+
+
+class BeneficiaryPrefetcher:
+    """
+    Starts DB lookups for likely tool calls while the first Gemini call is in flight,
+    so the tool handler can return an already-resolved result.
+    """
+    def __init__(self, enabled: bool = True, max_names: int = 2):
+        self.enabled = enabled
+        self.max_names = max_names
+        self.stats = {
+            "turns": 0,
+            "lookups_started": 0,
+            "lookup_hits": 0,
+            "lookup_misses": 0,
+            "balance_started": 0,
+            "balance_hits": 0,
+            "enquiries_started": 0,
+            "enquiry_hits": 0,
+            "wasted": 0,
+            "saved_seconds": 0.0,
+        }
+
+    def start(self, text: str, user_id: int) -> "PrefetchTurn":
+        """Kicks off speculative queries for this turn (must be called from the event loop)"""
+        self.stats["turns"] += 1
+        turn = PrefetchTurn(self, user_id)
+        if not self.enabled:
+            return turn
+
+        for name in extract_candidate_names(text, self.max_names):
+            turn.lookups[name] = turn.launch(tools.lookup_beneficiary, name, user_id=user_id)
+            self.stats["lookups_started"] += 1
+
+        for match in ACCOUNT_NUMBER_PATTERN.finditer(text or ""):
+            number = re.sub(r"\D", "", match.group(1))
+            if number not in turn.enquiries:
+                # TunjiaX is the only bank transfers go to today
+                turn.enquiries[number] = turn.launch(name_enquiry.service.resolve, number, "TunjiaX")
+                self.stats["enquiries_started"] += 1
+
+        if BALANCE_PATTERN.search(text or "") or TRANSFER_PATTERN.search(text or ""):
+            turn.balance = turn.launch(tools.get_balance, user_id)
+            self.stats["balance_started"] += 1
+
+        return turn
+
+    def hit_rate(self) -> float:
+        """Share of lookup_beneficiary tool calls answered by a prefetch"""
+        total = self.stats["lookup_hits"] + self.stats["lookup_misses"]
+        return self.stats["lookup_hits"] / total if total else 0.0
+
+    def summary(self) -> Dict:
+        return {**self.stats, "hit_rate": round(self.hit_rate(), 3)}
+
+
+class PrefetchTurn:
+    """Speculative results for a single process_input call"""
+    def __init__(self, prefetcher: BeneficiaryPrefetcher, user_id: int):
+        self.prefetcher = prefetcher
+        self.user_id = user_id
+        self.lookups: Dict[str, asyncio.Task] = {}
+        self.enquiries: Dict[str, asyncio.Task] = {}
+        self.balance: Optional[asyncio.Task] = None
+        self._consumed = set()
+
+    def launch(self, func, *args, **kwargs) -> asyncio.Task:
+        """Runs a blocking tools.* query in a worker thread, recording how long it took"""
+        async def timed():
+            start = time.perf_counter()
+            result = await asyncio.to_thread(func, *args, **kwargs)
+            return result, time.perf_counter() - start
+        return asyncio.create_task(timed())
+
+    async def _consume(self, task: asyncio.Task):
+        """Awaits a prefetch and credits the part of its runtime that overlapped Gemini"""
+        self._consumed.add(task)
+        wait_start = time.perf_counter()
+        result, duration = await task
+        waited = time.perf_counter() - wait_start
+        self.prefetcher.stats["saved_seconds"] += max(0.0, duration - waited)
+        return result
+
+    async def lookup_beneficiary(self, name: str, user_id: int):
+        """Returns the prefetched lookup if we guessed this name, otherwise queries now"""
+        task = self.lookups.get((name or "").strip().lower())
+        if task is not None and user_id == self.user_id:
+            try:
+                result = await self._consume(task)
+                self.prefetcher.stats["lookup_hits"] += 1
+                return result
+            except Exception as e:
+                logger.warning(f"Speculative lookup failed, retrying: {e}")
+
+        self.prefetcher.stats["lookup_misses"] += 1
+        return await asyncio.to_thread(tools.lookup_beneficiary, name, user_id=user_id)
+
+    async def resolve_account_name(self, account_number: str, bank_name: str):
+        """Returns the prefetched name enquiry if this number was spoken this turn, otherwise resolves now"""
+        number = re.sub(r"\D", "", str(account_number or ""))
+        task = self.enquiries.get(number)
+        if task is not None and name_enquiry.bank_code(bank_name) == "tunjiax":
+            try:
+                result = await self._consume(task)
+                self.prefetcher.stats["enquiry_hits"] += 1
+                return result
+            except Exception as e:
+                logger.warning(f"Speculative name enquiry failed, retrying: {e}")
+
+        return await asyncio.to_thread(name_enquiry.service.resolve, number, bank_name)
+
+    async def get_balance(self, user_id: int):
+        """Returns the prefetched balance if one was started, otherwise queries now"""
+        if self.balance is not None and user_id == self.user_id:
+            try:
+                result = await self._consume(self.balance)
+                self.prefetcher.stats["balance_hits"] += 1
+                return result
+            except Exception as e:
+                logger.warning(f"Speculative balance failed, retrying: {e}")
+
+        return await asyncio.to_thread(tools.get_balance, user_id)
+
+    def invalidate_balance(self):
+        """Drops the prefetched balance once money has moved in this turn"""
+        if self.balance is not None and self.balance not in self._consumed:
+            self.prefetcher.stats["wasted"] += 1
+            self.balance.cancel()
+        self.balance = None
+
+    def finish(self):
+        """Cancels speculative work nobody asked for"""
+        pending = list(self.lookups.values()) + list(self.enquiries.values())
+        if self.balance is not None:
+            pending.append(self.balance)
+        for task in pending:
+            if task in self._consumed:
+                continue
+            self.prefetcher.stats["wasted"] += 1
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # mark retrieved so asyncio doesn't warn
@@ -0,0 +1,58 @@
+import json
+from typing import NamedTuple, Optional
+
+try:
+    import orjson
+except ImportError:  # optional - falls back to stdlib json
+    orjson = None
+
+
+class ChatRequestFields(NamedTuple):
+    """The only parts of a chat-completions request the endpoint uses"""
+    model: Optional[str]
+    stream: bool
+    last_content: Optional[str]
+    message_count: int
+
+
+def loads(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def fast_parse_chat_request(raw: bytes) -> Optional[ChatRequestFields]:
+    """
+    Pulls model, stream and the last message's content straight from the body bytes.
+
+    ElevenLabs resends the whole conversation every turn; validating every
+    Message with pydantic grows with conversation length while only the last
+    one is used. Only the fields we read are type-checked here. Returns None
+    when the body does not look like a well-formed request, so the caller can
+    fall back to full validation (and its error messages).
+    """
+    if not raw:
+        return None
+    try:
+        body = loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(body, dict):
+        return None
+
+    messages = body.get("messages")
+    if not isinstance(messages, list) or not messages:
+        return None
+    last = messages[-1]
+    if not isinstance(last, dict) or not isinstance(last.get("role"), str):
+        return None
+    content = last.get("content")
+    if content is not None and not isinstance(content, str):
+        return None
+
+    model = body.get("model")
+    stream = body.get("stream")
+    if (model is not None and not isinstance(model, str)) or (stream is not None and not isinstance(stream, bool)):
+        return None
+
+    return ChatRequestFields(model=model, stream=bool(stream), last_content=content, message_count=len(messages))
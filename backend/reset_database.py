@@ -6,6 +6,7 @@ Run: python reset_database.py
 import os
 from dotenv import load_dotenv
 from tools import get_db_connection
+from ledger import post_journal, OPENING_BALANCES
 
 load_dotenv()
 
@@ -16,6 +17,16 @@ def reset_and_seed():
     print("🔄 Clearing all data...")
     
     # Clear all tables in order (foreign key constraints)
+    cursor.execute("DELETE FROM journal_entries")
+    cursor.execute("DELETE FROM journal_transactions")
+    cursor.execute("DELETE FROM balance_snapshots")
+    cursor.execute("UPDATE ledger_checkpoints SET journal_id = 0")
+    cursor.execute("DELETE FROM scheduled_transfer_runs")
+    cursor.execute("DELETE FROM scheduled_transfers")
+    cursor.execute("DELETE FROM daily_rollups")
+    cursor.execute("DELETE FROM statement_cache")
+    cursor.execute("DELETE FROM risk_limits")
+    cursor.execute("DELETE FROM notification_outbox")
     cursor.execute("DELETE FROM transactions")
     cursor.execute("DELETE FROM beneficiaries")
     cursor.execute("DELETE FROM accounts")
@@ -66,17 +77,19 @@ def reset_and_seed():
     tunde_id = cursor.lastrowid
     print(f"✅ Created User B: Tunde (user_id={tunde_id})")
     
-    # Create accounts for both users
+    # Create accounts for both users (opening balances go through the ledger)
     cursor.execute("""
         INSERT INTO accounts (user_id, account_number, balance_kobo, is_active)
-        VALUES (%s, %s, %s, TRUE)
-    """, (akeem_id, "1234567890", 500000 * 100))  # ₦500,000
+        VALUES (%s, %s, 0, TRUE)
+    """, (akeem_id, "1234567890"))
+    post_journal(cursor, "opening", [(OPENING_BALANCES, -500000 * 100), (cursor.lastrowid, 500000 * 100)])  # ₦500,000
     print(f"✅ Created account for Akeem: 1234567890 (₦500,000)")
     
     cursor.execute("""
         INSERT INTO accounts (user_id, account_number, balance_kobo, is_active)
-        VALUES (%s, %s, %s, TRUE)
-    """, (tunde_id, "0987654321", 300000 * 100))  # ₦300,000
+        VALUES (%s, %s, 0, TRUE)
+    """, (tunde_id, "0987654321"))
+    post_journal(cursor, "opening", [(OPENING_BALANCES, -300000 * 100), (cursor.lastrowid, 300000 * 100)])  # ₦300,000
     print(f"✅ Created account for Tunde: 0987654321 (₦300,000)")
     
     # NO beneficiaries added - test Gemini's ability to add them
@@ -0,0 +1,405 @@
+"""
+Velocity and fraud checks run before every debit (execute_transfer,
+execute_batch_transfer and scheduled transfers through it).
+
+Rules, per user:
+    per_transfer     - one transfer above RISK_PER_TRANSFER_NGN
+    per_minute_count - more than RISK_PER_MINUTE_COUNT transfers in 60s
+    per_day_count    - more than RISK_PER_DAY_COUNT transfers in 24h
+    per_day_value    - more than RISK_PER_DAY_NGN sent in 24h
+    new_payee        - more than RISK_NEW_PAYEE_NGN to an account first paid
+                       less than RISK_NEW_PAYEE_HOURS ago (cooling period)
+
+Nothing here queries MySQL per transfer. Limits and the payee history are
+loaded once per user (RISK_PROFILE_TTL) into a Profile; the sliding windows
+live in process memory, or in Redis (RISK_REDIS_URL) to share them across
+instances. reserve() checks and records atomically, so concurrent transfers
+cannot both squeeze under a limit; release() undoes a hold whose transfer
+failed. `python bench_risk.py` measures the per-check cost.
+"""
+import os
+import time
+import uuid
+import itertools
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from metrics import RISK_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+DAY = 86400
+
+
+def _ngn_env(name: str, default: int) -> int:
+    return int(float(os.getenv(name, default)) * 100)
+
+
+class Limits:
+    __slots__ = ("per_transfer_kobo", "per_minute_count", "per_day_count", "per_day_kobo", "new_payee_kobo")
+
+    def __init__(self, per_transfer_kobo: int, per_minute_count: int, per_day_count: int, per_day_kobo: int,
+                 new_payee_kobo: int):
+        self.per_transfer_kobo = per_transfer_kobo
+        self.per_minute_count = per_minute_count
+        self.per_day_count = per_day_count
+        self.per_day_kobo = per_day_kobo
+        self.new_payee_kobo = new_payee_kobo
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            per_transfer_kobo=_ngn_env("RISK_PER_TRANSFER_NGN", 500000),
+            per_minute_count=int(os.getenv("RISK_PER_MINUTE_COUNT", "5")),
+            per_day_count=int(os.getenv("RISK_PER_DAY_COUNT", "50")),
+            per_day_kobo=_ngn_env("RISK_PER_DAY_NGN", 1000000),
+            new_payee_kobo=_ngn_env("RISK_NEW_PAYEE_NGN", 50000),
+        )
+
+
+class Profile:
+    """Per-user precomputed state: limits and payee account -> [first paid (epoch), sent while cooling]"""
+    __slots__ = ("limits", "payees", "recent", "loaded_at")
+
+    def __init__(self, limits: Limits, payees: Dict[str, List[float]] = None,
+                 recent: List[Tuple[float, int]] = None, loaded_at: float = 0.0):
+        self.limits = limits
+        self.payees = payees or {}
+        self.recent = recent or []  # (epoch, amount_kobo) debits of the last day, to seed the windows
+        self.loaded_at = loaded_at
+
+
+class Hold:
+    __slots__ = ("allowed", "rule", "message", "user_id", "token", "amount_kobo", "payee", "new_payee")
+
+    def __init__(self, allowed: bool, rule: str = None, message: str = "", user_id: int = None, token: str = None,
+                 amount_kobo: int = 0, payee: str = None, new_payee: bool = False):
+        self.allowed = allowed
+        self.rule = rule
+        self.message = message
+        self.user_id = user_id
+        self.token = token
+        self.amount_kobo = amount_kobo
+        self.payee = payee
+        self.new_payee = new_payee
+
+
+class _Window:
+    """Entries (epoch, amount, token) in the last `span` seconds with running count/sum"""
+    __slots__ = ("span", "entries", "total")
+
+    def __init__(self, span: float):
+        self.span = span
+        self.entries = deque()
+        self.total = 0
+
+    def prune(self, now: float):
+        entries = self.entries
+        while entries and entries[0][0] <= now - self.span:
+            self.total -= entries.popleft()[1]
+
+    def add(self, now: float, amount: int, token: str):
+        self.entries.append((now, amount, token))
+        self.total += amount
+
+    def remove(self, token: str):
+        for entry in self.entries:
+            if entry[2] == token:
+                self.entries.remove(entry)
+                self.total -= entry[1]
+                return
+
+
+class InMemoryWindowStore:
+    """Sliding windows in process memory (per Cloud Run instance)"""
+    def __init__(self, max_users: int = 100000):
+        self.users: Dict[int, Tuple[_Window, _Window]] = {}
+        self.max_users = max_users
+        self._lock = threading.Lock()
+
+    def has(self, user_id: int) -> bool:
+        return user_id in self.users
+
+    def seed(self, user_id: int, recent: List[Tuple[float, int]]):
+        with self._lock:
+            if user_id in self.users:
+                return
+            minute, day = self.users[user_id] = (_Window(MINUTE), _Window(DAY))
+            for when, amount in sorted(recent):
+                token = f"seed:{when}"
+                minute.add(when, amount, token)
+                day.add(when, amount, token)
+
+    def reserve(self, user_id: int, token: str, amount: int, now: float, limits: Limits) -> Optional[str]:
+        """Adds the transfer if every window rule still holds; returns the violated rule otherwise"""
+        with self._lock:
+            windows = self.users.get(user_id)
+            if windows is None:
+                windows = self.users[user_id] = (_Window(MINUTE), _Window(DAY))
+                if len(self.users) > self.max_users:
+                    self._prune(now)
+            minute, day = windows
+            minute.prune(now)
+            day.prune(now)
+            if len(minute.entries) >= limits.per_minute_count:
+                return "per_minute_count"
+            if len(day.entries) >= limits.per_day_count:
+                return "per_day_count"
+            if day.total + amount > limits.per_day_kobo:
+                return "per_day_value"
+            minute.add(now, amount, token)
+            day.add(now, amount, token)
+            return None
+
+    def release(self, user_id: int, token: str):
+        with self._lock:
+            for window in self.users.get(user_id, ()):
+                window.remove(token)
+
+    def _prune(self, now: float):
+        for user_id in [u for u, (_, day) in self.users.items() if not day.entries or day.entries[-1][0] <= now - DAY]:
+            del self.users[user_id]
+
+
+class RedisWindowStore:
+    """
+    Windows shared across instances (RISK_REDIS_URL, needs the `redis` package):
+    a sorted set of tokens scored by time plus a hash of amounts per user,
+    checked and updated atomically by a Lua script.
+    """
+    SCRIPT = """
+    local now, amount = tonumber(ARGV[1]), tonumber(ARGV[2])
+    local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now - 86400)
+    if #expired > 0 then
+        redis.call('ZREM', KEYS[1], unpack(expired))
+        redis.call('HDEL', KEYS[2], unpack(expired))
+    end
+    if redis.call('ZCOUNT', KEYS[1], '(' .. (now - 60), '+inf') >= tonumber(ARGV[4]) then return 'per_minute_count' end
+    if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[5]) then return 'per_day_count' end
+    local total = 0
+    for _, value in ipairs(redis.call('HVALS', KEYS[2])) do total = total + tonumber(value) end
+    if total + amount > tonumber(ARGV[6]) then return 'per_day_value' end
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('HSET', KEYS[2], ARGV[3], amount)
+    redis.call('EXPIRE', KEYS[1], 86400)
+    redis.call('EXPIRE', KEYS[2], 86400)
+    return ''
+    """
+
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.from_url(url)
+        self.script = self.client.register_script(self.SCRIPT)
+
+    @staticmethod
+    def _keys(user_id: int) -> List[str]:
+        return [f"risk:{user_id}:t", f"risk:{user_id}:a"]
+
+    def has(self, user_id: int) -> bool:
+        return True  # shared state outlives instances - nothing to seed
+
+    def seed(self, user_id: int, recent: List[Tuple[float, int]]):
+        pass
+
+    def reserve(self, user_id: int, token: str, amount: int, now: float, limits: Limits) -> Optional[str]:
+        rule = self.script(keys=self._keys(user_id), args=[now, amount, token, limits.per_minute_count,
+                                                           limits.per_day_count, limits.per_day_kobo])
+        rule = rule.decode() if isinstance(rule, bytes) else rule
+        return rule or None
+
+    def release(self, user_id: int, token: str):
+        times, amounts = self._keys(user_id)
+        pipe = self.client.pipeline()
+        pipe.zrem(times, token)
+        pipe.hdel(amounts, token)
+        pipe.execute()
+
+
+def load_profile(user_id: int, cooling_seconds: float, defaults: Limits) -> Profile:
+    """Two indexed queries per user per RISK_PROFILE_TTL - never on the per-transfer path"""
+    from tools import get_db_connection, timed_query
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        limits = defaults
+        with timed_query("risk_select_limits"):
+            cursor.execute(
+                """
+                SELECT per_transfer_kobo, per_minute_count, per_day_count, per_day_kobo, new_payee_kobo
+                FROM risk_limits WHERE user_id = %s
+                """,
+                (user_id,)
+            )
+            row = cursor.fetchone()
+        if row:
+            # NULL columns keep the default
+            limits = Limits(*(value if value is not None else default for value, default in
+                              zip(row, (getattr(defaults, name) for name in Limits.__slots__))))
+        with timed_query("risk_select_payees"):
+            cursor.execute(
+                """
+                SELECT counterparty_account, UNIX_TIMESTAMP(MIN(created_at)),
+                       SUM(CASE WHEN created_at > NOW() - INTERVAL %s SECOND THEN amount_kobo ELSE 0 END)
+                FROM transactions
+                WHERE user_id = %s AND type = 'DEBIT' AND status = 'SUCCESS'
+                GROUP BY counterparty_account
+                """,
+                (int(cooling_seconds), user_id)
+            )
+            payees = {str(account): [float(first), int(spent or 0)] for account, first, spent in cursor.fetchall() if account}
+        with timed_query("risk_select_recent"):
+            cursor.execute(
+                """
+                SELECT UNIX_TIMESTAMP(created_at), amount_kobo FROM transactions
+                WHERE user_id = %s AND type = 'DEBIT' AND status = 'SUCCESS' AND created_at > NOW() - INTERVAL 1 DAY
+                """,
+                (user_id,)
+            )
+            recent = [(float(when), int(amount)) for when, amount in cursor.fetchall()]
+        return Profile(limits, payees, recent)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class RiskEngine:
+    def __init__(self, store=None, loader: Callable[[int], Profile] = None, cooling_seconds: float = 86400,
+                 profile_ttl: float = 300, enabled: bool = True, clock: Callable[[], float] = time.time,
+                 max_profiles: int = 100000):
+        self.enabled = enabled
+        self.store = store or InMemoryWindowStore()
+        self.defaults = Limits.from_env()
+        self.cooling_seconds = cooling_seconds
+        self.loader = loader or (lambda user_id: load_profile(user_id, self.cooling_seconds, self.defaults))
+        self.profile_ttl = profile_ttl
+        self.clock = clock
+        self.profiles: Dict[int, Profile] = {}
+        self.max_profiles = max_profiles
+        # Hold tokens: unique per engine, and across instances when the store is shared
+        self._token_prefix = uuid.uuid4().hex[:12]
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        store = None
+        redis_url = os.getenv("RISK_REDIS_URL")
+        if redis_url:
+            try:
+                store = RedisWindowStore(redis_url)
+            except ImportError:
+                logger.warning("RISK_REDIS_URL set but redis is not installed; using in-memory velocity windows")
+        return cls(
+            store=store,
+            cooling_seconds=float(os.getenv("RISK_NEW_PAYEE_HOURS", "24")) * 3600,
+            profile_ttl=float(os.getenv("RISK_PROFILE_TTL", "300")),
+            enabled=os.getenv("RISK_CHECKS", "1").lower() not in ("0", "false", "no"),
+        )
+
+    def profile(self, user_id: int, now: float) -> Profile:
+        profile = self.profiles.get(user_id)
+        if profile is None or now - profile.loaded_at > self.profile_ttl:
+            fresh = self.loader(user_id)
+            fresh.loaded_at = now
+            if profile is not None:
+                # Keep holds made since the last load that the DB may not show yet
+                for account, (first, spent) in profile.payees.items():
+                    known = fresh.payees.setdefault(account, [first, spent])
+                    known[0], known[1] = min(known[0], first), max(known[1], spent)
+            with self._lock:
+                self.profiles[user_id] = profile = fresh
+                if len(self.profiles) > self.max_profiles:
+                    for stale in [u for u, p in self.profiles.items() if now - p.loaded_at > self.profile_ttl]:
+                        del self.profiles[stale]
+            if not self.store.has(user_id):
+                self.store.seed(user_id, fresh.recent)
+            fresh.recent = []
+        return profile
+
+    def reserve(self, user_id: int, amount_kobo: int, payee: str = None) -> Hold:
+        """Evaluates every rule and, if allowed, records the transfer; release() the hold if it then fails"""
+        if not self.enabled:
+            return Hold(True)
+        now = self.clock()
+        try:
+            profile = self.profile(user_id, now)
+        except Exception as e:
+            # A DB hiccup loading limits must not block payments outright - the defaults still apply
+            logger.warning(f"Risk profile unavailable, using defaults: {e}")
+            profile = Profile(self.defaults, loaded_at=now - self.profile_ttl)
+            with self._lock:
+                self.profiles.setdefault(user_id, profile)
+        limits = profile.limits
+
+        if amount_kobo > limits.per_transfer_kobo:
+            return self._deny(user_id, "per_transfer", f"The most you can send in one transfer is ₦{limits.per_transfer_kobo / 100:,.0f}")
+
+        payee = str(payee) if payee else None
+        new_payee, cooling = False, None
+        if payee:
+            with self._lock:
+                cooling = profile.payees.get(payee)
+                if cooling is None:
+                    cooling = profile.payees[payee] = [now, 0]
+                    new_payee = True
+                if now - cooling[0] < self.cooling_seconds:
+                    if cooling[1] + amount_kobo > limits.new_payee_kobo:
+                        if new_payee:
+                            del profile.payees[payee]
+                        return self._deny(user_id, "new_payee",
+                                          f"This is a new recipient - you can send up to ₦{limits.new_payee_kobo / 100:,.0f} "
+                                          f"to them in the first {self.cooling_seconds / 3600:.0f} hours")
+                    cooling[1] += amount_kobo
+                else:
+                    cooling = None
+
+        token = f"{self._token_prefix}:{next(self._tokens)}"
+        try:
+            rule = self.store.reserve(user_id, token, amount_kobo, now, limits)
+        except Exception as e:
+            # A shared-store outage must not take payments down; per-transfer and payee rules still ran
+            logger.warning(f"Risk window store unavailable, allowing transfer: {e}")
+            rule = None
+        if rule:
+            self._undo_payee(profile, payee, amount_kobo, cooling, new_payee)
+            messages = {
+                "per_minute_count": "Too many transfers in the last minute - please wait a moment",
+                "per_day_count": f"You have reached the limit of {limits.per_day_count} transfers per day",
+                "per_day_value": f"This would exceed your daily limit of ₦{limits.per_day_kobo / 100:,.0f}",
+            }
+            return self._deny(user_id, rule, messages[rule])
+        RISK_DECISIONS.inc("allowed")
+        return Hold(True, user_id=user_id, token=token, amount_kobo=amount_kobo,
+                    payee=payee if cooling is not None else None, new_payee=new_payee)
+
+    def release(self, hold: Hold):
+        """Gives back a hold whose transfer was not committed"""
+        if not hold or not hold.allowed or hold.token is None:
+            return
+        try:
+            self.store.release(hold.user_id, hold.token)
+        except Exception as e:
+            logger.warning(f"Risk window release failed: {e}")
+        profile = self.profiles.get(hold.user_id)
+        if profile and hold.payee:
+            self._undo_payee(profile, hold.payee, hold.amount_kobo, profile.payees.get(hold.payee), hold.new_payee)
+
+    def _undo_payee(self, profile: Profile, payee: Optional[str], amount_kobo: int, cooling: Optional[list], new_payee: bool):
+        if not payee or cooling is None:
+            return
+        with self._lock:
+            cooling[1] = max(0, cooling[1] - amount_kobo)
+            if new_payee and cooling[1] == 0:
+                profile.payees.pop(payee, None)
+
+    @staticmethod
+    def _deny(user_id: int, rule: str, message: str) -> Hold:
+        RISK_DECISIONS.inc(rule)
+        logger.info("Transfer blocked by risk rule", extra={"user_id": user_id, "rule": rule})
+        return Hold(False, rule=rule, message=message)
+
+
+# One engine per process
+engine = RiskEngine.from_env()
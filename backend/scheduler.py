@@ -0,0 +1,370 @@
+"""
+Scheduled and recurring transfers (migration 004_scheduled_transfers.sql).
+
+A schedule is a transfer plus a frequency (once/daily/weekly/monthly). Occurrence
+n is computed from start_at, so monthly schedules keep their day of month
+(clamped to short months) instead of drifting.
+
+TransferScheduler keeps a heap of upcoming due times (refreshed from the DB every
+SCHEDULER_HORIZON seconds, and pushed to directly when a schedule is created
+here) and sleeps until the earliest one. On waking, run_due():
+  1. claims due rows with a lease (UPDATE ... claimed_by/claimed_until), so only
+     one instance fires a schedule; a crashed instance's lease simply expires
+  2. records each occurrence in scheduled_transfer_runs first - the
+     (schedule_id, occurrence) key makes firing at-most-once even across retries
+  3. executes due jobs per user through execute_batch_transfer (per_item)
+  4. advances next_run_at and releases the claim
+
+After downtime, SCHEDULER_CATCHUP=latest (default) sends only the most recent
+missed occurrence and skips older ones; `all` sends each (up to SCHEDULER_MAX_CATCHUP).
+"""
+import os
+import uuid
+import heapq
+import asyncio
+import calendar
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from id_generator import ids
+from tools import get_db_connection, timed_query, execute_batch_transfer, BATCH_TRANSFER_MAX_ITEMS
+
+logger = logging.getLogger(__name__)
+
+FREQUENCIES = ("once", "daily", "weekly", "monthly")
+LEASE_SECONDS = float(os.getenv("SCHEDULER_LEASE_SECONDS", "300"))
+HORIZON_SECONDS = float(os.getenv("SCHEDULER_HORIZON", "60"))
+CATCHUP = os.getenv("SCHEDULER_CATCHUP", "latest")
+MAX_CATCHUP = int(os.getenv("SCHEDULER_MAX_CATCHUP", "12"))
+BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "100"))
+
+SCHEDULE_COLUMNS = ("schedule_id", "user_id", "amount_kobo", "beneficiary_name", "bank_name", "account_number",
+                    "frequency", "start_at", "run_count", "max_runs", "next_run_at")
+
+
+def utcnow() -> datetime:
+    """Naive UTC, matching the DATETIME columns"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _add_months(start: datetime, months: int) -> datetime:
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return start.replace(year=year, month=month, day=min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence(start_at: datetime, frequency: str, n: int) -> datetime:
+    """When the n-th run (0-based) is due"""
+    if frequency == "daily":
+        return start_at + timedelta(days=n)
+    if frequency == "weekly":
+        return start_at + timedelta(weeks=n)
+    if frequency == "monthly":
+        return _add_months(start_at, n)
+    return start_at
+
+
+def _is_date_only(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def create_schedule(user_id: int, amount: int, beneficiary_name: str, bank_name: str, account_number: str,
+                    frequency: str = "once", start_date: str = None, occurrences: int = None) -> dict:
+    """
+    Persists a schedule. amount is in Naira; start_date is ISO (date or datetime, UTC),
+    defaulting to now for recurring schedules.
+    """
+    frequency = (frequency or "once").lower()
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+    if not isinstance(amount, (int, float)) or amount <= 0 or int(amount) != amount:
+        raise ValueError("Amount must be a positive whole Naira amount")
+    if len(str(account_number or "")) != 10 or not str(account_number).isdigit():
+        raise ValueError("Account number must be 10 digits")
+    now = utcnow()
+    start_at = datetime.fromisoformat(start_date) if start_date else now
+    if start_date and _is_date_only(start_date) and start_at.date() == now.date():
+        start_at = now  # "start today" - midnight has already passed
+    if start_at.tzinfo is not None:
+        start_at = start_at.astimezone(timezone.utc).replace(tzinfo=None)
+    if start_at < now - timedelta(minutes=1):
+        raise ValueError("Start date is in the past")
+    max_runs = 1 if frequency == "once" else (int(occurrences) if occurrences else None)
+
+    schedule_id = ids.next_id()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        with timed_query("schedule_insert"):
+            cursor.execute(
+                """
+                INSERT INTO scheduled_transfers
+                (schedule_id, user_id, amount_kobo, beneficiary_name, bank_name, account_number,
+                 frequency, start_at, run_count, max_runs, next_run_at, status, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 0, %s, %s, 'active', %s)
+                """,
+                (schedule_id, user_id, int(amount) * 100, beneficiary_name, bank_name, str(account_number),
+                 frequency, start_at, max_runs, start_at, now)
+            )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    scheduler.notify(start_at)
+    logger.info("Transfer scheduled", extra={"schedule_id": schedule_id, "frequency": frequency})
+    return {"schedule_id": str(schedule_id), "frequency": frequency, "first_run_at": start_at.isoformat(timespec="minutes"),
+            "max_runs": max_runs}
+
+
+def list_schedules(user_id: int) -> List[dict]:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        with timed_query("schedule_list"):
+            cursor.execute(
+                """
+                SELECT schedule_id, amount_kobo, beneficiary_name, bank_name, frequency, next_run_at, run_count, max_runs
+                FROM scheduled_transfers
+                WHERE user_id = %s AND status = 'active'
+                ORDER BY next_run_at
+                """,
+                (user_id,)
+            )
+            rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    return [{
+        "schedule_id": str(row[0]), "amount_ngn": f"{row[1] / 100:,.0f}", "beneficiary_name": row[2], "bank_name": row[3],
+        "frequency": row[4], "next_run_at": row[5].isoformat(timespec="minutes"), "runs": row[6], "max_runs": row[7],
+    } for row in rows]
+
+
+def cancel_schedule(user_id: int, schedule_id) -> bool:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        with timed_query("schedule_cancel"):
+            cursor.execute(
+                "UPDATE scheduled_transfers SET status = 'cancelled' WHERE schedule_id = %s AND user_id = %s AND status = 'active'",
+                (int(schedule_id), user_id)
+            )
+            cancelled = cursor.rowcount > 0
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    return cancelled
+
+
+def _due_occurrences(row: dict, now: datetime) -> Tuple[List[Tuple[int, datetime]], int]:
+    """(occurrences to fire, occurrences skipped) for a claimed schedule"""
+    due = []
+    n = row["run_count"]
+    while occurrence(row["start_at"], row["frequency"], n) <= now:
+        if row["max_runs"] is not None and n >= row["max_runs"]:
+            break
+        due.append((n, occurrence(row["start_at"], row["frequency"], n)))
+        n += 1
+        if row["frequency"] == "once":
+            break
+    if CATCHUP == "all":
+        return due[-MAX_CATCHUP:], max(len(due) - MAX_CATCHUP, 0)
+    return due[-1:], max(len(due) - 1, 0)
+
+
+def _fire(user_id: int, user_jobs: List[Tuple[dict, int]]) -> List[Tuple[str, Optional[str], str, int, int]]:
+    """
+    Sends one user's due occurrences in batches of at most BATCH_TRANSFER_MAX_ITEMS.
+    Returns (status, transaction_id, message, schedule_id, occurrence) for every job;
+    a job the batch did not report on is failed, never left 'running'.
+    """
+    outcomes = []
+    for start in range(0, len(user_jobs), BATCH_TRANSFER_MAX_ITEMS):
+        chunk = user_jobs[start:start + BATCH_TRANSFER_MAX_ITEMS]
+        items = [{"amount": row["amount_kobo"] // 100, "beneficiary_name": row["beneficiary_name"],
+                  "bank_name": row["bank_name"], "account_number": row["account_number"]} for row, _ in chunk]
+        result = execute_batch_transfer(items, user_id=user_id, mode="per_item")
+        results = result.get("results") or []
+        for i, (row, n) in enumerate(chunk):
+            item = results[i] if i < len(results) else None
+            if item is None:
+                outcomes.append(("failed", None, (result.get("message") or "Not attempted")[:255], row["schedule_id"], n))
+            else:
+                outcomes.append((item["status"] if item["status"] == "success" else "failed", item["transaction_id"],
+                                 (item["message"] or "")[:255], row["schedule_id"], n))
+    return outcomes
+
+
+def run_due(now: datetime = None, limit: int = None) -> int:
+    """Claims and fires due schedules; returns the number of schedules claimed"""
+    now = now or utcnow()
+    token = f"{ids.worker_id}:{uuid.uuid4().hex[:12]}"
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        with timed_query("schedule_claim"):
+            cursor.execute(
+                """
+                UPDATE scheduled_transfers SET claimed_by = %s, claimed_until = %s
+                WHERE status = 'active' AND next_run_at <= %s AND (claimed_until IS NULL OR claimed_until < %s)
+                ORDER BY next_run_at
+                LIMIT %s
+                """,
+                (token, now + timedelta(seconds=LEASE_SECONDS), now, now, limit or BATCH_SIZE)
+            )
+            conn.commit()
+            if cursor.rowcount == 0:
+                return 0
+            cursor.execute(f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM scheduled_transfers WHERE claimed_by = %s", (token,))
+            claimed = [dict(zip(SCHEDULE_COLUMNS, row)) for row in cursor.fetchall()]
+
+        # Occurrence markers first: an occurrence that already has one was fired (or is
+        # in doubt after a crash) and is never sent again
+        jobs: Dict[int, List[Tuple[dict, int]]] = {}
+        advanced: Dict[int, int] = {}
+        for row in claimed:
+            fire, skipped = _due_occurrences(row, now)
+            advanced[row["schedule_id"]] = row["run_count"] + skipped + len(fire)
+            for n, due_at in fire:
+                cursor.execute(
+                    """
+                    INSERT IGNORE INTO scheduled_transfer_runs (schedule_id, occurrence, due_at, status, created_at)
+                    VALUES (%s, %s, %s, 'running', %s)
+                    """,
+                    (row["schedule_id"], n, due_at, now)
+                )
+                if cursor.rowcount:
+                    jobs.setdefault(row["user_id"], []).append((row, n))
+            if skipped:
+                logger.warning("Skipped missed occurrences", extra={"schedule_id": row["schedule_id"], "skipped": skipped})
+        conn.commit()
+
+        # Batches per user through the transfer engine
+        outcomes, attempted = [], 0
+        for user_id, user_jobs in jobs.items():
+            outcomes += _fire(user_id, user_jobs)
+            attempted += len(user_jobs)
+
+        with timed_query("schedule_advance"):
+            if outcomes:
+                cursor.executemany(
+                    "UPDATE scheduled_transfer_runs SET status = %s, transaction_id = %s, message = %s WHERE schedule_id = %s AND occurrence = %s",
+                    outcomes
+                )
+            failures = {}
+            for status, _, _, schedule_id, _ in outcomes:
+                if status != "success":
+                    failures[schedule_id] = failures.get(schedule_id, 0) + 1
+            updates = []
+            for row in claimed:
+                run_count = advanced[row["schedule_id"]]
+                finished = row["frequency"] == "once" or (row["max_runs"] is not None and run_count >= row["max_runs"])
+                updates.append((
+                    run_count, occurrence(row["start_at"], row["frequency"], run_count),
+                    "completed" if finished else "active", now, failures.get(row["schedule_id"], 0), row["schedule_id"], token
+                ))
+            cursor.executemany(
+                """
+                UPDATE scheduled_transfers
+                SET run_count = %s, next_run_at = %s, status = IF(status = 'cancelled', status, %s), last_run_at = %s,
+                    failure_count = failure_count + %s, claimed_by = NULL, claimed_until = NULL
+                WHERE schedule_id = %s AND claimed_by = %s
+                """,
+                updates
+            )
+        conn.commit()
+        logger.info("Scheduled transfers run", extra={"claimed": len(claimed), "attempted": attempted,
+                                                      "failed": sum(failures.values())})
+        return len(claimed)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class TransferScheduler:
+    """asyncio worker that sleeps until the earliest known due time"""
+    def __init__(self):
+        self.heap: List[datetime] = []
+        self.wakeup: Optional[asyncio.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    def notify(self, due_at: datetime):
+        """A schedule was created in this process - wake early if it is due before the next refresh"""
+        if self.loop is None:
+            return
+
+        def push():
+            heapq.heappush(self.heap, due_at)
+            self.wakeup.set()
+        self.loop.call_soon_threadsafe(push)
+
+    def _refresh(self, now: datetime):
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            with timed_query("schedule_horizon"):
+                cursor.execute(
+                    """
+                    SELECT next_run_at FROM scheduled_transfers
+                    WHERE status = 'active' AND next_run_at <= %s
+                    ORDER BY next_run_at LIMIT %s
+                    """,
+                    (now + timedelta(seconds=HORIZON_SECONDS), BATCH_SIZE)
+                )
+                return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    async def _run(self):
+        next_refresh = utcnow()
+        while True:
+            try:
+                now = utcnow()
+                if now >= next_refresh:
+                    self.heap = await asyncio.to_thread(self._refresh, now)
+                    heapq.heapify(self.heap)
+                    next_refresh = now + timedelta(seconds=HORIZON_SECONDS)
+
+                if self.heap and self.heap[0] <= now:
+                    while self.heap and self.heap[0] <= now:
+                        heapq.heappop(self.heap)
+                    # A full batch means more may be due - go again straight away
+                    if await asyncio.to_thread(run_due, now) >= BATCH_SIZE:
+                        heapq.heappush(self.heap, now)
+                    continue
+
+                wake_at = min([next_refresh] + self.heap[:1])
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=max((wake_at - now).total_seconds(), 0.05))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Scheduler iteration failed")
+                await asyncio.sleep(5)
+
+
+scheduler = TransferScheduler()
@@ -1,7 +1,11 @@
 import time
+import asyncio
+import logging
 from typing import Dict, List
 from google.genai import types
 
+logger = logging.getLogger(__name__)
+
 class SessionManager:
     """
     Manages conversation sessions with automatic cleanup after 5 minutes of inactivity
@@ -9,6 +13,21 @@ class SessionManager:
     def __init__(self, timeout_seconds: int = 300):  # 5 minutes default
         self.sessions: Dict[str, Dict] = {}
         self.timeout_seconds = timeout_seconds
+        # One lock per session so concurrent requests don't interleave history writes.
+        # asyncio.Lock wakes waiters in FIFO order, so it doubles as the per-session queue.
+        self.locks: Dict[str, asyncio.Lock] = {}
+    
+    def lock(self, session_id: str) -> asyncio.Lock:
+        """Returns the lock guarding a session's chat history"""
+        lock = self.locks.get(session_id)
+        if lock is None:
+            lock = self.locks[session_id] = asyncio.Lock()
+        return lock
+    
+    def _drop_lock(self, session_id: str):
+        lock = self.locks.get(session_id)
+        if lock is not None and not lock.locked():
+            del self.locks[session_id]
     
     def get_or_create_session(self, session_id: str) -> List[types.Content]:
         """
@@ -23,7 +42,7 @@ class SessionManager:
             
             # Check if session expired (5 minutes of inactivity)
             if current_time - last_activity > self.timeout_seconds:
-                print(f"[SESSION] Session {session_id[:8]}... expired, creating new")
+                logger.info(f"Session {session_id[:8]}... expired, creating new")
                 del self.sessions[session_id]
             else:
                 # Update activity timestamp
@@ -31,7 +50,7 @@ class SessionManager:
                 return session['history']
         
         # Create new session
-        print(f"[SESSION] Creating new session: {session_id[:8]}...")
+        logger.debug(f"Creating new session: {session_id[:8]}...")
         self.sessions[session_id] = {
             'history': [],
             'created_at': current_time,
@@ -49,7 +68,8 @@ class SessionManager:
         """Manually clear a session"""
         if session_id in self.sessions:
             del self.sessions[session_id]
-            print(f"[SESSION] Cleared session: {session_id[:8]}...")
+            self._drop_lock(session_id)
+            logger.info(f"Cleared session: {session_id[:8]}...")
     
     def cleanup_expired_sessions(self):
         """Remove all expired sessions (called periodically)"""
@@ -60,9 +80,10 @@ class SessionManager:
         ]
         for sid in expired:
             del self.sessions[sid]
+            self._drop_lock(sid)
         
         if expired:
-            print(f"[SESSION] Cleaned up {len(expired)} expired sessions")
+            logger.info(f"Cleaned up {len(expired)} expired sessions")
         
         return len(expired)
     
@@ -7,6 +7,7 @@ import bcrypt
 from pathlib import Path
 from dotenv import load_dotenv
 from tools import get_db_connection
+from ledger import post_journal, OPENING_BALANCES
 
 load_dotenv()
 
@@ -111,8 +112,9 @@ def setup_test_user():
         if not existing_account:
             cursor.execute("""
                 INSERT INTO accounts (user_id, account_number, balance_kobo)
-                VALUES (%s, %s, %s)
-            """, (user_id, "0123456789", 50000000))  # 500,000 NGN
+                VALUES (%s, %s, 0)
+            """, (user_id, "0123456789"))
+            post_journal(cursor, "opening", [(OPENING_BALANCES, -50000000), (cursor.lastrowid, 50000000)])  # 500,000 NGN
             conn.commit()
             print(f"   ✅ Account created: 0123456789")
         else:
@@ -0,0 +1,59 @@
+import json
+from typing import Iterable, Optional
+
+try:
+    import orjson
+except ImportError:  # optional - stdlib C encoder is used instead
+    orjson = None
+
+DONE = b"data: [DONE]\n\n"
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON as UTF-8 bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+if orjson is not None:
+    def encode_string(text: str) -> bytes:
+        return orjson.dumps(text)
+else:
+    _encode_basestring = json.encoder.encode_basestring
+
+    def encode_string(text: str) -> bytes:
+        return _encode_basestring(text).encode("utf-8")
+
+
+class ChatCompletionStreamEncoder:
+    """
+    Encodes OpenAI-style `chat.completion.chunk` SSE events for one response.
+
+    Everything except the delta is identical from chunk to chunk, so the
+    `data: {..."delta":` prefix and the `,"finish_reason":null}]}` suffix are
+    serialized once; per chunk only the delta text is escaped.
+    """
+    def __init__(self, completion_id: str, created: int, model: str):
+        header = dumps({"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model})
+        # header is `{...}` - reopen it to append choices
+        self.prefix = b"data: " + header[:-1] + b',"choices":[{"index":0,"delta":'
+        self.suffix = b',"finish_reason":null}]}\n\n'
+
+    def role(self, role: str = "assistant") -> bytes:
+        return self.prefix + b'{"role":' + encode_string(role) + b"}" + self.suffix
+
+    def content(self, text: str) -> bytes:
+        return self.prefix + b'{"content":' + encode_string(text) + b"}" + self.suffix
+
+    def contents(self, texts: Iterable[str]) -> bytes:
+        """Several content chunks in one write"""
+        head = self.prefix + b'{"content":'
+        tail = b"}" + self.suffix
+        return b"".join(head + encode_string(text) + tail for text in texts)
+
+    def tool_calls(self, calls: list) -> bytes:
+        return self.prefix + b'{"tool_calls":' + dumps(calls) + b"}" + self.suffix
+
+    def finish(self, reason: Optional[str]) -> bytes:
+        return self.prefix + b'{},"finish_reason":' + dumps(reason) + b"}]}\n\n"
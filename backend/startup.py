@@ -0,0 +1,116 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    def __init__(self, name: str, required: bool):
+        self.name = name
+        self.required = required
+        self.status = "pending"
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "seconds": None if self.seconds is None else round(self.seconds, 3),
+            "error": self.error,
+        }
+
+
+class Warmup:
+    """
+    Startup stages with timings, reported by /api/ready.
+
+    Ready means every required stage succeeded and every background stage has
+    finished (successfully or not - an optional stage failing only degrades).
+    """
+    def __init__(self, import_seconds: float = None):
+        self.import_seconds = import_seconds
+        self.stages: Dict[str, Stage] = {}
+        self.started = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.background: Optional[asyncio.Task] = None
+
+    async def stage(self, name: str, func: Callable[[], Awaitable], required: bool = True):
+        """Runs one stage; failures of required stages propagate"""
+        stage = self.stages.setdefault(name, Stage(name, required))
+        stage.status = "running"
+        start = time.perf_counter()
+        try:
+            result = await func()
+        except Exception as e:
+            stage.status = "failed"
+            stage.error = f"{type(e).__name__}: {e}"
+            logger.exception(f"Startup stage {name} failed")
+            if required:
+                raise
+            return None
+        finally:
+            stage.seconds = time.perf_counter() - start
+        stage.status = "ok"
+        logger.info(f"Startup stage {name} ready", extra={"stage": name, "seconds": round(stage.seconds, 3)})
+        return result
+
+    def start_background(self, stages: List[tuple]):
+        """(name, func, required) stages that run after the server starts accepting traffic"""
+        for name, _, required in stages:
+            self.stages.setdefault(name, Stage(name, required))
+
+        async def run_all():
+            await asyncio.gather(
+                *(self.stage(name, func, required) for name, func, required in stages),
+                return_exceptions=True
+            )
+            self.finished_at = time.monotonic()
+            logger.info("Warmup complete", extra={"ready": self.ready(), "seconds": round(self.finished_at - self.started, 3)})
+
+        self.background = asyncio.create_task(run_all())
+
+    def ready(self) -> bool:
+        if self.background is not None and not self.background.done():
+            return False
+        return all(s.status == "ok" for s in self.stages.values() if s.required)
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready(),
+            "import_seconds": None if self.import_seconds is None else round(self.import_seconds, 3),
+            "warmup_seconds": round((self.finished_at or time.monotonic()) - self.started, 3),
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+        }
+
+    async def stop(self):
+        if self.background is not None and not self.background.done():
+            self.background.cancel()
+            await asyncio.gather(self.background, return_exceptions=True)
+
+
+def warm_face_model():
+    """
+    Imports DeepFace and builds the ArcFace model + OpenCV detector once, so the
+    first /verify-face after a cold start does not pay for TensorFlow and weights.
+    """
+    from deepface import DeepFace
+    DeepFace.build_model("ArcFace")
+    try:
+        DeepFace.build_model("opencv", task="face_detector")
+    except TypeError:
+        pass  # older deepface builds the detector on first use
+
+
+async def session_reaper(session_manager, interval_seconds: float = None):
+    """Drops expired sessions (and their locks) periodically instead of only on access"""
+    interval = interval_seconds or float(os.getenv("SESSION_REAP_INTERVAL", "60"))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            session_manager.cleanup_expired_sessions()
+        except Exception:
+            logger.exception("Session reaper failed")
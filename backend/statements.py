@@ -0,0 +1,323 @@
+"""
+Monthly account statements (CSV / PDF) streamed from the ledger.
+
+Rows are the account's journal entries for the month, read through an
+unbuffered server-side cursor (SSCursor) in STATEMENT_CHUNK_ROWS chunks and
+rendered as they arrive, so memory stays flat whatever the history size.
+Opening and closing balances come from ledger.balance_at, and the rows are
+selected with the same journal-ID bounds, so the running balance always ends
+on the closing balance. Everything is read in one consistent InnoDB snapshot.
+
+Once a month is closed (older than LEDGER_RECONCILE_LAG, so no late commit can
+still land in it) the rendered file is stored in statement_cache
+(migration 006_statements.sql) and served from there.
+"""
+import io
+import os
+import csv
+import logging
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+from pymysql.cursors import SSCursor
+from id_generator import created_at, max_id_at
+from metrics import STATEMENTS
+from tools import get_db_connection, timed_query
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = int(os.getenv("STATEMENT_CHUNK_ROWS", "500"))
+CACHE_MAX_BYTES = int(os.getenv("STATEMENT_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "pdf": "application/pdf"}
+CSV_COLUMNS = ("date", "reference", "description", "debit_ngn", "credit_ngn", "balance_ngn")
+
+
+def month_range(month: str = None, today: date = None) -> Tuple[datetime, datetime]:
+    """[start, end) of a YYYY-MM month; defaults to last month"""
+    if month:
+        start = datetime.strptime(month, "%Y-%m")
+    else:
+        first = (today or date.today()).replace(day=1)
+        start = datetime.combine((first - timedelta(days=1)).replace(day=1), datetime.min.time())
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def is_closed(end: datetime, now: datetime = None) -> bool:
+    from ledger import RECONCILE_LAG_SECONDS
+    return end + timedelta(seconds=RECONCILE_LAG_SECONDS) <= (now or datetime.now())
+
+
+def _ngn(kobo: int) -> str:
+    return f"{kobo / 100:.2f}"
+
+
+def _describe(kind: str, amount: int, counterparty: Optional[str], bank: Optional[str],
+              account: Optional[str], sender: Optional[str]) -> str:
+    if kind == "opening":
+        return "Opening balance"
+    if kind == "funding":
+        return "Wallet funding"
+    if amount < 0:
+        return f"Transfer to {counterparty or 'unknown'} ({bank or ''} {account or ''})".replace(" )", ")")
+    return f"Transfer from {sender or 'unknown'}"
+
+
+class Statement:
+    """One account-month; header fields are loaded by open(), rows by rows()"""
+
+    def __init__(self, user_id: int, start: datetime, end: datetime):
+        self.user_id = user_id
+        self.start = start
+        self.end = end
+        self.period = start.strftime("%Y-%m")
+        # Same bounds as balance_at(start - 1ms) / balance_at(end - 1ms)
+        self.lower = max_id_at(start - timedelta(milliseconds=1))
+        self.upper = max_id_at(end - timedelta(milliseconds=1))
+        self.account_id = None
+        self.account_number = None
+        self.holder = None
+        self.opening_kobo = 0
+        self.closing_kobo = 0
+        self._conn = None
+
+    def open(self) -> bool:
+        """Snapshot + header queries; False if the user has no account"""
+        from ledger import balance_at
+        self._conn = get_db_connection()
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+            with timed_query("statement_select_account"):
+                cursor.execute(
+                    """
+                    SELECT a.account_id, a.account_number, u.full_name FROM accounts a
+                    JOIN users u ON u.user_id = a.user_id
+                    WHERE a.user_id = %s AND a.is_active = TRUE
+                    LIMIT 1
+                    """,
+                    (self.user_id,)
+                )
+                account = cursor.fetchone()
+            if not account:
+                self.close()
+                return False
+            self.account_id, self.account_number, holder = account
+            self.holder = holder or ""
+            self.opening_kobo = balance_at(cursor, self.account_id, self.start - timedelta(milliseconds=1))
+            self.closing_kobo = balance_at(cursor, self.account_id, self.end - timedelta(milliseconds=1))
+            return True
+        except Exception:
+            self.close()
+            raise
+        finally:
+            cursor.close()
+
+    def rows(self) -> Iterator[List[tuple]]:
+        """
+        Chunks of (date, reference, description, amount_kobo, running_balance_kobo).
+        The SSCursor streams rows from the server; nothing else may use the
+        connection until it is exhausted or closed.
+        """
+        cursor = self._conn.cursor(SSCursor)
+        balance = self.opening_kobo
+        try:
+            with timed_query("statement_stream_entries"):
+                cursor.execute(
+                    """
+                    SELECT e.journal_id, e.amount_kobo, j.kind, j.reference,
+                           t.counterparty_name, t.counterparty_bank, t.counterparty_account, u.full_name
+                    FROM journal_entries e
+                    JOIN journal_transactions j ON j.journal_id = e.journal_id
+                    LEFT JOIN transactions t ON t.transaction_id = j.reference
+                    LEFT JOIN users u ON u.user_id = t.user_id
+                    WHERE e.account_id = %s AND e.journal_id > %s AND e.journal_id <= %s
+                    ORDER BY e.journal_id
+                    """,
+                    (self.account_id, self.lower, self.upper)
+                )
+            while True:
+                chunk = cursor.fetchmany(CHUNK_ROWS)
+                if not chunk:
+                    break
+                out = []
+                for journal_id, amount, kind, reference, counterparty, bank, account, sender in chunk:
+                    balance += amount
+                    out.append((created_at(journal_id).strftime("%Y-%m-%d %H:%M"), reference or "",
+                                _describe(kind, amount, counterparty, bank, account, sender), amount, balance))
+                yield out
+        finally:
+            cursor.close()
+        if balance != self.closing_kobo:
+            logger.error("Statement rows do not add up to the closing balance",
+                         extra={"account_id": self.account_id, "period": self.period, "rows": balance, "ledger": self.closing_kobo})
+
+    def store(self, fmt: str, content: bytes):
+        with timed_query("statement_cache_insert"):
+            cursor = self._conn.cursor()
+            try:
+                cursor.execute(
+                    """
+                    INSERT IGNORE INTO statement_cache (user_id, period, format, content, created_at)
+                    VALUES (%s, %s, %s, %s, NOW())
+                    """,
+                    (self.user_id, self.period, fmt, content)
+                )
+            finally:
+                cursor.close()
+            self._conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def render_csv(statement: Statement) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["# Account", statement.account_number, statement.holder])
+    writer.writerow(["# Period", statement.start.date().isoformat(), (statement.end - timedelta(days=1)).date().isoformat()])
+    writer.writerow(["# Opening balance", _ngn(statement.opening_kobo)])
+    writer.writerow(["# Closing balance", _ngn(statement.closing_kobo)])
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue().encode()
+    for chunk in statement.rows():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (when, reference, description, _ngn(-amount) if amount < 0 else "", _ngn(amount) if amount > 0 else "", _ngn(balance))
+            for when, reference, description, amount, balance in chunk
+        )
+        yield buffer.getvalue().encode()
+
+
+class PdfWriter:
+    """
+    Minimal PDF 1.4: Courier text pages, written object by object. Byte offsets
+    are tracked as pages are emitted, so the xref table and the page tree can
+    be written last and nothing but the current page is held in memory.
+    """
+    PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+    MARGIN = 40
+    FONT_SIZE = 8
+    LEADING = 11
+    LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+
+    CATALOG, PAGES, FONT = 1, 2, 3
+
+    def __init__(self):
+        self.offsets = {}
+        self.position = 0
+        self.next_object = 4
+        self.page_objects = []
+
+    def _emit(self, data: bytes) -> bytes:
+        self.position += len(data)
+        return data
+
+    def _object(self, number: int, body: bytes) -> bytes:
+        self.offsets[number] = self.position
+        return self._emit(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def begin(self) -> bytes:
+        return (self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+                + self._object(self.CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self.PAGES)
+                + self._object(self.FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>"))
+
+    @staticmethod
+    def _escape(line: str) -> bytes:
+        text = line.encode("cp1252", errors="replace")
+        return text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+    def page(self, lines: List[str]) -> bytes:
+        content = [b"BT /F1 %d Tf %d TL %d %d Td" % (self.FONT_SIZE, self.LEADING, self.MARGIN, self.PAGE_HEIGHT - self.MARGIN)]
+        content.extend(b"(" + self._escape(line) + b") '" for line in lines)
+        content.append(b"ET")
+        stream = b"\n".join(content)
+        stream_number, page_number = self.next_object, self.next_object + 1
+        self.next_object += 2
+        self.page_objects.append(page_number)
+        return (self._object(stream_number, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+                + self._object(page_number, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                               b"/Resources << /Font << /F1 %d 0 R >> >> >>"
+                               % (self.PAGES, self.PAGE_WIDTH, self.PAGE_HEIGHT, stream_number, self.FONT)))
+
+    def end(self) -> bytes:
+        kids = b" ".join(b"%d 0 R" % number for number in self.page_objects)
+        out = self._object(self.PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_objects)))
+        xref_at = self.position
+        xref = [b"xref\n0 %d\n" % self.next_object, b"0000000000 65535 f \n"]
+        xref.extend(b"%010d 00000 n \n" % self.offsets[number] for number in range(1, self.next_object))
+        xref.append(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self.next_object, self.CATALOG, xref_at))
+        return out + self._emit(b"".join(xref))
+
+
+def render_pdf(statement: Statement) -> Iterator[bytes]:
+    pdf = PdfWriter()
+    yield pdf.begin()
+    rule = "-" * 100
+    lines = [
+        "TunjiaX Account Statement",
+        f"{statement.holder}  -  Account {statement.account_number}",
+        f"Period: {statement.start.date().isoformat()} to {(statement.end - timedelta(days=1)).date().isoformat()}",
+        f"Opening balance: NGN {statement.opening_kobo / 100:,.2f}",
+        f"Closing balance: NGN {statement.closing_kobo / 100:,.2f}",
+        "",
+        f"{'Date':<17}{'Description':<45}{'Debit':>12}{'Credit':>12}{'Balance':>14}",
+        rule,
+    ]
+    for chunk in statement.rows():
+        for when, _, description, amount, balance in chunk:
+            lines.append(f"{when:<17}{description[:44]:<45}{_ngn(-amount) if amount < 0 else '':>12}"
+                         f"{_ngn(amount) if amount > 0 else '':>12}{_ngn(balance):>14}")
+            if len(lines) == PdfWriter.LINES_PER_PAGE:
+                yield pdf.page(lines)
+                lines = []
+    lines.extend([rule, f"{'Closing balance':<86}{_ngn(statement.closing_kobo):>14}"])
+    yield pdf.page(lines)
+    yield pdf.end()
+
+
+RENDERERS = {"csv": render_csv, "pdf": render_pdf}
+
+
+def cached(user_id: int, period: str, fmt: str) -> Optional[bytes]:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        with timed_query("statement_cache_select"):
+            cursor.execute(
+                "SELECT content FROM statement_cache WHERE user_id = %s AND period = %s AND format = %s",
+                (user_id, period, fmt)
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def generate(statement: Statement, fmt: str, cache: bool) -> Iterator[bytes]:
+    """
+    Streams the rendered statement and releases the connection when done (or
+    when the client disconnects). With cache=True the output is also kept -
+    up to STATEMENT_CACHE_MAX_BYTES - and stored once it completed.
+    """
+    kept, size = [], 0
+    try:
+        for part in RENDERERS[fmt](statement):
+            size += len(part)
+            if cache and size <= CACHE_MAX_BYTES:
+                kept.append(part)
+            yield part
+        if cache and size <= CACHE_MAX_BYTES:
+            try:
+                statement.store(fmt, b"".join(kept))
+            except Exception:
+                logger.exception("Could not cache statement", extra={"user_id": statement.user_id, "period": statement.period})
+        STATEMENTS.inc(fmt, "generated")
+        logger.info("Statement generated", extra={"user_id": statement.user_id, "period": statement.period,
+                                                 "format": fmt, "bytes": size})
+    finally:
+        statement.close()
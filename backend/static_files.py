@@ -0,0 +1,179 @@
+"""
+Static frontend serving: in-memory index.html, immutable caching for hashed
+Vite assets, precompressed .br/.gz variants and ETag/304.
+
+Precompress at image build time:
+    python static_files.py static
+"""
+import os
+import re
+import sys
+import gzip
+import hashlib
+import logging
+import mimetypes
+from typing import Dict, Iterable, Optional, Set
+from fastapi import Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+
+try:
+    import brotli
+except ImportError:  # optional - .br variants are skipped without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Vite output names look like index-BdE3x9_a.js / vendor-3f9a1c2e.css
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8,}\.[a-z0-9]+$")
+COMPRESSIBLE = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".txt", ".xml", ".wasm", ".ico"}
+MIN_COMPRESS_BYTES = 1024
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+SHORT_LIVED = "public, max-age=3600"
+REVALIDATE = "no-cache"
+
+
+class StaticFile:
+    __slots__ = ("path", "media_type", "etag", "cache_control", "encodings")
+
+    def __init__(self, path: str, media_type: str, etag: str, cache_control: str, encodings: Dict[str, str]):
+        self.path = path
+        self.media_type = media_type
+        self.etag = etag
+        self.cache_control = cache_control
+        self.encodings = encodings  # "br"/"gzip" -> path of precompressed variant
+
+
+def _etag(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            digest.update(block)
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+def _accepts(request: Request) -> Set[str]:
+    header = request.headers.get("accept-encoding", "")
+    return {part.split(";")[0].strip() for part in header.split(",")}
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+class StaticSite:
+    """
+    Indexes the built frontend once at startup. Requests never touch os.path.exists;
+    anything not in the manifest is a 404 without a filesystem lookup.
+    """
+    def __init__(self, root: str = "static"):
+        self.root = root
+        self.files: Dict[str, StaticFile] = {}
+        self.index: Optional[bytes] = None
+        self.index_variants: Dict[str, bytes] = {}
+        self.index_etag = ""
+        self.api_prefixes: Set[str] = set()
+        if os.path.isdir(root):
+            self._scan()
+
+    def _scan(self):
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith((".gz", ".br")):
+                    continue
+                full = os.path.join(directory, name)
+                rel = os.path.relpath(full, self.root).replace(os.sep, "/")
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                if rel.startswith("assets/") and HASHED_NAME.search(name):
+                    cache_control = IMMUTABLE
+                else:
+                    cache_control = SHORT_LIVED
+                encodings = {enc: full + ext for enc, ext in (("br", ".br"), ("gzip", ".gz")) if os.path.exists(full + ext)}
+                self.files[rel] = StaticFile(full, media_type, _etag(full), cache_control, encodings)
+
+        index_path = os.path.join(self.root, "index.html")
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                self.index = f.read()
+            self.index_etag = f'"{hashlib.sha1(self.index).hexdigest()[:20]}"'
+            self.index_variants["gzip"] = gzip.compress(self.index, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.index_variants["br"] = brotli.compress(self.index)
+            self.files.pop("index.html", None)
+        logger.info(f"Static site indexed: {len(self.files)} files", extra={"root": self.root, "index_loaded": self.index is not None})
+
+    def set_api_routes(self, paths: Iterable[str]):
+        """First path segments of API routes - these never fall back to index.html"""
+        for path in paths:
+            segment = path.strip("/").split("/")[0]
+            if segment and not segment.startswith("{"):
+                self.api_prefixes.add(segment)
+
+    def file_response(self, request: Request, rel_path: str) -> Response:
+        entry = self.files.get(rel_path)
+        if entry is None:
+            return JSONResponse({"detail": "Not Found"}, status_code=404)
+
+        headers = {"etag": entry.etag, "cache-control": entry.cache_control}
+        if entry.encodings:
+            headers["vary"] = "Accept-Encoding"
+        if _not_modified(request, entry.etag):
+            return Response(status_code=304, headers=headers)
+
+        accepted = _accepts(request)
+        for encoding in ("br", "gzip"):
+            if encoding in entry.encodings and encoding in accepted:
+                headers["content-encoding"] = encoding
+                return FileResponse(entry.encodings[encoding], media_type=entry.media_type, headers=headers)
+        return FileResponse(entry.path, media_type=entry.media_type, headers=headers)
+
+    def spa_response(self, request: Request, full_path: str) -> Response:
+        """Root-level files (favicon etc.), API 404s, otherwise the in-memory index.html"""
+        if full_path in self.files:
+            return self.file_response(request, full_path)
+        if full_path.split("/")[0] in self.api_prefixes or full_path.startswith("assets/"):
+            return JSONResponse({"detail": "Not Found"}, status_code=404)
+        if self.index is None:
+            return JSONResponse({"error": "Frontend not built. Visit /api/health for backend status."})
+
+        headers = {"etag": self.index_etag, "cache-control": REVALIDATE, "vary": "Accept-Encoding"}
+        if _not_modified(request, self.index_etag):
+            return Response(status_code=304, headers=headers)
+        accepted = _accepts(request)
+        for encoding in ("br", "gzip"):
+            if encoding in self.index_variants and encoding in accepted:
+                headers["content-encoding"] = encoding
+                return Response(self.index_variants[encoding], media_type="text/html", headers=headers)
+        return Response(self.index, media_type="text/html", headers=headers)
+
+
+def precompress(root: str) -> int:
+    """Writes .gz (and .br with the brotli package) next to compressible files when smaller"""
+    written = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+                continue
+            full = os.path.join(directory, name)
+            with open(full, "rb") as f:
+                data = f.read()
+            if len(data) < MIN_COMPRESS_BYTES:
+                continue
+            variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants[".br"] = brotli.compress(data, quality=11)
+            for ext, compressed in variants.items():
+                if len(compressed) < len(data):
+                    with open(full + ext, "wb") as f:
+                        f.write(compressed)
+                    written += 1
+    return written
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "static"
+    count = precompress(target)
+    print(f"Precompressed {count} variants in {target} (brotli: {'yes' if brotli else 'no'})")
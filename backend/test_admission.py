@@ -0,0 +1,136 @@
+"""
+Admission Control Test - token buckets, the bounded wait queue and bucket keys
+(no server needed)
+
+Run: python test_admission.py
+"""
+import os
+import asyncio
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from admission import AdmissionController, InMemoryBucketStore, RouteClass, resolve_user_key
+from auth import create_access_token
+from testutil import run_tests
+
+
+def request(path="/balance", headers=None, query=b"", client="203.0.113.7", method="GET"):
+    return Request({
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": (client, 40000),
+        "server": ("testserver", 80),
+        "scheme": "http",
+    })
+
+
+def controller(concurrency=64, queue=64, per_minute=6000, burst=100, queue_timeout=1.0):
+    admission = AdmissionController(store=InMemoryBucketStore(), queue_timeout=queue_timeout)
+    admission.classes["db"] = RouteClass("db", concurrency, queue, per_minute, burst)
+    return admission
+
+
+async def ok(_request):
+    return PlainTextResponse("ok")
+
+
+def test_bucket_exhaustion_returns_429_with_retry_after():
+    admission = controller(per_minute=60, burst=2)
+
+    async def main():
+        return [await admission.handle(request(), ok) for _ in range(3)]
+
+    responses = asyncio.run(main())
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[2].headers["retry-after"] == "1"
+    assert b'"rate_limited"' in responses[2].body
+
+
+def test_full_queue_rejects_and_queued_request_runs_when_slot_frees():
+    admission = controller(concurrency=1, queue=1)
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def slow(_request):
+            await gate.wait()
+            return PlainTextResponse("ok")
+
+        running = asyncio.create_task(admission.handle(request(), slow))
+        await asyncio.sleep(0.01)
+        queued = asyncio.create_task(admission.handle(request(), ok))
+        await asyncio.sleep(0.01)
+        overloaded = await admission.handle(request(), ok)
+        gate.set()
+        return overloaded, await running, await queued
+
+    overloaded, running, queued = asyncio.run(main())
+    assert overloaded.status_code == 429 and b'"overloaded"' in overloaded.body
+    assert running.status_code == 200 and queued.status_code == 200
+    assert admission.classes["db"].waiting == 0
+
+
+def test_queue_timeout_returns_429():
+    admission = controller(concurrency=1, queue=4, queue_timeout=0.05)
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def slow(_request):
+            await gate.wait()
+            return PlainTextResponse("ok")
+
+        running = asyncio.create_task(admission.handle(request(), slow))
+        await asyncio.sleep(0.01)
+        timed_out = await admission.handle(request(), ok)
+        gate.set()
+        await running
+        return timed_out
+
+    timed_out = asyncio.run(main())
+    assert timed_out.status_code == 429 and b'"queue_timeout"' in timed_out.body
+    db = admission.classes["db"]
+    assert db.waiting == 0 and not db.slots.locked()
+
+
+def test_unlisted_paths_and_preflight_bypass_limits():
+    admission = controller(per_minute=60, burst=1)
+
+    async def main():
+        health = [(await admission.handle(request("/api/health"), ok)).status_code for _ in range(3)]
+        preflight = [(await admission.handle(request(method="OPTIONS"), ok)).status_code for _ in range(3)]
+        return health, preflight
+
+    assert asyncio.run(main()) == ([200, 200, 200], [200, 200, 200])
+
+
+def test_user_key_follows_verified_identity():
+    previous = os.environ.get("ELEVENLABS_CUSTOM_LLM_SECRET")
+    os.environ["ELEVENLABS_CUSTOM_LLM_SECRET"] = "el-secret"
+    try:
+        token = create_access_token(42, "ada@example.com")
+        assert resolve_user_key(request(headers={"Authorization": f"Bearer {token}"})) == "user:42"
+        assert resolve_user_key(request(query=f"token={token}".encode())) == "user:42"
+        assert resolve_user_key(request(headers={"Authorization": "Bearer el-secret", "x-user-id": "7"})) == "user:7"
+        assert resolve_user_key(request(headers={"Authorization": "Bearer el-secret"})) == "user:1"
+        # A claimed ID without a credential is keyed by client IP, so changing it buys nothing
+        assert resolve_user_key(request(headers={"x-user-id": "9"})) == "ip:203.0.113.7"
+        assert resolve_user_key(request(headers={"Authorization": "Bearer wrong", "x-user-id": "9",
+                                                 "x-forwarded-for": "198.51.100.4, 10.0.0.1"})) == "ip:198.51.100.4"
+    finally:
+        if previous is None:
+            del os.environ["ELEVENLABS_CUSTOM_LLM_SECRET"]
+        else:
+            os.environ["ELEVENLABS_CUSTOM_LLM_SECRET"] = previous
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_bucket_exhaustion_returns_429_with_retry_after,
+        test_full_queue_rejects_and_queued_request_runs_when_slot_frees,
+        test_queue_timeout_returns_429,
+        test_unlisted_paths_and_preflight_bypass_limits,
+        test_user_key_follows_verified_identity,
+    ])
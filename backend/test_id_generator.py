@@ -0,0 +1,97 @@
+"""
+ID Generator Test - Snowflake ordering, string form and time-range keys
+(no DB needed)
+
+Run: python test_id_generator.py
+"""
+from datetime import datetime, timedelta, timezone
+from id_generator import (IdGenerator, WorkerLease, to_string, from_string, to_bytes, from_bytes, created_at,
+                          max_id_at, MAX_SEQUENCE, SEQUENCE_BITS, MAX_WORKER)
+from testutil import run_tests
+
+
+def test_ids_strictly_increase():
+    gen = IdGenerator(worker_id=7)
+    values = [gen.next_id() for _ in range(3 * (MAX_SEQUENCE + 1))]
+    assert all(a < b for a, b in zip(values, values[1:]))
+
+
+def test_clock_step_back_keeps_increasing():
+    gen = IdGenerator(worker_id=7)
+    clock = iter([2_000_000_000_000, 1_999_999_999_000, 1_999_999_999_500])
+    gen._now_ms = lambda: next(clock)
+    first, second, third = gen.next_id(), gen.next_id(), gen.next_id()
+    assert first < second < third
+
+
+def test_workers_do_not_collide():
+    a, b = IdGenerator(worker_id=1), IdGenerator(worker_id=2)
+    assert not {a.next_id() for _ in range(1000)} & {b.next_id() for _ in range(1000)}
+
+
+def test_string_form_sorts_like_ints():
+    gen = IdGenerator(worker_id=3)
+    values = [gen.next_id() for _ in range(500)] + [1, 2 ** 40, 2 ** 63 - 1]
+    strings = [to_string(v) for v in values]
+    assert sorted(strings) == [to_string(v) for v in sorted(values)]
+    assert all(from_string(s) == v for s, v in zip(strings, values))
+    assert all(from_bytes(to_bytes(v)) == v for v in values)
+
+
+def test_max_id_at_bounds_ids_by_time():
+    gen = IdGenerator(worker_id=1023)
+    before = datetime.now(timezone.utc) - timedelta(milliseconds=5)
+    value = gen.next_id()
+    after = datetime.now(timezone.utc) + timedelta(milliseconds=5)
+    assert max_id_at(before) < value <= max_id_at(after)
+    assert abs((created_at(value) - before).total_seconds()) < 1
+    assert max_id_at(datetime(2020, 1, 1, tzinfo=timezone.utc)) < IdGenerator(worker_id=0).next_id()
+
+
+class FakeLease(WorkerLease):
+    """WorkerLease with the DB calls scripted and no renewal thread"""
+    def __init__(self, slots, renewals):
+        super().__init__(seconds=60)
+        self.slots, self.renewals = list(slots), list(renewals)
+        self._renewer = object()
+
+    def _claim(self):
+        return self.slots.pop(0) if self.slots else None
+
+    def _extend(self):
+        return self.renewals.pop(0)
+
+
+def worker_of(value):
+    return (value >> SEQUENCE_BITS) & MAX_WORKER
+
+
+def test_leased_slot_is_used_and_reclaimed_when_lost():
+    lease = FakeLease(slots=[42, 9], renewals=[True, False])
+    gen = IdGenerator(lease=lease)
+    assert worker_of(gen.next_id()) == 42
+    lease.valid_until = 0.0  # renewal due: extended, same slot
+    assert worker_of(gen.next_id()) == 42
+    lease.valid_until = 0.0  # renewal finds the slot taken: claim another
+    assert worker_of(gen.next_id()) == 9
+
+
+def test_no_free_slot_refuses_ids():
+    gen = IdGenerator(lease=FakeLease(slots=[], renewals=[]))
+    try:
+        gen.next_id()
+        assert False, "issued an ID without a worker slot"
+    except RuntimeError:
+        pass
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_ids_strictly_increase,
+        test_clock_step_back_keeps_increasing,
+        test_workers_do_not_collide,
+        test_string_form_sorts_like_ints,
+        test_max_id_at_bounds_ids_by_time,
+        test_leased_slot_is_used_and_reclaimed_when_lost,
+        test_no_free_slot_refuses_ids,
+    ])
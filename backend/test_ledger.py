@@ -0,0 +1,45 @@
+"""
+Ledger Test - journal leg validation (no DB needed)
+
+Run: python test_ledger.py
+"""
+from ledger import _check_legs, UnbalancedJournal, EXTERNAL_SETTLEMENT
+from testutil import run_tests
+
+
+def rejects(legs) -> bool:
+    try:
+        _check_legs(legs)
+    except UnbalancedJournal:
+        return True
+    return False
+
+
+def test_balanced_legs_pass():
+    _check_legs([(1, -500), (2, 500)])
+    _check_legs([(1, -500), (EXTERNAL_SETTLEMENT, 500)])
+    _check_legs([(1, -700), (2, 500), (3, 200)])
+
+
+def test_unbalanced_legs_rejected():
+    assert rejects([(1, -500), (2, 400)])
+    assert rejects([(1, 500), (2, 500)])
+
+
+def test_single_leg_rejected():
+    assert rejects([(1, 0)])
+    assert rejects([])
+
+
+def test_duplicate_account_rejected():
+    assert rejects([(1, -500), (1, 500)])
+    assert rejects([(1, -500), (2, 250), (2, 250)])
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_balanced_legs_pass,
+        test_unbalanced_legs_rejected,
+        test_single_leg_rejected,
+        test_duplicate_account_rejected,
+    ])
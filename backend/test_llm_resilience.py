@@ -0,0 +1,163 @@
+"""
+LLM Resilience Test - exercises ResilientBackend against local mock backends
+(no Vertex AI needed)
+
+Covers: retries on retryable errors, no retry on bad requests, per-call deadline,
+hedged requests, the circuit breaker failing fast, and a cancelled half-open probe.
+
+Run: python test_llm_resilience.py
+"""
+import time
+import asyncio
+from llm_backend import LLMBackend
+from llm_resilience import ResilientBackend, CircuitBreaker, LLMUnavailableError, CircuitOpenError
+from testutil import run_tests
+
+
+class APIError(Exception):
+    def __init__(self, code: int, message: str = ""):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class MockBackend(LLMBackend):
+    """Plays back a list of behaviours: ('ok', latency) or ('error', code)"""
+    def __init__(self, behaviours, default=("ok", 0.0)):
+        self.behaviours = list(behaviours)
+        self.default = default
+        self.calls = 0
+
+    async def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        kind, value = self.behaviours.pop(0) if self.behaviours else self.default
+        if kind == "error":
+            raise APIError(value, "mock failure")
+        await asyncio.sleep(value)
+        return f"response #{self.calls}"
+
+
+def make(backend, **kwargs):
+    kwargs.setdefault("backoff_base", 0.001)
+    return ResilientBackend(backend, **kwargs)
+
+
+def test_retries_transient_errors():
+    mock = MockBackend([("error", 503), ("error", 429), ("ok", 0)])
+    llm = make(mock)
+    result = asyncio.run(llm.generate_content("m", []))
+    assert result == "response #3", result
+    assert llm.metrics["retries"] == 2 and llm.metrics["success"] == 1
+
+
+def test_does_not_retry_bad_request():
+    mock = MockBackend([("error", 400)])
+    llm = make(mock)
+    try:
+        asyncio.run(llm.generate_content("m", []))
+        assert False, "expected APIError"
+    except APIError:
+        pass
+    assert mock.calls == 1 and llm.metrics["non_retryable"] == 1
+    assert llm.breaker.state == "closed"
+
+
+def test_deadline_and_exhaustion():
+    mock = MockBackend([], default=("ok", 1.0))
+    llm = make(mock, call_timeout=0.05, max_attempts=2)
+    start = time.monotonic()
+    try:
+        asyncio.run(llm.generate_content("m", []))
+        assert False, "expected LLMUnavailableError"
+    except LLMUnavailableError:
+        pass
+    assert time.monotonic() - start < 0.5
+    assert llm.metrics["timeouts"] == 2 and llm.metrics["failure"] == 1
+
+
+def test_hedge_beats_slow_primary():
+    # Warm the latency window with fast calls, then make the primary slow
+    mock = MockBackend([("ok", 0.01)] * 20 + [("ok", 0.5), ("ok", 0.01)])
+    llm = make(mock, hedge_enabled=True, hedge_min_samples=20)
+
+    async def run():
+        for _ in range(20):
+            await llm.generate_content("m", [])
+        start = time.monotonic()
+        result = await llm.generate_content("m", [])
+        return result, time.monotonic() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result == "response #22", result
+    assert elapsed < 0.3, elapsed
+    assert llm.metrics["hedges"] == 1 and llm.metrics["hedge_wins"] == 1
+
+
+def test_circuit_breaker_fails_fast():
+    mock = MockBackend([], default=("error", 503))
+    llm = make(mock, max_attempts=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.1))
+
+    async def run():
+        for _ in range(2):
+            try:
+                await llm.generate_content("m", [])
+            except LLMUnavailableError:
+                pass
+        calls_when_opened = mock.calls
+        try:
+            await llm.generate_content("m", [])
+            assert False, "expected CircuitOpenError"
+        except CircuitOpenError:
+            pass
+        assert mock.calls == calls_when_opened
+
+        # After the reset timeout a single probe goes through and closes the circuit
+        await asyncio.sleep(0.15)
+        mock.default = ("ok", 0)
+        await llm.generate_content("m", [])
+        assert llm.breaker.state == "closed"
+
+    asyncio.run(run())
+    assert llm.metrics["circuit_opened"] == 1 and llm.metrics["short_circuited"] == 1
+
+
+
+def test_cancelled_probe_releases_circuit():
+    mock = MockBackend([("error", 503)], default=("ok", 1.0))
+    llm = make(mock, max_attempts=1, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+
+    async def run():
+        try:
+            await llm.generate_content("m", [])
+        except LLMUnavailableError:
+            pass
+        assert llm.breaker.state == "open"
+
+        # The half-open probe is abandoned mid-call (barge-in)
+        await asyncio.sleep(0.1)
+        probe = asyncio.ensure_future(llm.generate_content("m", []))
+        await asyncio.sleep(0.02)
+        assert llm.breaker.probe_in_flight
+        probe.cancel()
+        try:
+            await probe
+        except asyncio.CancelledError:
+            pass
+        assert not llm.breaker.probe_in_flight
+
+        # The next call is allowed through as the new probe
+        mock.default = ("ok", 0)
+        await llm.generate_content("m", [])
+        assert llm.breaker.state == "closed"
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_retries_transient_errors,
+        test_does_not_retry_bad_request,
+        test_deadline_and_exhaustion,
+        test_hedge_beats_slow_primary,
+        test_circuit_breaker_fails_fast,
+        test_cancelled_probe_releases_circuit,
+    ])
@@ -0,0 +1,115 @@
+"""
+Notifications Test - outbox dispatcher overlap re-reads, dedupe and stream fan-out
+(no DB needed: _fetch reads an in-memory outbox)
+
+Run: python test_notifications.py
+"""
+import asyncio
+from datetime import datetime, timedelta
+import notifications
+from id_generator import IdGenerator, max_id_at
+from notifications import NotificationHub, OutboxDispatcher, RecentIds
+from testutil import run_tests
+
+
+class MemoryDispatcher(OutboxDispatcher):
+    """Reads `rows` instead of notification_outbox; rows may be added out of ID order (slow commits)"""
+    def __init__(self, hub):
+        super().__init__(hub)
+        self.rows = []
+
+    def _fetch(self, after):
+        events = sorted((e for e in self.rows if e["id"] > after), key=lambda e: e["id"])
+        return events[:notifications.BATCH_SIZE]
+
+
+def event(event_id, user_id=1, kind="credit"):
+    return {"id": event_id, "user_id": user_id, "kind": kind, "data": {"amount_ngn": "5,000.00"}}
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait()["id"])
+    return events
+
+
+def test_late_commit_inside_overlap_is_delivered_once():
+    gen = IdGenerator(worker_id=1)
+    hub = NotificationHub()
+    dispatcher = MemoryDispatcher(hub)
+
+    async def main():
+        queue = hub.subscribe(1)
+        slow, fast = gen.next_id(), gen.next_id()  # slow's transaction commits after fast's
+        dispatcher.rows.append(event(fast))
+        first = await dispatcher.poll()
+        dispatcher.rows.append(event(slow))
+        second = await dispatcher.poll()
+        third = await dispatcher.poll()
+        return queue, (first, second, third)
+
+    queue, delivered = asyncio.run(main())
+    assert delivered == (1, 1, 0)
+    assert sorted(drain(queue)) == sorted(e["id"] for e in dispatcher.rows)
+
+
+def test_events_go_only_to_their_users_streams():
+    gen = IdGenerator(worker_id=2)
+    hub = NotificationHub()
+    dispatcher = MemoryDispatcher(hub)
+
+    async def main():
+        mine, also_mine, theirs = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+        dispatcher.rows += [event(gen.next_id(), user_id=1), event(gen.next_id(), user_id=3)]
+        await dispatcher.poll()
+        return drain(mine), drain(also_mine), drain(theirs)
+
+    mine, also_mine, theirs = asyncio.run(main())
+    assert len(mine) == 1 and mine == also_mine and theirs == []
+
+
+def test_seen_set_forgets_ids_older_than_the_overlap():
+    hub = NotificationHub()
+    dispatcher = MemoryDispatcher(hub)
+    old = max_id_at(datetime.now() - timedelta(seconds=notifications.OVERLAP_SECONDS + 5))
+
+    async def main():
+        hub.subscribe(1)
+        dispatcher.watermark = old - 1
+        dispatcher.rows.append(event(old))
+        await dispatcher.poll()
+        assert old in dispatcher.seen and dispatcher.watermark == old
+        dispatcher.rows.clear()
+        await dispatcher.poll()
+
+    asyncio.run(main())
+    assert old not in dispatcher.seen
+
+
+def test_no_streams_advances_without_reading():
+    hub = NotificationHub()
+    dispatcher = MemoryDispatcher(hub)
+    dispatcher.rows.append(event(IdGenerator(worker_id=3).next_id()))
+
+    def fetch(after):
+        raise AssertionError("read the outbox with nobody connected")
+    dispatcher._fetch = fetch
+    assert asyncio.run(dispatcher.poll()) == 0
+
+
+def test_recent_ids_dedupes_replay_and_live():
+    recent = RecentIds(max_ids=2)
+    assert recent.add(1) and recent.add(2)
+    assert not recent.add(2)
+    assert recent.add(3) and recent.add(1)  # 1 aged out of the window
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_late_commit_inside_overlap_is_delivered_once,
+        test_events_go_only_to_their_users_streams,
+        test_seen_set_forgets_ids_older_than_the_overlap,
+        test_no_streams_advances_without_reading,
+        test_recent_ids_dedupes_replay_and_live,
+    ])
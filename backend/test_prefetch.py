@@ -0,0 +1,37 @@
+"""
+Prefetch Name Guess Test - extract_candidate_names on common transfer phrasings
+(no DB needed)
+
+Run: python test_prefetch.py
+"""
+from prefetch import extract_candidate_names
+from testutil import run_tests
+
+
+def test_name_after_trigger():
+    assert extract_candidate_names("send 5k to Bisola") == ["bisola"]
+    assert extract_candidate_names("pay mama 20k") == ["mama"]
+
+
+def test_skips_to_and_my():
+    assert extract_candidate_names("transfer to my Tunde") == ["tunde"]
+    assert extract_candidate_names("Send to Bisola 5k") == ["bisola"]
+
+
+def test_trigger_after_trigger_is_not_a_name():
+    assert extract_candidate_names("I want to send 5000 naira to Tunde") == ["tunde"]
+    assert extract_candidate_names("I want to send Bisola 5k") == ["bisola"]
+
+
+def test_no_name():
+    assert extract_candidate_names("what is my balance") == []
+    assert extract_candidate_names("send money to me") == []
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_name_after_trigger,
+        test_skips_to_and_my,
+        test_trigger_after_trigger_is_not_a_name,
+        test_no_name,
+    ])
@@ -0,0 +1,114 @@
+"""
+Risk Engine Test - velocity windows, holds and new-payee cooling with a fake
+clock and profile loader (no DB needed)
+
+Run: python test_risk.py
+"""
+from risk import RiskEngine, InMemoryWindowStore, Limits, Profile
+from testutil import run_tests
+
+LIMITS = Limits(per_transfer_kobo=100_000, per_minute_count=3, per_day_count=5, per_day_kobo=300_000,
+                new_payee_kobo=20_000)
+KNOWN = "1111111111"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_800_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make(recent=None):
+    clock = Clock()
+    engine = RiskEngine(
+        store=InMemoryWindowStore(),
+        loader=lambda user_id: Profile(LIMITS, {KNOWN: [clock.now - 30 * 86400, 0]}, list(recent or [])),
+        cooling_seconds=3600,
+        clock=clock,
+    )
+    return engine, clock
+
+
+def test_per_transfer_limit():
+    engine, _ = make()
+    assert engine.reserve(1, 100_001, KNOWN).rule == "per_transfer"
+    assert engine.reserve(1, 100_000, KNOWN).allowed
+
+
+def test_minute_window_slides():
+    engine, clock = make()
+    for _ in range(3):
+        assert engine.reserve(1, 1_000, KNOWN).allowed
+    assert engine.reserve(1, 1_000, KNOWN).rule == "per_minute_count"
+    clock.now += 61
+    assert engine.reserve(1, 1_000, KNOWN).allowed
+
+
+def test_day_value_and_count():
+    engine, clock = make()
+    for _ in range(3):
+        assert engine.reserve(1, 100_000, KNOWN).allowed
+        clock.now += 61
+    assert engine.reserve(1, 1, KNOWN).rule == "per_day_value"
+
+    engine, clock = make()
+    for _ in range(5):
+        assert engine.reserve(1, 1_000, KNOWN).allowed
+        clock.now += 61
+    assert engine.reserve(1, 1_000, KNOWN).rule == "per_day_count"
+    clock.now += 86400
+    assert engine.reserve(1, 1_000, KNOWN).allowed
+
+
+def test_recent_debits_seed_windows():
+    clock_start = 1_800_000_000.0
+    engine, _ = make(recent=[(clock_start - 3600, 290_000)])
+    assert engine.reserve(1, 20_000, KNOWN).rule == "per_day_value"
+    assert engine.reserve(1, 10_000, KNOWN).allowed
+
+
+def test_release_returns_capacity():
+    engine, _ = make()
+    holds = [engine.reserve(1, 1_000, KNOWN) for _ in range(3)]
+    assert engine.reserve(1, 1_000, KNOWN).rule == "per_minute_count"
+    engine.release(holds[0])
+    assert engine.reserve(1, 1_000, KNOWN).allowed
+    engine.release(engine.reserve(2, 500, None))  # denied/none-payee holds release cleanly
+    engine.release(engine.reserve(1, 10 ** 9, KNOWN))
+
+
+def test_new_payee_cooling():
+    engine, clock = make()
+    payee = "2222222222"
+    assert engine.reserve(1, 15_000, payee).allowed
+    assert engine.reserve(1, 10_000, payee).rule == "new_payee"
+    clock.now += 61
+    assert engine.reserve(1, 5_000, payee).allowed
+    clock.now += 3600
+    assert engine.reserve(1, 50_000, payee).allowed
+
+
+def test_released_new_payee_is_forgotten():
+    engine, _ = make()
+    payee = "3333333333"
+    hold = engine.reserve(1, 20_000, payee)
+    assert hold.allowed and hold.new_payee
+    engine.release(hold)
+    assert payee not in engine.profiles[1].payees
+    assert engine.reserve(1, 20_000, payee).allowed
+    assert engine.reserve(1, 20_001, "4444444444").rule == "new_payee"
+    assert "4444444444" not in engine.profiles[1].payees
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_per_transfer_limit,
+        test_minute_window_slides,
+        test_day_value_and_count,
+        test_recent_debits_seed_windows,
+        test_release_returns_capacity,
+        test_new_payee_cooling,
+        test_released_new_payee_is_forgotten,
+    ])
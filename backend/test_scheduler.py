@@ -0,0 +1,102 @@
+"""
+Scheduler Test - occurrence arithmetic and missed-run catch-up (no DB needed)
+
+Run: python test_scheduler.py
+"""
+from datetime import datetime
+import scheduler
+from scheduler import occurrence, _add_months, _due_occurrences, _fire
+from testutil import run_tests
+
+
+def schedule(frequency, start_at, run_count=0, max_runs=None):
+    return {"frequency": frequency, "start_at": start_at, "run_count": run_count, "max_runs": max_runs}
+
+
+def test_month_end_clamps():
+    jan31 = datetime(2026, 1, 31, 9, 0)
+    assert _add_months(jan31, 1) == datetime(2026, 2, 28, 9, 0)
+    assert _add_months(datetime(2028, 1, 31), 1) == datetime(2028, 2, 29)
+    assert _add_months(jan31, 3) == datetime(2026, 4, 30, 9, 0)
+    assert _add_months(datetime(2026, 11, 30), 2) == datetime(2027, 1, 30)
+
+
+def test_monthly_keeps_original_day():
+    # Each run is computed from start_at, so a short month doesn't drag later runs to the 28th
+    jan31 = datetime(2026, 1, 31)
+    assert [occurrence(jan31, "monthly", n).day for n in range(4)] == [31, 28, 31, 30]
+
+
+def test_daily_weekly_once():
+    start = datetime(2026, 3, 1, 8, 30)
+    assert occurrence(start, "daily", 3) == datetime(2026, 3, 4, 8, 30)
+    assert occurrence(start, "weekly", 2) == datetime(2026, 3, 15, 8, 30)
+    assert occurrence(start, "once", 5) == start
+
+
+def run_with_catchup(mode, row, now):
+    previous = scheduler.CATCHUP
+    scheduler.CATCHUP = mode
+    try:
+        return _due_occurrences(row, now)
+    finally:
+        scheduler.CATCHUP = previous
+
+
+def test_catchup_latest_fires_only_last_missed():
+    row = schedule("daily", datetime(2026, 3, 1, 8, 0))
+    due, skipped = run_with_catchup("latest", row, datetime(2026, 3, 5, 9, 0))
+    assert due == [(4, datetime(2026, 3, 5, 8, 0))]
+    assert skipped == 4
+
+
+def test_catchup_all_is_capped():
+    row = schedule("daily", datetime(2026, 1, 1, 8, 0), run_count=2)
+    due, skipped = run_with_catchup("all", row, datetime(2026, 2, 1, 9, 0))
+    assert len(due) == scheduler.MAX_CATCHUP
+    assert due[-1] == (31, datetime(2026, 2, 1, 8, 0))
+    assert skipped == 30 - scheduler.MAX_CATCHUP
+
+
+def test_due_respects_max_runs_and_once():
+    row = schedule("weekly", datetime(2026, 3, 1), run_count=1, max_runs=3)
+    due, skipped = run_with_catchup("all", row, datetime(2026, 6, 1))
+    assert [n for n, _ in due] == [1, 2] and skipped == 0
+    assert run_with_catchup("all", schedule("once", datetime(2026, 3, 1)), datetime(2026, 6, 1)) == \
+        ([(0, datetime(2026, 3, 1))], 0)
+    assert run_with_catchup("all", schedule("daily", datetime(2026, 3, 1)), datetime(2026, 2, 28)) == ([], 0)
+
+
+def test_fire_chunks_batches_and_fails_unreported_runs():
+    calls = []
+
+    def fake_batch(items, user_id, mode):
+        calls.append(len(items))
+        if len(calls) == 2:
+            return {"status": "failed", "results": [], "message": "Daily limit reached"}
+        return {"status": "success", "results": [
+            {"status": "success", "transaction_id": f"T{i}", "message": "ok"} for i in range(len(items))]}
+
+    previous = scheduler.execute_batch_transfer, scheduler.BATCH_TRANSFER_MAX_ITEMS
+    scheduler.execute_batch_transfer, scheduler.BATCH_TRANSFER_MAX_ITEMS = fake_batch, 2
+    try:
+        row = {"schedule_id": 7, "amount_kobo": 10000, "beneficiary_name": "Ada", "bank_name": "GTBank",
+               "account_number": "0123456789"}
+        outcomes = _fire(1, [(row, n) for n in range(5)])
+    finally:
+        scheduler.execute_batch_transfer, scheduler.BATCH_TRANSFER_MAX_ITEMS = previous
+    assert calls == [2, 2, 1]
+    assert [o[0] for o in outcomes] == ["success", "success", "failed", "failed", "success"]
+    assert outcomes[2] == ("failed", None, "Daily limit reached", 7, 2)
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_month_end_clamps,
+        test_monthly_keeps_original_day,
+        test_daily_weekly_once,
+        test_catchup_latest_fires_only_last_missed,
+        test_catchup_all_is_capped,
+        test_due_respects_max_runs_and_once,
+        test_fire_chunks_batches_and_fails_unreported_runs,
+    ])
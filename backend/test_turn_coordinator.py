@@ -0,0 +1,144 @@
+"""
+Turn Coordinator Test - coalescing, barge-in and per-session history locking,
+driven through VoiceAgent with a ScriptedBackend (no Vertex AI, no DB)
+
+Run: python test_turn_coordinator.py
+"""
+import time
+import asyncio
+import threading
+import tools
+from google.genai import types
+from llm_backend import ScriptedBackend
+from turn_coordinator import SUPERSEDED_RESULT
+from voice_agent import VoiceAgent
+from testutil import run_tests
+
+
+def make(steps, latency_ms=0.0):
+    backend = ScriptedBackend(steps, latency_ms=latency_ms)
+    agent = VoiceAgent(project_id="test", location="local", backend=backend)
+    agent.context_cache.enabled = False
+    agent.prefetcher.enabled = False  # no speculative DB lookups
+    return agent, backend
+
+
+def texts(history):
+    return ["".join(part.text or "" for part in content.parts) for content in history]
+
+
+def test_duplicate_utterances_share_one_call():
+    agent, backend = make(["You have ₦50,000."], latency_ms=50)
+
+    async def main():
+        return await asyncio.gather(
+            agent.process_input("What is my balance", session_id="s"),
+            agent.process_input("what is  my balance ", session_id="s"),
+        )
+
+    first, second = asyncio.run(main())
+    assert backend.calls == 1, f"{backend.calls} upstream calls"
+    assert first == second == ("You have ₦50,000.", None)
+    assert agent.turns.stats["coalesced"] == 1
+
+
+def test_newer_utterance_cancels_queued_turn():
+    agent, backend = make(["Done."])
+
+    async def main():
+        lock = agent.session_manager.lock("s")
+        await lock.acquire()  # e.g. a /verify-face history write in progress
+        first = asyncio.create_task(agent.process_input("Send 5k to Bisola", session_id="s"))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(agent.process_input("Actually, what's my balance", session_id="s"))
+        await asyncio.sleep(0.01)
+        lock.release()
+        return await asyncio.gather(first, second)
+
+    first, second = asyncio.run(main())
+    assert first == SUPERSEDED_RESULT
+    assert second == ("Done.", None)
+    assert backend.calls == 1
+    assert texts(agent.session_manager.sessions["s"]["history"]) == ["Actually, what's my balance", "Done."]
+
+
+def test_newer_utterance_cancels_in_flight_llm_call():
+    agent, backend = make(["Done."], latency_ms=200)
+
+    async def main():
+        first = asyncio.create_task(agent.process_input("Send 5k to Bisola", session_id="s"))
+        await asyncio.sleep(0.05)  # first is waiting on the model
+        second = asyncio.create_task(agent.process_input("Never mind", session_id="s"))
+        return await asyncio.gather(first, second)
+
+    started = time.perf_counter()
+    first, second = asyncio.run(main())
+    assert first == SUPERSEDED_RESULT
+    assert second == ("Done.", None)
+    assert backend.calls == 1, "abandoned call should not complete"
+    assert time.perf_counter() - started < 0.4, "second turn waited for the abandoned call"
+    # The superseded turn keeps the user's words, nothing else
+    assert texts(agent.session_manager.sessions["s"]["history"]) == ["Send 5k to Bisola", "Never mind", "Done."]
+
+
+def test_newer_utterance_does_not_cancel_running_tool():
+    tool_started, tool_finished = threading.Event(), threading.Event()
+
+    def slow_lookup(name, user_id=1):
+        tool_started.set()
+        time.sleep(0.2)
+        tool_finished.set()
+        return {"alias": name, "name": "Bisola Adebayo", "account": "0123456789", "bank": "TunjiaX", "frequency": 1}
+
+    agent, backend = make([
+        {"function_call": "lookup_beneficiary", "args": {"name": "Bisola"}},
+        "Found Bisola Adebayo.",
+        "Done.",
+    ])
+    original, tools.lookup_beneficiary = tools.lookup_beneficiary, slow_lookup
+
+    async def main():
+        first = asyncio.create_task(agent.process_input("look her up", session_id="s"))
+        while not tool_started.is_set():
+            await asyncio.sleep(0.005)
+        second = asyncio.create_task(agent.process_input("Never mind", session_id="s"))
+        return await asyncio.gather(first, second)
+
+    try:
+        first, second = asyncio.run(main())
+    finally:
+        tools.lookup_beneficiary = original
+    assert tool_finished.is_set()
+    assert first == ("Found Bisola Adebayo.", None)
+    assert second == ("Done.", None)
+    history = texts(agent.session_manager.sessions["s"]["history"])
+    assert history.index("[TOOL RESULT for lookup_beneficiary]: FOUND: Bisola Adebayo at TunjiaX (Account: 0123456789)") \
+        < history.index("Never mind")
+
+
+def test_history_writes_wait_for_running_turn():
+    agent, backend = make(["You have ₦50,000."], latency_ms=50)
+
+    async def main():
+        turn = asyncio.create_task(agent.process_input("What is my balance", session_id="s"))
+        await asyncio.sleep(0.01)  # turn holds the session lock while it waits on the model
+        # Same pattern /verify-face uses to record a transfer result
+        async with agent.session_manager.lock("s"):
+            history = agent.session_manager.get_or_create_session("s")
+            assert texts(history) == ["What is my balance", "You have ₦50,000."], "history write ran mid-turn"
+            history.append(types.Content(role="user", parts=[types.Part(text="[SYSTEM: Transfer completed.]")]))
+        return await turn
+
+    assert asyncio.run(main()) == ("You have ₦50,000.", None)
+    assert texts(agent.session_manager.sessions["s"]["history"]) == \
+        ["What is my balance", "You have ₦50,000.", "[SYSTEM: Transfer completed.]"]
+
+
+if __name__ == "__main__":
+    run_tests([
+        test_duplicate_utterances_share_one_call,
+        test_newer_utterance_cancels_queued_turn,
+        test_newer_utterance_cancels_in_flight_llm_call,
+        test_newer_utterance_does_not_cancel_running_tool,
+        test_history_writes_wait_for_running_turn,
+    ])
@@ -0,0 +1,20 @@
+"""
+Runner behind `python test_<name>.py` for the plain-assert test modules
+(pytest collects the same test_* functions).
+"""
+import sys
+from typing import Callable, Sequence
+
+
+def run_tests(tests: Sequence[Callable[[], None]]):
+    """Runs each test, prints ✅/❌ per test and a summary; exits non-zero on any failure"""
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{passed}/{len(tests)} passed")
+    sys.exit(0 if passed == len(tests) else 1)
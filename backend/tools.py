@@ -1,28 +1,225 @@
 import os
-import sqlalchemy
-from google.cloud.sql.connector import Connector
-from datetime import datetime
-import uuid
+import math
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from metrics import DB_QUERY_LATENCY, DB_CONNECT_LATENCY, DB_CONNECTIONS_IN_USE, TRANSFERS
+from tracing import span
+from id_generator import ids, to_string
+import risk
+
+logger = logging.getLogger(__name__)
 
 # Global connector instance (initialized on first use)
 _connector = None
+_connector_lock = threading.Lock()
 
-def get_db_connection():
-    """Connect to Cloud SQL MySQL"""
+
+def _open_connection():
+    """Opens a new Cloud SQL MySQL connection (the connector is imported lazily - it is slow to import)"""
     global _connector
     
     # Initialize connector on first use
     if _connector is None:
-        _connector = Connector()
+        with _connector_lock:
+            if _connector is None:
+                from google.cloud.sql.connector import Connector
+                _connector = Connector()
     
-    conn = _connector.connect(
-        os.getenv("CLOUD_SQL_CONNECTION_NAME"),  # e.g., "tunjiax-wallet-482614:us-central1:tunjiax-db"
-        "pymysql",
-        user="root",
-        password=os.getenv("DB_PASSWORD"),
-        db="banking"
-    )
-    return conn
+    with span("db.connect"), DB_CONNECT_LATENCY.time():
+        return _connector.connect(
+            os.getenv("CLOUD_SQL_CONNECTION_NAME"),  # e.g., "tunjiax-wallet-482614:us-central1:tunjiax-db"
+            "pymysql",
+            user="root",
+            password=os.getenv("DB_PASSWORD"),
+            db="banking"
+        )
+
+
+class ConnectionPool:
+    """
+    Keeps up to `size` idle connections for reuse. Checkout never blocks: when no
+    idle connection is available a new one is opened, and surplus connections are
+    closed on return. Idle connections older than `recycle_seconds` are replaced
+    (Cloud SQL drops long-idle sockets).
+    """
+    def __init__(self, size: int = 5, recycle_seconds: float = 300.0):
+        self.size = size
+        self.recycle_seconds = recycle_seconds
+        self.idle = []  # (raw connection, returned_at)
+        self._lock = threading.Lock()
+
+    def checkout(self):
+        while True:
+            with self._lock:
+                if not self.idle:
+                    break
+                conn, returned_at = self.idle.pop()
+            if time.monotonic() - returned_at < self.recycle_seconds:
+                return conn
+            self._discard(conn)
+        return _open_connection()
+
+    def checkin(self, conn):
+        try:
+            # Never hand the next caller an open transaction
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        with self._lock:
+            if len(self.idle) < self.size:
+                self.idle.append((conn, time.monotonic()))
+                return
+        self._discard(conn)
+
+    def warm(self, count: int) -> int:
+        """Opens up to `count` connections ahead of traffic; returns how many are idle"""
+        missing = max(0, min(count, self.size) - len(self.idle))
+        if missing == 0:
+            return len(self.idle)
+        with ThreadPoolExecutor(max_workers=missing) as executor:
+            opened = list(executor.map(lambda _: _open_connection(), range(missing)))
+        for conn in opened:
+            self.checkin(conn)
+        return len(self.idle)
+
+    def close(self):
+        with self._lock:
+            idle, self.idle = self.idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+pool = ConnectionPool(
+    size=int(os.getenv("DB_POOL_SIZE", "5")),
+    recycle_seconds=float(os.getenv("DB_POOL_RECYCLE_SECONDS", "300"))
+)
+
+
+def get_db_connection():
+    """Connection from the pool - call close() as before; it goes back to the pool"""
+    return PooledConnection(pool.checkout())
+
+
+@contextmanager
+def timed_query(name: str):
+    """Latency histogram + trace span for one named SQL statement"""
+    with span(f"db.{name}"), DB_QUERY_LATENCY.time(name):
+        yield
+
+
+class PooledConnection:
+    """
+    Wraps a pymysql connection: close() returns it to the pool,
+    and checked-out connections are counted for db_connections_in_use.
+    """
+    def __init__(self, conn):
+        self._conn = conn
+        self._closed = False
+        DB_CONNECTIONS_IN_USE.inc()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            DB_CONNECTIONS_IN_USE.dec()
+            pool.checkin(self._conn)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+# Recency-weighted beneficiary ranking. rank_score = ln(sum over uses of exp(DECAY * t_use)),
+# t in seconds since RANK_EPOCH: ordering by it equals ordering by the exponentially decayed
+# use count at any moment, and a use only adds to its own row (log-sum-exp), so nothing is
+# ever re-scored as time passes.
+RANK_EPOCH = 1704067200  # 2024-01-01T00:00:00Z
+RANK_DECAY = math.log(2) / (float(os.getenv("BENEFICIARY_RANK_HALF_LIFE_DAYS", "30")) * 86400)
+
+
+def rank_increment(uses: int = 1, now: float = None) -> float:
+    """Log-space weight of `uses` uses at `now`"""
+    return RANK_DECAY * ((now or time.time()) - RANK_EPOCH) + math.log(uses)
+
+
+def bump_beneficiaries(cursor, user_id: int, account_numbers: list):
+    """
+    Records transfers to saved beneficiaries: resolves their IDs with one indexed
+    query on (user_id, account_number), then updates each row by primary key.
+    """
+    uses = {}
+    for account_number in account_numbers:
+        uses[str(account_number)] = uses.get(str(account_number), 0) + 1
+    if not uses:
+        return
+    with timed_query("beneficiary_select_ids"):
+        cursor.execute(
+            f"""
+            SELECT beneficiary_id, account_number FROM beneficiaries
+            WHERE user_id = %s AND account_number IN ({", ".join(["%s"] * len(uses))})
+            """,
+            [user_id, *uses]
+        )
+        rows = cursor.fetchall()
+    if not rows:
+        return
+    now = time.time()
+    with timed_query("beneficiary_update_rank"):
+        cursor.executemany(
+            """
+            UPDATE beneficiaries
+            SET frequency_count = frequency_count + %s,
+                last_used_at = NOW(),
+                rank_score = GREATEST(rank_score, %s) + LN(1 + EXP(-ABS(rank_score - %s)))
+            WHERE beneficiary_id = %s
+            """,
+            [(uses[account_number], rank_increment(uses[account_number], now), rank_increment(uses[account_number], now), beneficiary_id)
+             for beneficiary_id, account_number in sorted(rows)]
+        )
+
+
+def lock_accounts(cursor, user_id: int, account_numbers=()):
+    """
+    Locks the user's active account and the internal accounts in account_numbers
+    with one FOR UPDATE in account_id order, so concurrent A->B and B->A transfers
+    queue instead of deadlocking.
+    Returns ((account_id, balance_kobo) or None, {account_number: (account_id, user_id, balance_kobo)}).
+    """
+    account_numbers = sorted({str(number) for number in account_numbers})
+    with timed_query("lock_resolve_accounts"):
+        sql = "(SELECT account_id, TRUE FROM accounts WHERE user_id = %s AND is_active = TRUE LIMIT 1)"
+        if account_numbers:
+            sql += f""" UNION ALL (SELECT account_id, FALSE FROM accounts
+                WHERE account_number IN ({", ".join(["%s"] * len(account_numbers))}) AND is_active = TRUE)"""
+        cursor.execute(sql, [user_id, *account_numbers])
+        resolved = cursor.fetchall()
+    sender_ids = [row[0] for row in resolved if row[1]]
+    account_ids = sorted({row[0] for row in resolved})
+    if not account_ids:
+        return None, {}
+    with timed_query("lock_accounts"):
+        cursor.execute(
+            f"""
+            SELECT account_id, user_id, account_number, balance_kobo FROM accounts
+            WHERE account_id IN ({", ".join(["%s"] * len(account_ids))}) AND is_active = TRUE
+            ORDER BY account_id
+            FOR UPDATE
+            """,
+            account_ids
+        )
+        rows = cursor.fetchall()
+    sender = next(((row[0], row[3]) for row in rows if sender_ids and row[0] == sender_ids[0]), None)
+    receivers = {row[2]: (row[0], row[1], row[3]) for row in rows if row[2] in account_numbers}
+    return sender, receivers
+
 
 def lookup_beneficiary(name: str, user_id: int = 1):
     """
@@ -33,16 +230,18 @@ def lookup_beneficiary(name: str, user_id: int = 1):
     cursor = conn.cursor()
     
     # Case-insensitive search on alias_name for this user only
-    cursor.execute(
-        """
-        SELECT alias_name, account_name, account_number, bank_name, frequency_count
-        FROM beneficiaries
-        WHERE alias_name LIKE %s AND user_id = %s
-        LIMIT 1
-        """,
-        (f"%{name}%", user_id)
-    )
-    result = cursor.fetchone()
+    with timed_query("lookup_beneficiary"):
+        cursor.execute(
+            """
+            SELECT alias_name, account_name, account_number, bank_name, frequency_count
+            FROM beneficiaries
+            WHERE alias_name LIKE %s AND user_id = %s
+            ORDER BY rank_score DESC
+            LIMIT 1
+            """,
+            (f"%{name}%", user_id)
+        )
+        result = cursor.fetchone()
     
     cursor.close()
     conn.close()
@@ -57,6 +256,34 @@ def lookup_beneficiary(name: str, user_id: int = 1):
         }
     return None
 
+def get_balance(user_id: int = 1):
+    """
+    Returns the user's active account balance.
+    Gemini calls this when user asks "What's my balance?"
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    with timed_query("get_balance"):
+        cursor.execute(
+            """
+            SELECT balance_kobo FROM accounts 
+            WHERE user_id = %s AND is_active = TRUE
+            LIMIT 1
+            """,
+            (user_id,)
+        )
+        result = cursor.fetchone()
+    
+    cursor.close()
+    conn.close()
+    
+    balance_kobo = result[0] if result else 0
+    return {
+        "balance_kobo": balance_kobo,
+        "balance_ngn": f"₦{balance_kobo / 100:,.2f}"
+    }
+
 def trigger_biometric_auth():
     """Signifies that the agent wants to perform a sensitive action."""
     return {"action": "biometric_scan", "status": "pending"}
@@ -66,9 +293,10 @@ def execute_transfer(amount: int, beneficiary_name: str, bank_name: str, account
     Executes the final transfer after biometric approval.
     
     This function:
-    1. Checks user has sufficient balance
-    2. Deducts from user's account
-    3. Creates DEBIT transaction record
+    1. Locks the sender's and any internal receiver's account (in account_id order) and checks the balance
+    2. Posts a balanced journal: sender debit, receiver (internal) or
+       external settlement credit - this also updates the cached balances
+    3. Creates DEBIT (and receiver CREDIT) transaction records
     4. Updates beneficiary frequency_count
     5. Returns success/failure
     
@@ -82,29 +310,36 @@ def execute_transfer(amount: int, beneficiary_name: str, bank_name: str, account
     Returns:
         dict with status, transaction_id, and message
     """
-    import sys
-    print(f"[TRANSFER] Starting transfer: ₦{amount} to {beneficiary_name} ({bank_name})", file=sys.stderr)
+    from ledger import post_journal, EXTERNAL_SETTLEMENT
+    from analytics import record_transactions
+    import notifications
+    logger.info(f"Starting transfer: ₦{amount} to {beneficiary_name} ({bank_name})")
     
     # Convert Naira to Kobo
     amount_kobo = amount * 100
     
+    # Step 0: Velocity / new-payee rules (in memory, before touching the DB)
+    hold = risk.engine.reserve(user_id, amount_kobo, account_number)
+    if not hold.allowed:
+        TRANSFERS.inc("risk_blocked")
+        return {
+            "status": "failed",
+            "transaction_id": None,
+            "message": hold.message
+        }
+    committed = False
+    
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        # Step 1: Check balance
-        cursor.execute(
-            """
-            SELECT account_id, balance_kobo FROM accounts 
-            WHERE user_id = %s AND is_active = TRUE
-            LIMIT 1
-            """,
-            (user_id,)
-        )
-        account = cursor.fetchone()
+        # Step 1: Lock sender and (internal) receiver, check balance
+        internal = bool(bank_name and "tunjiax" in bank_name.lower())
+        account, receivers = lock_accounts(cursor, user_id, [account_number] if internal else [])
         
         if not account:
-            print(f"[TRANSFER] ❌ No active account found for user {user_id}", file=sys.stderr)
+            logger.warning(f"No active account found for user {user_id}")
+            TRANSFERS.inc("no_account")
             return {
                 "status": "failed",
                 "transaction_id": None,
@@ -114,7 +349,8 @@ def execute_transfer(amount: int, beneficiary_name: str, bank_name: str, account
         account_id, current_balance = account
         
         if current_balance < amount_kobo:
-            print(f"[TRANSFER] ❌ Insufficient balance: {current_balance} kobo < {amount_kobo} kobo", file=sys.stderr)
+            logger.warning(f"Insufficient balance: {current_balance} kobo < {amount_kobo} kobo")
+            TRANSFERS.inc("insufficient_funds")
             return {
                 "status": "failed",
                 "transaction_id": None,
@@ -122,83 +358,80 @@ def execute_transfer(amount: int, beneficiary_name: str, bank_name: str, account
             }
         
         # Step 2: Generate transaction ID
-        transaction_id = f"TXN_{datetime.now().strftime('%Y%m%d%H%M%S')}_{str(uuid.uuid4())[:8].upper()}"
+        txn_key = ids.next_id()
+        transaction_id = to_string(txn_key)
         
-        # Step 3: Deduct from account
+        # Step 3: Resolve the credit side - an internal TunjiaX account, else external settlement
+        receiver_account = receivers.get(str(account_number))
+        if receiver_account:
+            if receiver_account[0] == account_id:
+                TRANSFERS.inc("error")
+                return {
+                    "status": "failed",
+                    "transaction_id": None,
+                    "message": "You cannot transfer to your own account"
+                }
+        credit_account_id = receiver_account[0] if receiver_account else EXTERNAL_SETTLEMENT
+        
+        # Step 4: Journal (debits sender, credits receiver, updates cached balances)
+        post_journal(cursor, "transfer", [(account_id, -amount_kobo), (credit_account_id, amount_kobo)],
+                     reference=transaction_id, journal_id=txn_key)
         new_balance = current_balance - amount_kobo
-        cursor.execute(
-            """
-            UPDATE accounts 
-            SET balance_kobo = %s 
-            WHERE account_id = %s
-            """,
-            (new_balance, account_id)
-        )
-        print(f"[TRANSFER] Balance updated: {current_balance} → {new_balance} kobo", file=sys.stderr)
+        logger.debug(f"Balance updated: {current_balance} → {new_balance} kobo")
         
-        # Step 4: Create transaction record
+        # Step 5: Transaction history records
         reference_code = f"REF_{transaction_id}"
-        cursor.execute(
-            """
-            INSERT INTO transactions 
-            (transaction_id, user_id, account_id, type, amount_kobo, counterparty_name, counterparty_bank, counterparty_account, status, reference_code, created_at)
-            VALUES (%s, %s, %s, 'DEBIT', %s, %s, %s, %s, 'SUCCESS', %s, NOW())
-            """,
-            (transaction_id, user_id, account_id, amount_kobo, beneficiary_name, bank_name, account_number, reference_code)
-        )
-        print(f"[TRANSFER] Transaction record created: {transaction_id}", file=sys.stderr)
-        
-        # Step 5: Credit receiver if internal TunjiaX transfer
-        if bank_name and "tunjiax" in bank_name.lower():
-            # Find receiver's account by account number
+        with timed_query("transfer_insert_debit"):
             cursor.execute(
                 """
-                SELECT account_id, balance_kobo, user_id FROM accounts 
-                WHERE account_number = %s AND is_active = TRUE
-                LIMIT 1
+                INSERT INTO transactions 
+                (transaction_id, txn_key, user_id, account_id, type, amount_kobo, counterparty_name, counterparty_bank, counterparty_account, status, reference_code, created_at)
+                VALUES (%s, %s, %s, %s, 'DEBIT', %s, %s, %s, %s, 'SUCCESS', %s, NOW())
                 """,
-                (account_number,)
+                (transaction_id, txn_key, user_id, account_id, amount_kobo, beneficiary_name, bank_name, account_number, reference_code)
             )
-            receiver_account = cursor.fetchone()
-            
-            if receiver_account:
-                receiver_account_id, receiver_balance, receiver_user_id = receiver_account
-                new_receiver_balance = receiver_balance + amount_kobo
-                
-                # Credit receiver
-                cursor.execute(
-                    """
-                    UPDATE accounts SET balance_kobo = %s WHERE account_id = %s
-                    """,
-                    (new_receiver_balance, receiver_account_id)
-                )
-                
-                # Create credit transaction for receiver
-                credit_transaction_id = f"TXN_{datetime.now().strftime('%Y%m%d%H%M%S')}_{str(uuid.uuid4())[:8].upper()}"
+        logger.debug(f"Transaction record created: {transaction_id}")
+        
+        if receiver_account:
+            receiver_account_id, receiver_user_id, _ = receiver_account
+            credit_key = ids.next_id()
+            credit_transaction_id = to_string(credit_key)
+            with timed_query("transfer_insert_credit"):
                 cursor.execute(
                     """
                     INSERT INTO transactions 
-                    (transaction_id, user_id, account_id, type, amount_kobo, counterparty_name, counterparty_bank, counterparty_account, status, reference_code, created_at)
-                    VALUES (%s, %s, %s, 'CREDIT', %s, %s, %s, %s, 'SUCCESS', %s, NOW())
+                    (transaction_id, txn_key, user_id, account_id, type, amount_kobo, counterparty_name, counterparty_bank, counterparty_account, status, reference_code, created_at)
+                    VALUES (%s, %s, %s, %s, 'CREDIT', %s, %s, %s, %s, 'SUCCESS', %s, NOW())
                     """,
-                    (credit_transaction_id, receiver_user_id, receiver_account_id, amount_kobo, "Internal Transfer", "TunjiaX", account_number, f"REF_{credit_transaction_id}")
+                    (credit_transaction_id, credit_key, receiver_user_id, receiver_account_id, amount_kobo, "Internal Transfer", "TunjiaX", account_number, reference_code)
                 )
-                print(f"[TRANSFER] ✅ Credited receiver account {account_number}: +₦{amount:,}", file=sys.stderr)
+            logger.info(f"Credited receiver account {account_number}: +₦{amount:,}")
         
-        # Step 6: Update beneficiary frequency (if exists)
-        cursor.execute(
-            """
-            UPDATE beneficiaries 
-            SET frequency_count = frequency_count + 1 
-            WHERE user_id = %s AND (alias_name LIKE %s OR account_name LIKE %s)
-            """,
-            (user_id, f"%{beneficiary_name}%", f"%{beneficiary_name}%")
-        )
+        rollups = [(user_id, "DEBIT", beneficiary_name, amount_kobo)]
+        if receiver_account:
+            rollups.append((receiver_account[1], "CREDIT", "Internal Transfer", amount_kobo))
+        record_transactions(cursor, rollups)
+        
+        # Balance pushes for connected clients, committed with the money movement
+        events = [(user_id, "debit", {"transaction_id": transaction_id, "amount_kobo": amount_kobo,
+                                      "counterparty": beneficiary_name, "balance_kobo": new_balance})]
+        if receiver_account:
+            events.append((receiver_account[1], "credit", {"transaction_id": credit_transaction_id, "amount_kobo": amount_kobo,
+                                                           "counterparty": "Internal Transfer",
+                                                           "balance_kobo": receiver_account[2] + amount_kobo}))
+        notifications.enqueue(cursor, events)
+        
+        # Step 6: Update beneficiary frequency and rank (if saved)
+        bump_beneficiaries(cursor, user_id, [account_number])
         
         # Commit all changes
-        conn.commit()
+        with timed_query("transfer_commit"):
+            conn.commit()
+        committed = True
+        notifications.dispatcher.notify()
         
-        print(f"[TRANSFER] ✅ Transfer successful! ID: {transaction_id}", file=sys.stderr)
+        TRANSFERS.inc("success")
+        logger.info("Transfer successful", extra={"transaction_id": transaction_id})
         
         return {
             "status": "success",
@@ -210,14 +443,263 @@ def execute_transfer(amount: int, beneficiary_name: str, bank_name: str, account
         
     except Exception as e:
         conn.rollback()
-        print(f"[TRANSFER] ❌ Error: {str(e)}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        TRANSFERS.inc("error")
+        logger.exception(f"Transfer failed: {e}")
         return {
             "status": "failed",
             "transaction_id": None,
             "message": f"Transfer failed: {str(e)}"
         }
+    finally:
+        if not committed:
+            risk.engine.release(hold)
+        cursor.close()
+        conn.close()
+
+
+BATCH_TRANSFER_MAX_ITEMS = int(os.getenv("BATCH_TRANSFER_MAX_ITEMS", "25"))
+
+
+def _batch_item_error(item: dict) -> str:
+    amount = item.get("amount")
+    if not isinstance(amount, (int, float)) or amount <= 0 or int(amount) != amount:
+        return "Amount must be a positive whole Naira amount"
+    account_number = str(item.get("account_number") or "")
+    if len(account_number) != 10 or not account_number.isdigit():
+        return "Account number must be 10 digits"
+    if not item.get("beneficiary_name"):
+        return "Missing beneficiary name"
+    return ""
+
+
+def execute_batch_transfer(transfers: list, user_id: int = 1, mode: str = "all_or_nothing"):
+    """
+    Sends several transfers authorized by one biometric verification.
+    
+    One DB transaction: the sender and internal receivers are locked together in
+    account_id order (lock_accounts), the balance is checked once, and journals, transaction records and
+    beneficiary counters are written with executemany.
+    
+    Args:
+        transfers: [{"amount": Naira, "beneficiary_name", "bank_name", "account_number"}, ...]
+        user_id: The authenticated user's ID
+        mode: "all_or_nothing" - any invalid item or a short balance fails the batch;
+              "per_item" - valid items are sent in order while the balance lasts
+    
+    Returns:
+        dict with status (success/partial/failed), per-item results, total and new balance
+    """
+    from ledger import post_journals, EXTERNAL_SETTLEMENT
+    from analytics import record_transactions
+    import notifications
+    all_or_nothing = mode != "per_item"
+    items = [dict(item) for item in transfers or []]
+    if not items or len(items) > BATCH_TRANSFER_MAX_ITEMS:
+        return {
+            "status": "failed",
+            "results": [],
+            "message": f"A batch must contain between 1 and {BATCH_TRANSFER_MAX_ITEMS} transfers"
+        }
+    logger.info(f"Starting batch transfer of {len(items)} items", extra={"mode": mode})
+    
+    results = [{"index": i, "beneficiary_name": item.get("beneficiary_name"), "amount": item.get("amount"),
+                "status": "pending", "transaction_id": None, "message": ""} for i, item in enumerate(items)]
+    
+    def fail_all(message: str):
+        for result in results:
+            if result["status"] != "failed":
+                result["status"], result["message"] = "failed", message
+        return {"status": "failed", "results": results, "message": message}
+    
+    for item, result in zip(items, results):
+        error = _batch_item_error(item)
+        if error:
+            result["status"], result["message"] = "failed", error
+    if all_or_nothing and any(r["status"] == "failed" for r in results):
+        TRANSFERS.inc("error", amount=len(items))
+        return fail_all("Batch rejected: fix the invalid transfers and try again")
+    
+    # Velocity / new-payee rules, item by item in order; holds of items not sent are released below
+    holds = {}
+    for item, result in zip(items, results):
+        if result["status"] != "pending":
+            continue
+        hold = risk.engine.reserve(user_id, int(item["amount"]) * 100, item["account_number"])
+        if hold.allowed:
+            holds[result["index"]] = hold
+        else:
+            result["status"], result["message"] = "failed", hold.message
+    if all_or_nothing and any(r["status"] == "failed" for r in results):
+        for hold in holds.values():
+            risk.engine.release(hold)
+        TRANSFERS.inc("risk_blocked", amount=len(items))
+        return fail_all(f"Batch rejected: {next(r['message'] for r in results if r['status'] == 'failed')}")
+    sent = set()
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Sender and internal receivers, locked together in account_id order
+        internal_numbers = [
+            item["account_number"] for item, result in zip(items, results)
+            if result["status"] == "pending" and "tunjiax" in (item.get("bank_name") or "").lower()
+        ]
+        account, receivers = lock_accounts(cursor, user_id, internal_numbers)
+        if not account:
+            TRANSFERS.inc("no_account", amount=len(items))
+            return fail_all("No active account found")
+        account_id, balance = account
+        
+        # One balance check for the whole batch
+        accepted = []
+        remaining = balance
+        for item, result in zip(items, results):
+            if result["status"] != "pending":
+                continue
+            amount_kobo = int(item["amount"]) * 100
+            receiver = receivers.get(str(item["account_number"]))
+            if receiver and receiver[0] == account_id:
+                result["status"], result["message"] = "failed", "You cannot transfer to your own account"
+            elif amount_kobo > remaining:
+                result["status"], result["message"] = "failed", "Insufficient balance"
+            else:
+                remaining -= amount_kobo
+                accepted.append((item, result, amount_kobo, receiver))
+        
+        failed = [r for r in results if r["status"] == "failed"]
+        if not accepted or (all_or_nothing and failed):
+            TRANSFERS.inc("insufficient_funds" if any(r["message"] == "Insufficient balance" for r in failed) else "error",
+                          amount=len(items))
+            total_kobo = sum(int(item["amount"]) * 100 for item in items if not _batch_item_error(item))
+            message = (f"Insufficient balance for this batch of ₦{total_kobo / 100:,.2f}. You have ₦{balance / 100:,.2f}"
+                       if total_kobo > balance else "Batch could not be sent")
+            return fail_all(message)
+        
+        journals, history, events = [], [], []
+        sender_balance, receiver_balances = balance, {}
+        for item, result, amount_kobo, receiver in accepted:
+            txn_key = ids.next_id()
+            transaction_id = to_string(txn_key)
+            reference_code = f"REF_{transaction_id}"
+            credit_account_id = receiver[0] if receiver else EXTERNAL_SETTLEMENT
+            journals.append((txn_key, "transfer", transaction_id, [(account_id, -amount_kobo), (credit_account_id, amount_kobo)]))
+            history.append((transaction_id, txn_key, user_id, account_id, "DEBIT", amount_kobo, item["beneficiary_name"],
+                            item.get("bank_name"), str(item["account_number"]), reference_code))
+            if receiver:
+                credit_key = ids.next_id()
+                history.append((to_string(credit_key), credit_key, receiver[1], receiver[0], "CREDIT", amount_kobo,
+                                "Internal Transfer", "TunjiaX", str(item["account_number"]), reference_code))
+                receiver_balances[receiver[0]] = receiver_balances.get(receiver[0], receiver[2]) + amount_kobo
+                events.append((receiver[1], "credit", {"transaction_id": to_string(credit_key), "amount_kobo": amount_kobo,
+                                                       "counterparty": "Internal Transfer",
+                                                       "balance_kobo": receiver_balances[receiver[0]]}))
+            sender_balance -= amount_kobo
+            events.append((user_id, "debit", {"transaction_id": transaction_id, "amount_kobo": amount_kobo,
+                                              "counterparty": item["beneficiary_name"], "balance_kobo": sender_balance}))
+            result["status"], result["transaction_id"] = "success", transaction_id
+            result["message"] = f"Sent ₦{int(item['amount']):,} to {item['beneficiary_name']}"
+        
+        post_journals(cursor, journals)
+        with timed_query("batch_insert_transactions"):
+            cursor.executemany(
+                """
+                INSERT INTO transactions 
+                (transaction_id, txn_key, user_id, account_id, type, amount_kobo, counterparty_name, counterparty_bank, counterparty_account, status, reference_code, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'SUCCESS', %s, NOW())
+                """,
+                history
+            )
+        record_transactions(cursor, [(row[2], row[4], row[6], row[5]) for row in history])
+        notifications.enqueue(cursor, events)
+        bump_beneficiaries(cursor, user_id, [item["account_number"] for item, _, _, _ in accepted])
+        with timed_query("batch_commit"):
+            conn.commit()
+        sent = {result["index"] for _, result, _, _ in accepted}
+        notifications.dispatcher.notify()
+    except Exception as e:
+        conn.rollback()
+        TRANSFERS.inc("error", amount=len(items))
+        logger.exception(f"Batch transfer failed: {e}")
+        for result in results:
+            result["transaction_id"] = None
+        return fail_all(f"Batch transfer failed: {str(e)}")
+    finally:
+        for index, hold in holds.items():
+            if index not in sent:
+                risk.engine.release(hold)
+        cursor.close()
+        conn.close()
+    
+    failed = [r for r in results if r["status"] == "failed"]
+    TRANSFERS.inc("success", amount=len(accepted))
+    if failed:
+        TRANSFERS.inc("error", amount=len(failed))
+    sent_kobo = balance - remaining
+    logger.info(f"Batch transfer sent {len(accepted)}/{len(items)}", extra={"sent_kobo": sent_kobo})
+    return {
+        "status": "partial" if failed else "success",
+        "results": results,
+        "total_sent_kobo": sent_kobo,
+        "message": f"Sent {len(accepted)} of {len(items)} transfers, ₦{sent_kobo / 100:,.2f} in total",
+        "new_balance_kobo": remaining,
+        "new_balance_ngn": f"₦{remaining / 100:,.2f}"
+    }
+
+
+def fund_wallet(user_id: int, amount_kobo: int):
+    """
+    Simulated top-up: journal from the WALLET_FUNDING system account plus a
+    CREDIT transaction record, in one DB transaction.
+    """
+    from ledger import post_journal, WALLET_FUNDING
+    from analytics import record_transactions
+    import notifications
+    if amount_kobo <= 0:
+        raise ValueError("amount_kobo must be positive")
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        with timed_query("fund_select_account"):
+            cursor.execute(
+                """
+                SELECT account_id, balance_kobo, account_number FROM accounts 
+                WHERE user_id = %s AND is_active = TRUE
+                LIMIT 1
+                FOR UPDATE
+                """,
+                (user_id,)
+            )
+            account = cursor.fetchone()
+        if not account:
+            raise ValueError("No active account found")
+        account_id, balance, account_number = account
+        
+        txn_key = ids.next_id()
+        transaction_id = to_string(txn_key)
+        post_journal(cursor, "funding", [(WALLET_FUNDING, -amount_kobo), (account_id, amount_kobo)],
+                     reference=transaction_id, journal_id=txn_key)
+        with timed_query("fund_insert_credit"):
+            cursor.execute(
+                """
+                INSERT INTO transactions 
+                (transaction_id, txn_key, user_id, account_id, type, amount_kobo, counterparty_name, counterparty_bank, counterparty_account, status, reference_code, created_at)
+                VALUES (%s, %s, %s, %s, 'CREDIT', %s, 'Wallet Funding', 'TunjiaX', %s, 'SUCCESS', %s, NOW())
+                """,
+                (transaction_id, txn_key, user_id, account_id, amount_kobo, account_number, f"REF_{transaction_id}")
+            )
+        record_transactions(cursor, [(user_id, "CREDIT", "Wallet Funding", amount_kobo)])
+        notifications.enqueue(cursor, [(user_id, "credit", {"transaction_id": transaction_id, "amount_kobo": amount_kobo,
+                                                            "counterparty": "Wallet Funding",
+                                                            "balance_kobo": balance + amount_kobo})])
+        with timed_query("fund_commit"):
+            conn.commit()
+        notifications.dispatcher.notify()
+        logger.info("Wallet funded", extra={"transaction_id": transaction_id, "amount_kobo": amount_kobo})
+        return {"transaction_id": transaction_id, "new_balance_kobo": balance + amount_kobo}
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         cursor.close()
         conn.close()
@@ -232,12 +714,13 @@ def add_beneficiary(alias_name: str, account_name: str, account_number: str, ban
     cursor = conn.cursor()
     
     try:
-        cursor.execute("""
-            INSERT INTO beneficiaries (alias_name, account_name, account_number, bank_name, user_id, frequency_count)
-            VALUES (%s, %s, %s, %s, %s, 1)
-        """, (alias_name, account_name, account_number, bank_name, user_id))
-        
-        conn.commit()
+        with timed_query("add_beneficiary"):
+            cursor.execute("""
+                INSERT INTO beneficiaries (alias_name, account_name, account_number, bank_name, user_id, frequency_count, last_used_at, rank_score)
+                VALUES (%s, %s, %s, %s, %s, 1, NOW(), %s)
+            """, (alias_name, account_name, account_number, bank_name, user_id, rank_increment()))
+            
+            conn.commit()
         
         return {
             "status": "success",
@@ -270,6 +753,14 @@ tools_list = [
                     "required": ["name"]
                 }
             ),
+            types.FunctionDeclaration(
+                name="check_balance",
+                description="Returns the user's current account balance in Naira.",
+                parameters={
+                    "type": "OBJECT",
+                    "properties": {}
+                }
+            ),
             types.FunctionDeclaration(
                 name="trigger_biometric_auth",
                 description="Triggers face verification on the frontend before executing a transfer. Call this AFTER user confirms the transfer details.",
@@ -292,6 +783,96 @@ tools_list = [
                     "required": ["amount", "beneficiary_name", "bank_name", "account_number"]
                 }
             ),
+            types.FunctionDeclaration(
+                name="execute_batch_transfer",
+                description="Sends money to several recipients at once (salaries, group contributions) after ONE biometric verification. Collect and confirm the full list first, call trigger_biometric_auth once, then call this.",
+                parameters={
+                    "type": "OBJECT",
+                    "properties": {
+                        "transfers": {
+                            "type": "ARRAY",
+                            "description": "The confirmed recipients, in the order to send",
+                            "items": {
+                                "type": "OBJECT",
+                                "properties": {
+                                    "amount": {"type": "INTEGER", "description": "Amount in Naira"},
+                                    "beneficiary_name": {"type": "STRING", "description": "Full name of recipient"},
+                                    "bank_name": {"type": "STRING", "description": "Recipient's bank - must be TunjiaX"},
+                                    "account_number": {"type": "STRING", "description": "10-digit NUBAN account number"}
+                                },
+                                "required": ["amount", "beneficiary_name", "bank_name", "account_number"]
+                            }
+                        },
+                        "mode": {
+                            "type": "STRING",
+                            "enum": ["all_or_nothing", "per_item"],
+                            "description": "all_or_nothing (default): send all or none. per_item: send what the balance allows, in order"
+                        }
+                    },
+                    "required": ["transfers"]
+                }
+            ),
+            types.FunctionDeclaration(
+                name="schedule_transfer",
+                description="Schedules a future or recurring transfer (e.g. 'send Mama 20k every month'). Confirm amount, recipient, frequency and start date first, then call trigger_biometric_auth, then this.",
+                parameters={
+                    "type": "OBJECT",
+                    "properties": {
+                        "amount": {"type": "INTEGER", "description": "Amount in Naira per transfer"},
+                        "beneficiary_name": {"type": "STRING", "description": "Full name of recipient"},
+                        "bank_name": {"type": "STRING", "description": "Recipient's bank - must be TunjiaX"},
+                        "account_number": {"type": "STRING", "description": "10-digit NUBAN account number"},
+                        "frequency": {"type": "STRING", "enum": ["once", "daily", "weekly", "monthly"], "description": "How often to send"},
+                        "start_date": {"type": "STRING", "description": "First transfer date, ISO format (YYYY-MM-DD or YYYY-MM-DDTHH:MM). Omit to start now"},
+                        "occurrences": {"type": "INTEGER", "description": "Number of transfers for recurring schedules. Omit to repeat until cancelled"}
+                    },
+                    "required": ["amount", "beneficiary_name", "bank_name", "account_number", "frequency"]
+                }
+            ),
+            types.FunctionDeclaration(
+                name="list_scheduled_transfers",
+                description="Lists the user's active scheduled and recurring transfers.",
+                parameters={
+                    "type": "OBJECT",
+                    "properties": {}
+                }
+            ),
+            types.FunctionDeclaration(
+                name="cancel_scheduled_transfer",
+                description="Cancels a scheduled transfer. Get the schedule_id from list_scheduled_transfers and confirm with the user first.",
+                parameters={
+                    "type": "OBJECT",
+                    "properties": {
+                        "schedule_id": {"type": "STRING", "description": "ID from list_scheduled_transfers"}
+                    },
+                    "required": ["schedule_id"]
+                }
+            ),
+            types.FunctionDeclaration(
+                name="resolve_account_name",
+                description="Looks up the real account holder name for an account number and bank (name enquiry). Call this when the user gives an account number, before confirming the transfer.",
+                parameters={
+                    "type": "OBJECT",
+                    "properties": {
+                        "account_number": {"type": "STRING", "description": "10-digit NUBAN account number"},
+                        "bank_name": {"type": "STRING", "description": "Bank name, e.g. TunjiaX"}
+                    },
+                    "required": ["account_number", "bank_name"]
+                }
+            ),
+            types.FunctionDeclaration(
+                name="get_spending_summary",
+                description="Answers questions about the user's spending and income over a period (e.g. 'how much did I send last month', 'how much have I sent Tunde this year'): totals sent and received, top recipients.",
+                parameters={
+                    "type": "OBJECT",
+                    "properties": {
+                        "period": {"type": "STRING", "enum": ["today", "this_week", "this_month", "last_month", "last_7_days", "last_30_days", "this_year"], "description": "Named period. Default this_month"},
+                        "start_date": {"type": "STRING", "description": "Custom range start, YYYY-MM-DD (instead of period)"},
+                        "end_date": {"type": "STRING", "description": "Custom range end, YYYY-MM-DD (default today)"},
+                        "counterparty": {"type": "STRING", "description": "Only count transactions with this person"}
+                    }
+                }
+            ),
             types.FunctionDeclaration(
                 name="add_beneficiary",
                 description="Saves a new beneficiary to the user's list after a successful transfer. Ask user first if they want to save.",
@@ -0,0 +1,250 @@
+import os
+import time
+import logging
+import secrets
+import threading
+import contextvars
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Span currently open in this task/thread (asyncio tasks and to_thread copy it)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def parse_trace_headers(headers) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (trace_id, parent_span_id) from W3C `traceparent` or Cloud Run's
+    `x-cloud-trace-context: TRACE_ID/SPAN_ID;o=1` (span id is decimal there).
+    """
+    traceparent = headers.get("traceparent")
+    if traceparent:
+        parts = traceparent.split("-")
+        if len(parts) >= 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+            return parts[1], parts[2]
+    cloud = headers.get("x-cloud-trace-context")
+    if cloud:
+        trace_id, _, rest = cloud.partition("/")
+        span = rest.split(";")[0]
+        if len(trace_id) == 32:
+            return trace_id, format(int(span), "016x") if span.isdigit() else None
+    return None, None
+
+
+class Span:
+    """
+    One timed operation. Use as a context manager (works inside async code too):
+
+        with span("gemini.generate_content", call=1) as s:
+            ...
+            s.set("tokens", 123)
+    """
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "is_root", "attributes",
+                 "start_time", "start", "duration", "status", "_token", "_otel")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], is_root: bool, attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.is_root = is_root
+        self.attributes = attributes
+        self.start_time = 0.0
+        self.start = 0.0
+        self.duration = None
+        self.status = "ok"
+        self._token = None
+        self._otel = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def __enter__(self):
+        if _otel_tracer is not None:
+            self._start_otel()
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            # Cancellation (barge-in) is expected, not an error
+            self.status = "cancelled" if exc_type.__name__ == "CancelledError" else "error"
+            if self.status == "error":
+                self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Exited in a different context than it was entered (e.g. streamed body)
+            _current_span.set(None)
+        if self._otel is not None:
+            self._end_otel()
+        EXPORTER.export(self)
+        return False
+
+    def _start_otel(self):
+        from opentelemetry import trace as otel_trace
+        parent = _current_span.get()
+        if parent is not None and parent._otel is not None:
+            context = otel_trace.set_span_in_context(parent._otel)
+        elif self.parent_id:
+            remote = otel_trace.SpanContext(
+                trace_id=int(self.trace_id, 16), span_id=int(self.parent_id, 16),
+                is_remote=True, trace_flags=otel_trace.TraceFlags(1)
+            )
+            context = otel_trace.set_span_in_context(otel_trace.NonRecordingSpan(remote))
+        else:
+            context = None
+        self._otel = _otel_tracer.start_span(self.name, context=context)
+        # Adopt OpenTelemetry's IDs so both views of the trace line up
+        span_context = self._otel.get_span_context()
+        self.trace_id = format(span_context.trace_id, "032x")
+        self.span_id = format(span_context.span_id, "016x")
+
+    def _end_otel(self):
+        from opentelemetry.trace import Status, StatusCode
+        for key, value in self.attributes.items():
+            self._otel.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+        if self.status == "error":
+            self._otel.set_status(Status(StatusCode.ERROR, self.attributes.get("error")))
+        self._otel.end()
+
+    def to_dict(self, origin: float) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "offset_ms": round((self.start_time - origin) * 1000, 2),
+            "duration_ms": round((self.duration or 0) * 1000, 2),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled - same interface, no work"""
+    trace_id = None
+    span_id = None
+
+    def set(self, key, value):
+        pass
+
+    def traceparent(self):
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """Child of the current span, or a new trace if there is none"""
+    if not TRACING_ENABLED:
+        return _NOOP
+    parent = _current_span.get()
+    if parent is None:
+        return Span(name, new_trace_id(), None, True, attributes)
+    return Span(name, parent.trace_id, parent.span_id, False, attributes)
+
+
+def start_trace(name: str, headers, **attributes):
+    """Root span for an incoming request, continuing the caller's trace if headers carry one"""
+    if not TRACING_ENABLED:
+        return _NOOP
+    trace_id, parent_id = parse_trace_headers(headers)
+    return Span(name, trace_id or new_trace_id(), parent_id, True, attributes)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class RingBufferExporter:
+    """
+    Keeps the last `capacity` traces in memory for /debug/traces.
+    A trace is a root span plus every span sharing its trace_id; spans that finish
+    after the root (e.g. a streamed SSE body) are still attached to it.
+    """
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self.traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, finished: Span):
+        with self._lock:
+            spans = self.traces.get(finished.trace_id)
+            if spans is None:
+                spans = self.traces[finished.trace_id] = []
+                while len(self.traces) > self.capacity:
+                    self.traces.popitem(last=False)
+            spans.append(finished)
+
+    def slowest(self, limit: int = 10) -> List[dict]:
+        with self._lock:
+            snapshot = [list(spans) for spans in self.traces.values()]
+
+        results = []
+        for spans in snapshot:
+            roots = [s for s in spans if s.is_root]
+            if not roots:
+                continue  # root still running
+            origin = min(s.start_time for s in spans)
+            end = max(s.start_time + (s.duration or 0) for s in spans)
+            results.append({
+                "trace_id": roots[0].trace_id,
+                "root": roots[0].name,
+                "duration_ms": round((end - origin) * 1000, 2),
+                "started_at": roots[0].start_time,
+                "spans": [s.to_dict(origin) for s in sorted(spans, key=lambda s: s.start_time)],
+            })
+        results.sort(key=lambda t: t["duration_ms"], reverse=True)
+        return results[:limit]
+
+
+def _setup_otel():
+    """
+    TRACING_OTEL=1 mirrors every span into OpenTelemetry (needs opentelemetry-sdk;
+    exports over OTLP/HTTP when opentelemetry-exporter-otlp is installed).
+    """
+    if os.getenv("TRACING_OTEL", "0").lower() not in ("1", "true", "yes"):
+        return None
+    try:
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("TRACING_OTEL set but opentelemetry-sdk is not installed; using ring buffer only")
+        return None
+
+    provider = TracerProvider()
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    except ImportError:
+        logger.warning("opentelemetry-exporter-otlp not installed; OpenTelemetry spans are not exported")
+    otel_trace.set_tracer_provider(provider)
+    return otel_trace.get_tracer("tunjiax")
+
+
+TRACING_ENABLED = os.getenv("TRACING", "1").lower() not in ("0", "false", "no")
+EXPORTER = RingBufferExporter(capacity=int(os.getenv("TRACE_BUFFER_SIZE", "200")))
+_otel_tracer = _setup_otel() if TRACING_ENABLED else None
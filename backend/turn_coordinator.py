@@ -0,0 +1,118 @@
+import time
+import logging
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from session_manager import SessionManager
+
+logger = logging.getLogger(__name__)
+
+# Turn currently executing in this task (read by VoiceAgent._generate)
+current_turn: contextvars.ContextVar[Optional["Turn"]] = contextvars.ContextVar("current_turn", default=None)
+
+# Returned to a request whose turn was cancelled by a newer utterance
+SUPERSEDED_RESULT = ("", None)
+
+
+class Turn:
+    """One process_input call for a session"""
+    def __init__(self, session_id: str, key: str):
+        self.session_id = session_id
+        self.key = key
+        self.task: Optional[asyncio.Task] = None
+        self.llm_task: Optional[asyncio.Task] = None
+        self.started = False
+        self.superseded = False
+        self.finished_at: Optional[float] = None
+
+
+def normalize_utterance(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+class SessionTurnCoordinator:
+    """
+    Serializes turns per session and handles overlapping requests from ElevenLabs:
+
+    - identical utterances within `coalesce_window_seconds` share one upstream call
+    - a newer, different utterance supersedes the previous turn (barge-in): the old
+      turn is cancelled while it is queued or waiting on Gemini, but never while a
+      tool (DB write, transfer) is running
+    - everything else waits on the session lock in FIFO order
+    """
+    def __init__(self, session_manager: SessionManager, coalesce_window_seconds: float = 2.0):
+        self.session_manager = session_manager
+        self.coalesce_window_seconds = coalesce_window_seconds
+        self.latest: Dict[str, Turn] = {}
+        self.recent: Dict[Tuple[str, str], Turn] = {}
+        self.stats = {"turns": 0, "coalesced": 0, "superseded": 0, "queued": 0}
+
+    async def run(self, session_id: str, text: str, turn_func: Callable[[], Awaitable]):
+        """Runs turn_func for this session under the coordinator's rules"""
+        key = normalize_utterance(text)
+        now = time.monotonic()
+        self._expire_recent(now)
+
+        # 1. Coalesce exact duplicates (retries / double-sends)
+        duplicate = self.recent.get((session_id, key))
+        if duplicate is not None and duplicate.task is not None and not duplicate.superseded:
+            self.stats["coalesced"] += 1
+            logger.info(f"Coalescing duplicate request for session {session_id[:12]}...")
+            try:
+                return await asyncio.shield(duplicate.task)
+            except asyncio.CancelledError:
+                if duplicate.superseded:
+                    return SUPERSEDED_RESULT
+                raise
+
+        # 2. Barge-in: a newer utterance supersedes whatever is still pending
+        previous = self.latest.get(session_id)
+        if previous is not None and previous.task is not None and not previous.task.done():
+            self._supersede(previous)
+
+        # 3. Queue behind the session lock
+        turn = Turn(session_id, key)
+        self.latest[session_id] = turn
+        self.recent[(session_id, key)] = turn
+        self.stats["turns"] += 1
+        turn.task = asyncio.create_task(self._run_locked(turn, turn_func))
+
+        try:
+            return await turn.task
+        except asyncio.CancelledError:
+            if turn.superseded:
+                logger.info(f"Turn superseded by newer input (session {session_id[:12]}...)")
+                return SUPERSEDED_RESULT
+            raise
+        finally:
+            turn.finished_at = time.monotonic()
+            if self.latest.get(session_id) is turn:
+                del self.latest[session_id]
+
+    async def _run_locked(self, turn: Turn, turn_func):
+        lock = self.session_manager.lock(turn.session_id)
+        if lock.locked():
+            self.stats["queued"] += 1
+        async with lock:
+            turn.started = True
+            current_turn.set(turn)
+            return await turn_func()
+
+    def _supersede(self, turn: Turn):
+        turn.superseded = True
+        self.stats["superseded"] += 1
+        if not turn.started:
+            # Still queued - drop it before it reaches Gemini
+            turn.task.cancel()
+        elif turn.llm_task is not None and not turn.llm_task.done():
+            # Waiting on Gemini - abandon the call
+            turn.llm_task.cancel()
+        # Otherwise a tool is running; let it finish so DB state and history stay consistent
+
+    def _expire_recent(self, now: float):
+        expired = [
+            k for k, t in self.recent.items()
+            if t.finished_at is not None and now - t.finished_at > self.coalesce_window_seconds
+        ]
+        for k in expired:
+            del self.recent[k]
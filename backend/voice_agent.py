@@ -1,33 +1,29 @@
 import os
+import time
 import base64
-from google import genai
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
 from google.genai import types
-from google.oauth2 import service_account
 from tools import tools_list
 from session_manager import SessionManager
+from context_cache import ContextCacheManager
+from llm_backend import LLMBackend, create_backend_from_env
+from llm_resilience import ResilientBackend, LLMUnavailableError, CircuitOpenError
+from prefetch import BeneficiaryPrefetcher
+from turn_coordinator import SessionTurnCoordinator, current_turn
+from metrics import GEMINI_LATENCY, GEMINI_TOKENS
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+EventCallback = Optional[Callable[[dict], Awaitable[None]]]
 
 class VoiceAgent:
-    def __init__(self, project_id: str, location: str):
-        # Load service account credentials explicitly
-        credentials_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-        if credentials_path and os.path.exists(credentials_path):
-            credentials = service_account.Credentials.from_service_account_file(
-                credentials_path,
-                scopes=["https://www.googleapis.com/auth/cloud-platform"]
-            )
-        else:
-            credentials = None
-        
-        # Initialize Google Gen AI Client with Vertex AI backend
-        client_kwargs = {
-            'vertexai': True,
-            'project': project_id,
-            'location': location
-        }
-        if credentials:
-            client_kwargs['credentials'] = credentials
-            
-        self.client = genai.Client(**client_kwargs)
+    def __init__(self, project_id: str, location: str, backend: LLMBackend = None):
+        # LLM provider: Vertex AI by default, or record/replay/scripted for tests and load runs,
+        # wrapped with deadlines, retries, hedging and a circuit breaker
+        self.backend = ResilientBackend.from_env(backend or create_backend_from_env(project_id, location))
         
         self.system_instruction = """
 ### ROLE
@@ -47,12 +43,31 @@ You are Nugar, the TunjiaX banking assistant. You help users send money safely a
 **Step 3: If beneficiary NOT FOUND:**
 - Say: "I don't have Bisola saved. Please provide their account number (10 digits) and bank name."
 - When user provides details like "account is 1234567890, bank is TunjiaX"
-- Confirm: "Send ₦5,000 to 1234567890 at TunjiaX Bank. Correct?"
+- Call `resolve_account_name(account_number="1234567890", bank_name="TunjiaX")`
+- Confirm with the name it returns: "1234567890 at TunjiaX Bank is Bisola Adebayo. Send ₦5,000?"
+- If NOT_FOUND or INVALID, read the number back and ask the user to check it - never send to an unresolved account
+
+**Balance questions:**
+- Call `check_balance` and read the balance back to the user
+
+**Spending questions ("how much did I send last month?", "how much have I sent Tunde?"):**
+- Call `get_spending_summary` with the period (or start/end dates) and counterparty if a person is named
+- Read back the total, and the top recipients if asked
 
 **Step 4: After user confirms:**
 - Call `trigger_biometric_auth` to verify user identity
 - Then call `execute_transfer` with the full details
 
+**Paying several people at once (salaries, contributions):**
+- Collect every recipient (look up each name) and read the full list and total back
+- After ONE confirmation, call `trigger_biometric_auth` once
+- Then call `execute_batch_transfer` with the whole list (mode `per_item` only if the user says to send whatever goes through)
+
+**Scheduled / recurring transfers ("send Mama 20k every month"):**
+- Confirm recipient, amount, frequency, start date and how many times (or until cancelled)
+- Call `trigger_biometric_auth`, then `schedule_transfer`
+- Use `list_scheduled_transfers` / `cancel_scheduled_transfer` to review or stop them
+
 ### SUPPORTED BANKS
 Currently only TunjiaX Bank transfers are supported. If user mentions other banks (GTBank, Opay, etc.), say: "Currently we only support TunjiaX Bank transfers. Is the account on TunjiaX?"
 
@@ -72,28 +87,147 @@ Currently only TunjiaX Bank transfers are supported. If user mentions other bank
             tools=tools_list
         )
         
+        # Provider-side cache for the static instruction + tools prefix
+        self.context_cache = ContextCacheManager.from_env(
+            self.backend, self.model_name, self.system_instruction, tools_list
+        )
+        
+        # Running token usage (prompt vs. served from cache)
+        self.usage_stats = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        
         # Initialize session manager (5 minute timeout)
         self.session_manager = SessionManager(timeout_seconds=300)
+        
+        # Per-session serialization, barge-in and duplicate coalescing
+        self.turns = SessionTurnCoordinator(
+            self.session_manager,
+            coalesce_window_seconds=float(os.getenv("AGENT_COALESCE_WINDOW_SECONDS", "2.0"))
+        )
+        
+        # Warms likely DB lookups while Gemini is thinking
+        self.prefetcher = BeneficiaryPrefetcher(
+            enabled=os.getenv("AGENT_PREFETCH", "1").lower() not in ("0", "false", "no")
+        )
+
+    async def _generate(self, contents):
+        """
+        Calls Gemini with the cached prompt prefix when available.
+        If the cache has disappeared (expired/deleted upstream), retries once inline.
+        """
+        config = await self.context_cache.get_config()
+        with span("gemini.generate_content", cached_prefix=bool(config.cached_content), messages=len(contents)) as llm_span:
+            response = await self._timed_generate(contents, config)
+            usage = getattr(response, "usage_metadata", None)
+            if usage:
+                llm_span.set("prompt_tokens", usage.prompt_token_count or 0)
+                llm_span.set("cached_tokens", usage.cached_content_token_count or 0)
+        
+        if usage:
+            self.usage_stats["calls"] += 1
+            self.usage_stats["prompt_tokens"] += usage.prompt_token_count or 0
+            self.usage_stats["cached_tokens"] += usage.cached_content_token_count or 0
+            GEMINI_TOKENS.inc("prompt", amount=usage.prompt_token_count or 0)
+            GEMINI_TOKENS.inc("cached", amount=usage.cached_content_token_count or 0)
+            GEMINI_TOKENS.inc("output", amount=usage.candidates_token_count or 0)
+        
+        return response
+
+    async def _timed_generate(self, contents, config):
+        """The actual call(s), with the cache-miss inline retry and latency metric"""
+        start = time.perf_counter()
+        try:
+            try:
+                response = await self._cancellable(self.backend.generate_content(
+                    model=self.model_name,
+                    contents=contents,
+                    config=config
+                ))
+            except Exception as e:
+                if not config.cached_content or not self.context_cache.is_cache_error(e):
+                    raise
+                logger.warning(f"Cached prefix rejected ({e}), retrying inline")
+                self.context_cache.invalidate()
+                response = await self._cancellable(self.backend.generate_content(
+                    model=self.model_name,
+                    contents=contents,
+                    config=self.config
+                ))
+        except asyncio.CancelledError:
+            GEMINI_LATENCY.observe(time.perf_counter() - start, "cancelled")
+            raise
+        except Exception:
+            GEMINI_LATENCY.observe(time.perf_counter() - start, "error")
+            raise
+        GEMINI_LATENCY.observe(time.perf_counter() - start, "ok")
+        return response
+
+    async def _cancellable(self, coro):
+        """Runs an LLM call as its own task so a newer utterance can abandon it (barge-in)"""
+        turn = current_turn.get()
+        task = asyncio.ensure_future(coro)
+        if turn is not None:
+            turn.llm_task = task
+        try:
+            return await task
+        finally:
+            if turn is not None:
+                turn.llm_task = None
+
+    async def _run_to_completion(self, func, **kwargs):
+        """
+        Runs a money-moving tool in a worker thread, shielded from barge-in.
+        Returns (result, cancelled): on cancel it still waits for the result so the
+        caller can record it in history before re-raising.
+        """
+        task = asyncio.ensure_future(asyncio.to_thread(func, **kwargs))
+        cancelled = False
+        while True:
+            try:
+                return await asyncio.shield(task), cancelled
+            except asyncio.CancelledError:
+                if task.cancelled():
+                    raise
+                cancelled = True
 
-    async def process_input(self, text: str, user_id: int = 1, session_id: str = None):
+    async def process_input(self, text: str, user_id: int = 1, session_id: str = None, on_event: EventCallback = None):
         """
         Sends text to Gemini Chat and returns (speech_response, tool_action)
         user_id: The authenticated user's ID for database queries
         session_id: Unique session identifier for conversation continuity
-        """
-        import sys
+        on_event: optional async callback for progress events while the turn runs
+                  ({"type": "tool", "name": ..., "phase": "start" | "end", ...})
         
+        Requests for the same session run one at a time; see SessionTurnCoordinator.
+        """
         # Use user_id as session_id if not provided
         if session_id is None:
             session_id = f"user_{user_id}"
         
-        # DEBUG: Force print to console
-        print(f"\n[AGENT] --- GEMINI PROCESSING START ---", file=sys.stderr)
-        print(f"[AGENT] User ID: {user_id}, Session: {session_id[:12]}..., Input: {text}", file=sys.stderr)
+        with span("agent.process_input", session_id=session_id[:12], input_chars=len(text or "")):
+            return await self.turns.run(
+                session_id,
+                text,
+                lambda: self._process_turn(text, user_id, session_id, on_event)
+            )
+
+    async def _process_turn(self, text: str, user_id: int, session_id: str, on_event: EventCallback = None):
+        """Runs one conversation turn. Caller holds the session lock."""
+        logger.info("Gemini processing start", extra={"input_chars": len(text or "")})
+        logger.debug(f"Input: {text}")
+        
+        # Start speculative beneficiary/balance lookups before the first Gemini call
+        prefetch = self.prefetcher.start(text, user_id)
+        
+        chat_history = None
+        history_length = 0
+        # History length just after the last money-moving tool result, and what to say about it
+        committed_length = 0
+        committed_reply = None
         
         try:
             # Get session-based chat history
             chat_history = self.session_manager.get_or_create_session(session_id)
+            history_length = len(chat_history)
             
             # Add user message to history
             chat_history.append(types.Content(
@@ -101,16 +235,8 @@ Currently only TunjiaX Bank transfers are supported. If user mentions other bank
                 parts=[types.Part(text=text)]
             ))
             
-            print(f"[AGENT] Sending message to Gemini via Google Gen AI SDK...", file=sys.stderr)
-            
             # Generate response
-            response = await self.client.aio.models.generate_content(
-                model=self.model_name,
-                contents=chat_history,
-                config=self.config
-            )
-            
-            print(f"[AGENT] Received response from Gemini.", file=sys.stderr)
+            response = await self._generate(chat_history)
             
             # Initialize defaults
             response_text = "I'm processing your request."
@@ -133,84 +259,212 @@ Currently only TunjiaX Bank transfers are supported. If user mentions other bank
                     
                     for func_call in function_calls_found:
                         tool_name = func_call.name
-                        print(f"[AGENT] 🛠️ Function Call: {tool_name}", file=sys.stderr)
+                        logger.info(f"Function call: {tool_name}")
+                        if on_event:
+                            await on_event({"type": "tool", "name": tool_name, "phase": "start"})
                         
-                        if tool_name == "trigger_biometric_auth":
-                            tool_command = "TRIGGER_BIOMETRIC"
-                            # Don't need to call Gemini again, just return
-                            response_text = "Please verify your identity with face recognition to complete this transfer."
-                            self.session_manager.update_session(session_id, chat_history)
-                            return response_text, tool_command
+                        with span(f"tool.{tool_name}"):
+                            if tool_name == "trigger_biometric_auth":
+                                tool_command = "TRIGGER_BIOMETRIC"
+                                # Don't need to call Gemini again, just return
+                                response_text = "Please verify your identity with face recognition to complete this transfer."
+                                self.session_manager.update_session(session_id, chat_history)
+                                return response_text, tool_command
                         
-                        elif tool_name == "lookup_beneficiary":
-                            from tools import lookup_beneficiary
-                            result = lookup_beneficiary(
-                                func_call.args.get('name', ''),
-                                user_id=user_id
-                            )
+                            elif tool_name == "lookup_beneficiary":
+                                result = await prefetch.lookup_beneficiary(
+                                    func_call.args.get('name', ''),
+                                    user_id=user_id
+                                )
                             
-                            # Build tool result to send back to Gemini
-                            if result:
-                                tool_result_text = f"FOUND: {result['name']} at {result['bank']} (Account: {result['account']})"
-                            else:
-                                tool_result_text = f"NOT_FOUND: No beneficiary named '{func_call.args.get('name', '')}' in user's saved list."
+                                # Build tool result to send back to Gemini
+                                if result:
+                                    tool_result_text = f"FOUND: {result['name']} at {result['bank']} (Account: {result['account']})"
+                                else:
+                                    tool_result_text = f"NOT_FOUND: No beneficiary named '{func_call.args.get('name', '')}' in user's saved list."
                             
-                            print(f"[AGENT] Tool Result: {tool_result_text}", file=sys.stderr)
+                                logger.debug(f"Tool result: {tool_result_text}")
                             
-                            # Add function response to history
-                            chat_history.append(types.Content(
-                                role="user",
-                                parts=[types.Part(text=f"[TOOL RESULT for lookup_beneficiary]: {tool_result_text}")]
-                            ))
+                                # Add function response to history
+                                chat_history.append(types.Content(
+                                    role="user",
+                                    parts=[types.Part(text=f"[TOOL RESULT for lookup_beneficiary]: {tool_result_text}")]
+                                ))
                         
-                        elif tool_name == "execute_transfer":
-                            from tools import execute_transfer
-                            args = func_call.args
-                            result = execute_transfer(
-                                amount=args.get('amount'),
-                                beneficiary_name=args.get('beneficiary_name'),
-                                bank_name=args.get('bank_name'),
-                                account_number=args.get('account_number'),
-                                user_id=user_id
-                            )
+                            elif tool_name == "resolve_account_name":
+                                args = func_call.args or {}
+                                result = await prefetch.resolve_account_name(args.get('account_number'), args.get('bank_name'))
+                                if result["status"] == "found":
+                                    tool_result_text = f"FOUND: {result['account_name']} ({result['bank']}: {result['account_number']})"
+                                elif result["status"] == "not_found":
+                                    tool_result_text = f"NOT_FOUND: No {result['bank']} account {result['account_number']}"
+                                elif result["status"] == "unsupported":
+                                    tool_result_text = f"UNSUPPORTED: Name enquiry is not available for {result['bank']}"
+                                else:
+                                    tool_result_text = "INVALID: Account numbers have exactly 10 digits"
                             
-                            if result.get('status') == 'success':
-                                tool_result_text = f"SUCCESS: {result.get('message', '')} New balance: {result.get('new_balance_ngn', '')}"
-                                tool_command = "transfer_complete"
-                            else:
-                                tool_result_text = f"FAILED: {result.get('message', 'Unknown error')}"
-                                tool_command = "transfer_failed"
+                                chat_history.append(types.Content(
+                                    role="user",
+                                    parts=[types.Part(text=f"[TOOL RESULT for resolve_account_name]: {tool_result_text}")]
+                                ))
+                        
+                            elif tool_name == "check_balance":
+                                result = await prefetch.get_balance(user_id)
+                                tool_result_text = f"BALANCE: {result['balance_ngn']}"
                             
-                            # Add function response to history
-                            chat_history.append(types.Content(
-                                role="user", 
-                                parts=[types.Part(text=f"[TOOL RESULT for execute_transfer]: {tool_result_text}")]
-                            ))
+                                chat_history.append(types.Content(
+                                    role="user",
+                                    parts=[types.Part(text=f"[TOOL RESULT for check_balance]: {tool_result_text}")]
+                                ))
                         
-                        elif tool_name == "add_beneficiary":
-                            from tools import add_beneficiary
-                            args = func_call.args
-                            result = add_beneficiary(
-                                alias_name=args.get('alias_name'),
-                                account_name=args.get('account_name'),
-                                account_number=args.get('account_number'),
-                                bank_name=args.get('bank_name'),
-                                user_id=user_id
-                            )
-                            tool_result_text = f"Beneficiary added: {args.get('alias_name')}"
+                            elif tool_name == "execute_transfer":
+                                from tools import execute_transfer
+                                prefetch.invalidate_balance()
+                                args = func_call.args
+                                result, cancelled = await self._run_to_completion(
+                                    execute_transfer,
+                                    amount=args.get('amount'),
+                                    beneficiary_name=args.get('beneficiary_name'),
+                                    bank_name=args.get('bank_name'),
+                                    account_number=args.get('account_number'),
+                                    user_id=user_id
+                                )
+                            
+                                if result.get('status') == 'success':
+                                    tool_result_text = f"SUCCESS: {result.get('message', '')} New balance: {result.get('new_balance_ngn', '')}"
+                                    tool_command = "transfer_complete"
+                                    spoken = f"{result.get('message', '')}. Your new balance is {result.get('new_balance_ngn', '')}."
+                                else:
+                                    tool_result_text = f"FAILED: {result.get('message', 'Unknown error')}"
+                                    tool_command = "transfer_failed"
+                                    spoken = f"The transfer didn't go through: {result.get('message', 'Unknown error')}"
                             
-                            chat_history.append(types.Content(
-                                role="user",
-                                parts=[types.Part(text=f"[TOOL RESULT for add_beneficiary]: {tool_result_text}")]
-                            ))
+                                # Add function response to history
+                                chat_history.append(types.Content(
+                                    role="user", 
+                                    parts=[types.Part(text=f"[TOOL RESULT for execute_transfer]: {tool_result_text}")]
+                                ))
+                                committed_length, committed_reply = len(chat_history), (spoken, tool_command)
+                                if cancelled:
+                                    raise asyncio.CancelledError()
+                        
+                            elif tool_name == "execute_batch_transfer":
+                                from tools import execute_batch_transfer
+                                prefetch.invalidate_balance()
+                                args = func_call.args
+                                result, cancelled = await self._run_to_completion(
+                                    execute_batch_transfer,
+                                    transfers=list(args.get('transfers') or []),
+                                    user_id=user_id,
+                                    mode=args.get('mode') or "all_or_nothing"
+                                )
+                            
+                                lines = [f"{r['index'] + 1}. {r['beneficiary_name']} ₦{r['amount']}: {r['status'].upper()} {r['message']}" for r in result.get('results', [])]
+                                if result.get('status') in ('success', 'partial'):
+                                    tool_result_text = f"{result['status'].upper()}: {result['message']}. New balance: {result.get('new_balance_ngn', '')}"
+                                    tool_command = "transfer_complete"
+                                    spoken = f"{result['message']}. Your new balance is {result.get('new_balance_ngn', '')}."
+                                else:
+                                    tool_result_text = f"FAILED: {result.get('message', 'Unknown error')}"
+                                    tool_command = "transfer_failed"
+                                    spoken = f"The transfers didn't go through: {result.get('message', 'Unknown error')}"
+                                tool_result_text += "\n" + "\n".join(lines)
+                            
+                                chat_history.append(types.Content(
+                                    role="user",
+                                    parts=[types.Part(text=f"[TOOL RESULT for execute_batch_transfer]: {tool_result_text}")]
+                                ))
+                                committed_length, committed_reply = len(chat_history), (spoken, tool_command)
+                                if cancelled:
+                                    raise asyncio.CancelledError()
+                        
+                            elif tool_name in ("schedule_transfer", "list_scheduled_transfers", "cancel_scheduled_transfer"):
+                                from scheduler import create_schedule, list_schedules, cancel_schedule
+                                args = func_call.args or {}
+                                cancelled = False
+                                try:
+                                    if tool_name == "schedule_transfer":
+                                        result, cancelled = await self._run_to_completion(
+                                            create_schedule,
+                                            user_id=user_id,
+                                            amount=args.get('amount'),
+                                            beneficiary_name=args.get('beneficiary_name'),
+                                            bank_name=args.get('bank_name'),
+                                            account_number=args.get('account_number'),
+                                            frequency=args.get('frequency'),
+                                            start_date=args.get('start_date'),
+                                            occurrences=args.get('occurrences')
+                                        )
+                                        tool_result_text = f"SCHEDULED: {result}"
+                                        spoken = "Your transfer is scheduled."
+                                    elif tool_name == "list_scheduled_transfers":
+                                        schedules = await asyncio.to_thread(list_schedules, user_id)
+                                        tool_result_text = f"SCHEDULES: {schedules}" if schedules else "NO_SCHEDULES: The user has no active scheduled transfers."
+                                    else:
+                                        found, cancelled = await self._run_to_completion(
+                                            cancel_schedule, user_id=user_id, schedule_id=args.get('schedule_id'))
+                                        tool_result_text = "CANCELLED" if found else "NOT_FOUND: No active schedule with that ID"
+                                        spoken = "Your scheduled transfer is cancelled." if found else "I couldn't find that scheduled transfer."
+                                except ValueError as e:
+                                    tool_result_text = f"FAILED: {e}"
+                                    spoken = f"I couldn't schedule that: {e}"
+                            
+                                chat_history.append(types.Content(
+                                    role="user",
+                                    parts=[types.Part(text=f"[TOOL RESULT for {tool_name}]: {tool_result_text}")]
+                                ))
+                                if tool_name != "list_scheduled_transfers":
+                                    committed_length, committed_reply = len(chat_history), (spoken, tool_command)
+                                if cancelled:
+                                    raise asyncio.CancelledError()
+                        
+                            elif tool_name == "get_spending_summary":
+                                from datetime import date
+                                from analytics import resolve_range, spending_summary
+                                args = func_call.args or {}
+                                try:
+                                    start, end = resolve_range(
+                                        args.get('period'),
+                                        date.fromisoformat(args['start_date']) if args.get('start_date') else None,
+                                        date.fromisoformat(args['end_date']) if args.get('end_date') else None
+                                    )
+                                    summary = await asyncio.to_thread(spending_summary, user_id, start, end, counterparty=args.get('counterparty'))
+                                    tool_result_text = (
+                                        f"SPENDING {summary['start']} to {summary['end']}: sent ₦{summary['sent']['amount_ngn']} "
+                                        f"in {summary['sent']['count']} transfers, received ₦{summary['received']['amount_ngn']} "
+                                        f"in {summary['received']['count']}. Top recipients: {summary['top_recipients']}"
+                                    )
+                                except ValueError as e:
+                                    tool_result_text = f"FAILED: {e}"
+                            
+                                chat_history.append(types.Content(
+                                    role="user",
+                                    parts=[types.Part(text=f"[TOOL RESULT for get_spending_summary]: {tool_result_text}")]
+                                ))
+                        
+                            elif tool_name == "add_beneficiary":
+                                from tools import add_beneficiary
+                                args = func_call.args
+                                result = add_beneficiary(
+                                    alias_name=args.get('alias_name'),
+                                    account_name=args.get('account_name'),
+                                    account_number=args.get('account_number'),
+                                    bank_name=args.get('bank_name'),
+                                    user_id=user_id
+                                )
+                                tool_result_text = f"Beneficiary added: {args.get('alias_name')}"
+                            
+                                chat_history.append(types.Content(
+                                    role="user",
+                                    parts=[types.Part(text=f"[TOOL RESULT for add_beneficiary]: {tool_result_text}")]
+                                ))
+                        
+                        if on_event:
+                            await on_event({"type": "tool", "name": tool_name, "phase": "end", "tool_command": tool_command})
                     
                     # Call Gemini again with tool results so it can formulate a proper response
-                    print(f"[AGENT] Calling Gemini again with tool results...", file=sys.stderr)
-                    response = await self.client.aio.models.generate_content(
-                        model=self.model_name,
-                        contents=chat_history,
-                        config=self.config
-                    )
+                    logger.debug("Calling Gemini again with tool results")
+                    response = await self._generate(chat_history)
                     
                     if response.candidates and len(response.candidates) > 0:
                         candidate = response.candidates[0]
@@ -239,16 +493,39 @@ Currently only TunjiaX Bank transfers are supported. If user mentions other bank
             if not response_text:
                 response_text = "I'm processing that."
             
-            print(f"[AGENT] Final Response: {response_text[:50]}...", file=sys.stderr)
-            sys.stderr.flush()
+            logger.debug(f"Final response: {response_text[:50]}...")
+            logger.info("Turn complete", extra={"tool_command": tool_command, "prefetch_hit_rate": round(self.prefetcher.hit_rate(), 3)})
 
             return response_text, tool_command
 
+        except LLMUnavailableError as e:
+            # Gemini is down or too slow - drop this turn and give a spoken fallback
+            logger.warning(f"LLM unavailable: {e}")
+            if committed_reply is not None:
+                # Money already moved this turn - keep that in history so a retry can't repeat it
+                del chat_history[committed_length:]
+                self.session_manager.update_session(session_id, chat_history)
+                return committed_reply
+            if chat_history is not None:
+                del chat_history[history_length:]
+                self.session_manager.update_session(session_id, chat_history)
+            if isinstance(e, CircuitOpenError):
+                return "I'm having trouble connecting right now. Please try again in a moment.", None
+            return "Sorry, that took too long on my side. Could you say that again?", None
+        
+        except asyncio.CancelledError:
+            # Superseded mid-turn: keep the user's words and any committed tool result, drop the rest
+            if chat_history is not None:
+                del chat_history[max(history_length + 1, committed_length):]
+                self.session_manager.update_session(session_id, chat_history)
+            raise
+        
         except Exception as e:
-            import traceback
-            traceback.print_exc()
-            print(f"Detailed Gemini Error: {str(e)}")
+            logger.exception(f"Gemini error: {e}")
             return f"System Error: {str(e)}", None
+        
+        finally:
+            prefetch.finish()
 
     async def verify_identity_with_vision(self, base64_image: str) -> bool:
         """
@@ -275,7 +552,7 @@ Currently only TunjiaX Bank transfers are supported. If user mentions other bank
             """
             
             # 5. Generate content
-            response = await self.client.aio.models.generate_content(
+            response = await self.backend.generate_content(
                 model=self.model_name,
                 contents=[
                     types.Content(
@@ -287,12 +564,12 @@ Currently only TunjiaX Bank transfers are supported. If user mentions other bank
             
             if response.candidates and len(response.candidates) > 0:
                 text = response.candidates[0].content.parts[0].text.strip().upper()
-                print(f"Gemini Vision Result: {text}")
+                logger.info(f"Gemini Vision result: {text}")
                 return "VERIFIED" in text
             else:
-                print("No response from Gemini Vision")
+                logger.warning("No response from Gemini Vision")
                 return False
 
         except Exception as e:
-            print(f"Vision Verification Failed: {e}")
+            logger.warning(f"Vision verification failed: {e}")
             return False
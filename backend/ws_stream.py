@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Optional, Set
+from fastapi import WebSocket, WebSocketDisconnect
+from auth import verify_access_token
+from logging_config import session_id_var, user_id_var
+from turn_coordinator import SUPERSEDED_RESULT
+
+logger = logging.getLogger(__name__)
+
+# Close codes (4000-4999 are application-defined)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_SLOW_CONSUMER = 4408
+CLOSE_IDLE = 4000
+CLOSE_TOO_LARGE = 1009
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class VoiceStreamConnection:
+    """
+    Full-duplex channel for one /ws/voice-stream client.
+
+    Client -> server
+      {"type": "input", "text": "..."}   (plain {"text": "..."} also accepted)
+      {"type": "cancel"}                  stop streaming the current response
+      {"type": "ping"} / {"type": "pong"}
+
+    Server -> client
+      {"type": "ready", "session_id"}
+      {"type": "response.start", "turn_id"}
+      {"type": "tool", "turn_id", "name", "phase"}        as tools run
+      {"type": "delta", "turn_id", "text"}                 response text, word by word
+      {"type": "response.end", "turn_id", "audio_text", "tool_command", "superseded"}
+      {"type": "ping"} / {"type": "pong"} / {"type": "error", "message"}
+      {"type": "error", "message", "retry_after"}          input over the user's LLM rate limit
+
+    Receiving, sending and each turn run as separate tasks, so a new input
+    arriving mid-response barges in (the agent supersedes the older turn and
+    its remaining deltas are dropped). Outbound messages go through a bounded
+    queue; a client that stops reading for `send_timeout` seconds is disconnected.
+    """
+    def __init__(self, websocket: WebSocket, agent, user_id: int, session_id: str, admission=None):
+        self.websocket = websocket
+        self.agent = agent
+        self.admission = admission
+        self.user_id = user_id
+        self.session_id = session_id
+        self.send_queue: asyncio.Queue = asyncio.Queue(maxsize=int(os.getenv("WS_SEND_QUEUE_SIZE", "256")))
+        self.send_timeout = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+        self.ping_interval = float(os.getenv("WS_PING_INTERVAL", "20"))
+        self.idle_timeout = float(os.getenv("WS_IDLE_TIMEOUT", "60"))
+        self.max_message_bytes = int(os.getenv("WS_MAX_MESSAGE_BYTES", "16384"))
+        self.max_pending_turns = int(os.getenv("WS_MAX_PENDING_TURNS", "4"))
+        self.turn_tasks: Set[asyncio.Task] = set()
+        self.active_turn: Optional[str] = None
+        self.last_seen = time.monotonic()
+        self.closed = asyncio.Event()
+        self.close_code = 1000
+
+    async def run(self):
+        session_id_var.set(self.session_id)
+        user_id_var.set(self.user_id)
+        await self.send({"type": "ready", "session_id": self.session_id})
+
+        tasks = [
+            asyncio.create_task(self._receive_loop()),
+            asyncio.create_task(self._send_loop()),
+            asyncio.create_task(self._heartbeat_loop()),
+        ]
+        try:
+            await self.closed.wait()
+        finally:
+            for task in tasks + list(self.turn_tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, *self.turn_tasks, return_exceptions=True)
+            try:
+                await self.websocket.close(code=self.close_code)
+            except Exception:
+                pass
+
+    def close(self, code: int = 1000):
+        if not self.closed.is_set():
+            self.close_code = code
+            self.closed.set()
+
+    async def send(self, message: dict):
+        """Queues a message; waits (backpressure) while the client is behind"""
+        if self.closed.is_set():
+            return
+        try:
+            await asyncio.wait_for(self.send_queue.put(message), timeout=self.send_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("WebSocket client not reading, closing", extra={"queued": self.send_queue.qsize()})
+            self.close(CLOSE_SLOW_CONSUMER)
+
+    async def _send_loop(self):
+        try:
+            while True:
+                message = await self.send_queue.get()
+                await asyncio.wait_for(self.websocket.send_text(json.dumps(message)), timeout=self.send_timeout)
+        except (WebSocketDisconnect, asyncio.TimeoutError, RuntimeError) as e:
+            logger.info(f"WebSocket send stopped: {type(e).__name__}")
+            self.close(CLOSE_SLOW_CONSUMER if isinstance(e, asyncio.TimeoutError) else 1000)
+
+    async def _receive_loop(self):
+        try:
+            while True:
+                data = await self.websocket.receive_text()
+                self.last_seen = time.monotonic()
+                if len(data) > self.max_message_bytes:
+                    await self.send({"type": "error", "message": "Message too large"})
+                    self.close(CLOSE_TOO_LARGE)
+                    return
+
+                try:
+                    message = json.loads(data)
+                except ValueError:
+                    await self.send({"type": "error", "message": "Invalid JSON"})
+                    continue
+                if not isinstance(message, dict):
+                    await self.send({"type": "error", "message": "Expected a JSON object"})
+                    continue
+
+                kind = message.get("type", "input")
+                if kind == "input":
+                    text = message.get("text")
+                    if text and self.admission is not None:
+                        # Every turn is a Gemini call - same per-user LLM budget as the HTTP routes
+                        wait = await self.admission.admit_connection(self.user_id)
+                        if wait > 0:
+                            await self.send({"type": "error", "message": "Too many requests", "retry_after": round(wait, 1)})
+                            continue
+                    self._start_turn(text)
+                elif kind == "cancel":
+                    self.active_turn = None
+                elif kind == "ping":
+                    await self.send({"type": "pong"})
+                elif kind != "pong":
+                    await self.send({"type": "error", "message": f"Unknown message type: {kind}"})
+        except WebSocketDisconnect:
+            logger.info("Client disconnected from voice stream")
+            self.close()
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            if time.monotonic() - self.last_seen > self.idle_timeout:
+                logger.info("WebSocket idle timeout")
+                self.close(CLOSE_IDLE)
+                return
+            await self.send({"type": "ping"})
+
+    def _start_turn(self, text: Optional[str]):
+        if not text:
+            return
+        if len(self.turn_tasks) >= self.max_pending_turns:
+            if not self.send_queue.full():
+                self.send_queue.put_nowait({"type": "error", "message": "Too many pending requests"})
+            return
+        turn_id = uuid.uuid4().hex[:12]
+        # Barge-in: the newest input owns the stream; older turns stop emitting deltas
+        self.active_turn = turn_id
+        task = asyncio.create_task(self._run_turn(turn_id, text))
+        self.turn_tasks.add(task)
+        task.add_done_callback(self.turn_tasks.discard)
+
+    async def _run_turn(self, turn_id: str, text: str):
+        await self.send({"type": "response.start", "turn_id": turn_id})
+
+        async def on_event(event: dict):
+            if self.active_turn == turn_id:
+                await self.send({**event, "turn_id": turn_id})
+
+        response_text, tool_command = await self.agent.process_input(
+            text, user_id=self.user_id, session_id=self.session_id, on_event=on_event
+        )
+
+        superseded = self.active_turn != turn_id or (response_text, tool_command) == SUPERSEDED_RESULT
+        if not superseded:
+            for word in response_text.split(" "):
+                if self.active_turn != turn_id:
+                    superseded = True
+                    break
+                await self.send({"type": "delta", "turn_id": turn_id, "text": word + " "})
+
+        await self.send({
+            "type": "response.end",
+            "turn_id": turn_id,
+            "audio_text": response_text,
+            "tool_command": tool_command,
+            "superseded": superseded,
+        })
+
+
+def authenticate(websocket: WebSocket) -> Optional[int]:
+    """
+    JWT from `?token=` (browsers cannot set headers on a WebSocket) or an
+    Authorization: Bearer header. Returns the user_id, or None if invalid.
+    """
+    token = websocket.query_params.get("token")
+    if not token:
+        authorization = websocket.headers.get("authorization", "")
+        token = authorization.split(" ", 1)[1] if " " in authorization else None
+    if not token:
+        return None
+    try:
+        return int(verify_access_token(token)["user_id"])
+    except Exception as e:
+        logger.info(f"WebSocket auth failed: {e}")
+        return None
+
+
+async def handle_voice_stream(websocket: WebSocket, agent, admission=None):
+    """Entry point for /ws/voice-stream"""
+    user_id = authenticate(websocket)
+    if user_id is None:
+        # Close before accept -> handshake is rejected (HTTP 403)
+        await websocket.close(code=CLOSE_UNAUTHORIZED)
+        return
+    if admission is not None and await admission.admit_connection(user_id) > 0:
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+        return
+
+    await websocket.accept()
+    # Sessions are namespaced by user so a client cannot attach to someone else's history
+    session_id = f"ws_{user_id}_{websocket.query_params.get('session_id') or uuid.uuid4().hex[:8]}"
+    logger.info("Client connected to voice stream", extra={"ws_session": session_id})
+    await VoiceStreamConnection(websocket, agent, user_id, session_id, admission).run()
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { motion } from 'framer-motion';
 import { useAuth } from '../../../context/AuthContext';
+import { useNotifications } from '../../../context/NotificationContext';
 import { Card } from '../../ui/Card';
 import { Button } from '../../ui/Button';
 import { Plus, ArrowUpRight, Wallet, TrendingUp } from 'lucide-react';
@@ -31,6 +32,14 @@ export default function BalanceWidget() {
         fetchBalance();
     }, [userId]);
 
+    // Pushed after every credit/debit - no refetch needed
+    useNotifications((event) => {
+        setBalance({
+            balance_kobo: event.balance_kobo,
+            balance_ngn: (event.balance_kobo / 100).toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 })
+        });
+    });
+
     const handleFund = async () => {
         const amount = prompt('Enter amount to fund (NGN):');
         if (amount && !isNaN(amount)) {
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Card } from '../../ui/Card';
 import { useAuth } from '../../../context/AuthContext';
+import { useNotifications } from '../../../context/NotificationContext';
 import { motion } from 'framer-motion';
 import { ArrowUpRight, ArrowDownLeft, Clock, CheckCircle, XCircle } from 'lucide-react';
 
@@ -11,7 +12,7 @@ export default function TransactionHistory({ fullPage = false }) {
     const backendUrl = import.meta.env.VITE_BACKEND_URL;
     const userId = user?.user?.user_id || 1;
 
-    useEffect(() => {
+    const fetchTransactions = () => {
         fetch(`${backendUrl}/transactions?user_id=${userId}`)
             .then(res => res.json())
             .then(data => {
@@ -19,8 +20,15 @@ export default function TransactionHistory({ fullPage = false }) {
                 setLoading(false);
             })
             .catch(() => setLoading(false));
+    };
+
+    useEffect(() => {
+        fetchTransactions();
     }, [userId]);
 
+    // A new credit/debit was committed
+    useNotifications(() => fetchTransactions());
+
     const getStatusIcon = (status) => {
         switch (status?.toLowerCase()) {
             case 'success':
@@ -0,0 +1,43 @@
+import React, { createContext, useContext, useEffect, useRef } from 'react';
+import { useAuth } from './AuthContext';
+
+const NotificationContext = createContext();
+
+// Calls handler(event) for every credit/debit pushed on /notifications/stream
+export function useNotifications(handler) {
+    const listeners = useContext(NotificationContext);
+    const handlerRef = useRef(handler);
+    handlerRef.current = handler;
+
+    useEffect(() => {
+        const listener = (event) => handlerRef.current(event);
+        listeners.add(listener);
+        return () => listeners.delete(listener);
+    }, [listeners]);
+}
+
+export function NotificationProvider({ children }) {
+    const { user } = useAuth();
+    const listeners = useRef(new Set()).current;
+    const backendUrl = import.meta.env.VITE_BACKEND_URL;
+    const token = user?.access_token;
+
+    useEffect(() => {
+        if (!token) return;
+        // One stream per tab; EventSource reconnects on its own and sends Last-Event-ID
+        const source = new EventSource(`${backendUrl}/notifications/stream?token=${encodeURIComponent(token)}`);
+        const dispatch = (message) => {
+            const event = { type: message.type, ...JSON.parse(message.data) };
+            listeners.forEach((listener) => listener(event));
+        };
+        source.addEventListener('credit', dispatch);
+        source.addEventListener('debit', dispatch);
+        return () => source.close();
+    }, [token]);
+
+    return (
+        <NotificationContext.Provider value={listeners}>
+            {children}
+        </NotificationContext.Provider>
+    );
+}
@@ -4,6 +4,7 @@ import { BrowserRouter } from 'react-router-dom'
 import { GoogleOAuthProvider } from '@react-oauth/google'
 import { AuthProvider } from './context/AuthContext'
 import { ThemeProvider } from './context/ThemeContext'
+import { NotificationProvider } from './context/NotificationContext'
 import AppRouter from './AppRouter'
 import './index.css'
 
@@ -13,7 +14,9 @@ ReactDOM.createRoot(document.getElementById('root')).render(
             <BrowserRouter>
                 <ThemeProvider>
                     <AuthProvider>
-                        <AppRouter />
+                        <NotificationProvider>
+                            <AppRouter />
+                        </NotificationProvider>
                     </AuthProvider>
                 </ThemeProvider>
             </BrowserRouter>